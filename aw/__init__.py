@@ -22,6 +22,26 @@ QUERIES_YAML_FILE = "queries.yaml"
 The name of the YAML file used for storing queries.
 """
 
+RESULTS_DB_FILE = "results.sqlite3"
+"""
+The name of the SQLite database storing listings seen by previous runs.
+"""
+
+PAGE_CACHE_DIR = "cache"
+"""
+The directory where fetched pages and their parsed results are cached.
+"""
+
+CRAWL_STATE_DIR = "crawlstate"
+"""
+The directory where links seen by previous crawls are stored for incremental crawling.
+"""
+
+OUTBOX_DIR = "outbox"
+"""
+The directory where rendered reports wait until they are delivered.
+"""
+
 SCRAPERS_DIR = "scrapers"
 """
 The directory where scraper scripts are stored.
@@ -32,20 +52,185 @@ LOG_DIR = "logs"
 The directory where log files are stored.
 """
 
+METRICS_FILE = "metrics.prom"
+"""
+The file the pipeline metrics are written to after every run, in the Prometheus text format.
+"""
+
+METRICS_PORT = None
+"""
+The local port serving the pipeline metrics in the Prometheus text format, None to only write METRICS_FILE.
+"""
+
+PROFILE_ENV_VAR = "AW_PROFILE"
+"""
+The environment variable which, when set to a non-empty value, makes run.py profile a single Tasker run and exit.
+"""
+
+PROFILE_SAMPLE_INTERVAL = 0.005
+"""
+The interval (in seconds) between two samples of the thread stacks while profiling.
+"""
+
+PROFILE_SNAPSHOT_INTERVAL = 0.25
+"""
+The initial interval (in seconds) between two snapshots of the traced memory while profiling.
+"""
+
+PROFILE_MAX_SNAPSHOTS = 16
+"""
+The maximum number of memory snapshots kept while profiling, every other one is dropped and the interval doubled beyond it.
+"""
+
+PROFILE_TRACEBACK_DEPTH = 32
+"""
+The number of frames stored by tracemalloc for every allocation while profiling.
+"""
+
+PROFILE_TOP_ALLOCATIONS = 15
+"""
+The number of allocation sites reported per pipeline stage.
+"""
+
 # other stuff
 REQUEST_GET_TIMEOUT_LIMIT = 10
 """
 The timeout limit (in seconds) for GET requests.
 """
 
+HTML_PARSER_BACKENDS = ("lxml", "html.parser")
+"""
+BeautifulSoup tree builders in order of preference, the first installed one is used.
+"""
+
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+"""
+The maximum total size (in bytes) of the page cache before least recently used pages are evicted.
+"""
+
+SEEN_SET_CAPACITY = 20000
+"""
+The number of listing links per search the seen set is sized for.
+"""
+
+SEEN_SET_ERROR_RATE = 0.001
+"""
+The false positive rate of the seen set at full capacity.
+"""
+
+FULL_CRAWL_INTERVAL = 24 * 60 * 60
+"""
+The number of seconds after which a full crawl replaces incremental crawls to catch removed listings.
+"""
+
+CRAWL_CHECKPOINT_MAX_AGE = 6 * 60 * 60
+"""
+The number of seconds a checkpoint of an unfinished full crawl may be resumed, older checkpoints are crawled again.
+"""
+
+HTTP_POOL_SIZE = 10
+"""
+The maximum number of kept-alive connections per host in the shared HTTP client.
+"""
+
+HOST_REQUESTS_PER_SECOND = 5
+"""
+The maximum sustained rate of requests sent to one host.
+"""
+
+HOST_REQUEST_BURST = 5
+"""
+The number of requests which may be sent to one host at once after it was idle.
+"""
+
+HOST_INITIAL_CONCURRENCY = 2
+"""
+The number of concurrent requests to one host before the limit adapts to its latency and errors.
+"""
+
+HOST_MAX_CONCURRENCY = HTTP_POOL_SIZE
+"""
+The maximum number of concurrent requests to one host, the limit never grows beyond it.
+"""
+
+HOST_LATENCY_TOLERANCE = 2.0
+"""
+How many times slower than usual a response may be before the host is considered overloaded.
+"""
+
+HOST_MAX_RETRY_AFTER = 5 * 60
+"""
+The maximum number of seconds a Retry-After header may pause requests to a host.
+"""
+
+REQUEST_MAX_RETRIES = 3
+"""
+The number of times a failed or throttled request is sent again before the page is given up.
+"""
+
+REQUEST_RETRY_DELAY = 1
+"""
+The delay (in seconds) before the first retry of a failed request, doubled for every further retry.
+"""
+
+SCRAPER_MAX_WORKERS = 8
+"""
+The maximum number of (query, scraper) pairs scraped concurrently.
+"""
+
+STREAM_MAX_PAGES = 8
+"""
+The maximum number of scraped pages waiting to be filtered and stored.
+"""
+
 CONFIG_SECTION_HEADER = "settings"
 """
 The header name for the configuration section in the config file.
 """
 
-SLEEP_SCHEDULER_CYCLE_FOR_MINUTE = 60
+SCHEDULER_MAX_WAIT = 3600
+"""
+The maximum number of seconds the scheduler sleeps before re-checking the wall clock.
+"""
+
+SCHEDULER_QUERIES_RELOAD_INTERVAL = 10 * 60
+"""
+The number of seconds after which the scheduler reloads the query periods even if the queries file did not change.
+"""
+
+TASK_DEADLINE = 45 * 60
+"""
+The number of seconds after the start of a run at which scraping is cancelled and the partial results are stored and mailed, None for no deadline.
+"""
+
+REPORT_INLINE_MAX_RECORDS = 1000
+"""
+The maximum number of listings reported inline as HTML tables, larger reports are sent as a summary with CSV attachments.
+"""
+
+REPORT_PREVIEW_RECORDS = 20
+"""
+The number of new listings previewed in the summary of a report sent with CSV attachments.
+"""
+
+REPORT_MAX_ATTACHMENT_BYTES = 5 * 1024 * 1024
+"""
+The maximum compressed size (in bytes) of the CSV attached to one message, larger reports are split into several messages.
+"""
+
+OUTBOX_RETRY_BASE_DELAY = 30
+"""
+The number of seconds before the first retry of a report which failed to be delivered, doubled after every failure.
+"""
+
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+"""
+The maximum number of seconds between two delivery attempts of a report.
+"""
+
+OUTBOX_MAX_ATTEMPTS = 20
 """
-The number of seconds for one cycle of the scheduler.
+The number of delivery attempts after which a report is moved aside as undeliverable.
 """
 
 # keys
@@ -1,7 +1,10 @@
 import threading
 
+from aw import METRICS_PORT
 from aw.config import Config
 from aw.logger import logger
+from aw.metrics import metrics
+from aw.outboxsender import OutboxSender
 from aw.querymanager import QueryManager
 from aw.scheduler import Scheduler
 
@@ -16,6 +19,7 @@ class AntiqueWatchdog:
         config (Config): The configuration handler used by the scheduler.
         querymanager (QueryManager): The query manager instance used by the scheduler.
         scheduler (Scheduler): The scheduler instance responsible for scheduling tasks.
+        outbox_sender (OutboxSender): The background sender delivering queued reports.
     """
     def __init__(self, config: Config|None = None, qm: QueryManager|None = None):
         """
@@ -30,10 +34,12 @@ class AntiqueWatchdog:
         self.config = config or Config()
         self.querymanager = qm or QueryManager()
         self.scheduler = Scheduler(self.config, self.querymanager)
+        self.outbox_sender = OutboxSender(self.config)
     
     def run(self):
         """
-        Starts the scheduler in a separate thread and logs its status.
+        Starts the outbox sender and the scheduler in separate threads and logs their status.
+        Metrics are served on METRICS_PORT when it is set.
 
         Creates and starts a daemon thread for the scheduler. Logs a success message if
         the scheduler starts successfully. Logs an error message if an exception occurs.
@@ -42,6 +48,10 @@ class AntiqueWatchdog:
             tuple: A tuple containing the scheduler, config, and query manager instances.
         """
         try:
+            if METRICS_PORT is not None:
+                metrics.serve(METRICS_PORT)
+            self.outbox_sender.start()
+            logger.log_success("Outbox sender started")
             scheduler_thread = threading.Thread(target=self.scheduler.start)
             scheduler_thread.setDaemon(True)
             scheduler_thread.start()
@@ -0,0 +1,90 @@
+import hashlib
+import math
+
+class BloomFilter:
+    """
+    A compact probabilistic set of strings.
+
+    Membership tests never return false negatives, false positives happen with roughly
+    the configured error rate as long as no more than `capacity` items were added.
+
+    Attributes:
+        _size (int): Number of bits in the filter.
+        _hash_count (int): Number of bit positions set per item.
+        _bits (bytearray): The bit array.
+    """
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self._size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _get_positions(self, item: str) -> list[int]:
+        """
+        Computes the bit positions of an item using double hashing.
+
+        Args:
+            item (str): The item to hash.
+
+        Returns:
+            list[int]: The bit positions.
+        """
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+        return [(first_hash + i * second_hash) % self._size for i in range(self._hash_count)]
+
+    def add(self, item: str) -> None:
+        """
+        Adds an item to the filter.
+
+        Args:
+            item (str): The item to add.
+        """
+        for position in self._get_positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, other: "BloomFilter") -> None:
+        """
+        Adds all items of another filter of the same size.
+
+        Args:
+            other (BloomFilter): The filter to merge.
+
+        Raises:
+            ValueError: If the filters differ in size or hash count.
+        """
+        if (self._size, self._hash_count) != (other._size, other._hash_count):
+            raise ValueError("Only filters of the same size can be merged.")
+
+        self._bits = bytearray(
+            (int.from_bytes(self._bits, "little") | int.from_bytes(other._bits, "little")).to_bytes(len(self._bits), "little")
+        )
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._get_positions(item))
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the filter.
+
+        Returns:
+            bytes: The size, the hash count and the bit array.
+        """
+        return self._size.to_bytes(8, "little") + self._hash_count.to_bytes(2, "little") + bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        """
+        Deserializes a filter created by to_bytes.
+
+        Args:
+            data (bytes): The serialized filter.
+
+        Returns:
+            BloomFilter: The restored filter.
+        """
+        bloom_filter = cls.__new__(cls)
+        bloom_filter._size = int.from_bytes(data[:8], "little")
+        bloom_filter._hash_count = int.from_bytes(data[8:10], "little")
+        bloom_filter._bits = bytearray(data[10:])
+        return bloom_filter
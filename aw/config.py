@@ -1,6 +1,7 @@
 import configparser
 import threading
 from os.path import join
+from typing import Callable
 
 from aw import ROOT_DIR, CONFIG_FILE, CONFIG_SECTION_HEADER
 from aw import LOGIN, PASSWORD, RECIPIENT, SERVER, PORT, TIME, PERIOD, WEEKDAY
@@ -20,12 +21,14 @@ class Config:
         _io_lock (threading.Lock): Lock to ensure thread-safe operations on the configuration file.
         _filepath (str): Path to the configuration file.
         _scheduler_up_to_date (bool): Flag indicating if the scheduler configuration is up-to-date.
+        _change_listeners (list[Callable[[], None]]): Callbacks invoked after any key has been changed.
     """
     def __init__(self) -> None:
         self._parser = configparser.ConfigParser()
         self._io_lock = threading.Lock()
         self._filepath = join(ROOT_DIR, CONFIG_FILE)
         self._scheduler_up_to_date = False
+        self._change_listeners = []
 
         self._load_file()
 
@@ -190,6 +193,8 @@ class Config:
         with self._io_lock:
             self._set_key(key, value)
             self._save_file()
+
+        self._notify_change_listeners()
     
     def set_multiple_keys(self, key_value_pairs: dict[str, str]) -> None:
         """
@@ -203,6 +208,30 @@ class Config:
                 self._set_key(key, value)
             self._save_file()
 
+        self._notify_change_listeners()
+
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers a callback invoked every time configuration keys are changed.
+
+        Listeners are called outside of the IO lock, so they are free to read the configuration back.
+
+        Args:
+            listener (Callable[[], None]): The callback to register.
+        """
+        with self._io_lock:
+            self._change_listeners.append(listener)
+
+    def _notify_change_listeners(self) -> None:
+        """
+        Calls every registered change listener.
+        """
+        with self._io_lock:
+            listeners = list(self._change_listeners)
+
+        for listener in listeners:
+            listener()
+
     def is_scheduler_up_to_date(self) -> bool:
         """
         Checks if the scheduler configuration is up-to-date.
@@ -0,0 +1,120 @@
+import os
+import pickle
+import time
+from typing import Iterator
+
+from aw import CRAWL_CHECKPOINT_MAX_AGE
+from aw.logger import logger
+
+class CrawlCheckpoint:
+    """
+    Pages of one (scraper, search) crawl, persisted as they are scraped so the crawl can resume.
+
+    The file is a sequence of pickled frames: the creation time, one frame per page and a
+    final None once the crawl completed. Pages are appended and flushed one at a time, so a
+    crawl which fails or is interrupted keeps every page scraped so far. A frame torn by a
+    crash is cut off when the checkpoint is resumed. Checkpoints are best effort, a crawl
+    whose checkpoint cannot be written continues without it.
+
+    Attributes:
+        _filepath (str): Path to the checkpoint file.
+        _max_age (float): Number of seconds after which the checkpoint is discarded instead of resumed.
+        _file (BinaryIO | None): The file opened for appending once the stored pages were replayed.
+        pages (int): Number of pages persisted.
+        complete (bool): Whether the crawl completed.
+    """
+    def __init__(self, filepath: str, max_age: float = CRAWL_CHECKPOINT_MAX_AGE) -> None:
+        self._filepath = filepath
+        self._max_age = max_age
+        self._file = None
+        self.pages = 0
+        self.complete = False
+
+    def replay(self) -> Iterator[list["Record"]]: # type: ignore
+        """
+        Yields the pages persisted by previous runs, then opens the checkpoint for appending.
+
+        A missing, stale or unreadable checkpoint yields nothing and is started over.
+
+        Yields:
+            list[Record]: The Record objects of one persisted page, in page order.
+        """
+        valid_size = 0
+
+        try:
+            with open(self._filepath, "rb") as file:
+                if time.time() - pickle.load(file) <= self._max_age:
+                    valid_size = file.tell()
+                    while (page := pickle.load(file)) is not None:
+                        valid_size = file.tell()
+                        self.pages += 1
+                        yield page
+                    self.complete = True
+        except FileNotFoundError:
+            pass
+        except (IOError, pickle.PickleError, EOFError, AttributeError, ImportError, TypeError) as e:
+            if valid_size == 0:
+                logger.log_error(f"Unable to resume checkpoint {self._filepath}: {e}")
+
+        if not self.complete:
+            self._open(valid_size)
+
+    def _open(self, valid_size: int) -> None:
+        """
+        Opens the checkpoint for appending, cutting off anything after the last valid frame.
+
+        Args:
+            valid_size (int): Size of the valid frames, 0 to start a new checkpoint.
+        """
+        try:
+            os.makedirs(os.path.dirname(self._filepath), exist_ok=True)
+            if valid_size:
+                self._file = open(self._filepath, "r+b")
+                self._file.truncate(valid_size)
+                self._file.seek(valid_size)
+            else:
+                self._file = open(self._filepath, "wb")
+                self._write(time.time())
+        except IOError as e:
+            logger.log_error(f"Unable to open checkpoint {self._filepath}: {e}")
+            self.close()
+
+    def _write(self, frame: object) -> None:
+        """
+        Appends a frame and flushes it, giving the checkpoint up if it cannot be written.
+
+        Args:
+            frame (object): The picklable frame.
+        """
+        if self._file is None:
+            return
+
+        try:
+            pickle.dump(frame, self._file)
+            self._file.flush()
+        except (IOError, pickle.PickleError) as e:
+            logger.log_error(f"Unable to write checkpoint {self._filepath}: {e}")
+            self.close()
+
+    def append(self, page: list["Record"]) -> None: # type: ignore
+        """
+        Persists a scraped page.
+
+        Args:
+            page (list[Record]): The Record objects of the page.
+        """
+        self._write(page)
+        self.pages += 1
+
+    def finish(self) -> None:
+        """
+        Marks the crawl as complete, a completed checkpoint is replayed without crawling.
+        """
+        self._write(None)
+        self.complete = True
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,146 @@
+import hashlib
+import os
+from os.path import join
+import threading
+
+from aw import ROOT_DIR, CRAWL_STATE_DIR, SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE
+from aw.bloomfilter import BloomFilter
+from aw.crawlcheckpoint import CrawlCheckpoint
+from aw.logger import logger
+
+class CrawlState:
+    """
+    Persists the set of listing links already seen and the checkpoint of the current full crawl per (scraper, search).
+
+    Incremental crawls use it to stop paginating once a whole page consists of known links.
+    Every set is stored as a Bloom filter in its own file, so concurrent searches never share a file.
+    Full crawls persist their pages into checkpoints, which are kept until a full run completes,
+    so a failed or interrupted full run resumes instead of crawling from the first page.
+
+    Attributes:
+        _state_dir (str): Directory storing the serialized Bloom filters and checkpoints.
+        _lock (threading.Lock): Lock guarding statistics.
+        _stats (dict[str, int]): Numbers of resumed pages, completed and failed crawls.
+    """
+    CHECKPOINT_SUFFIX = ".checkpoint"
+    """
+    Suffix of checkpoint files.
+    """
+
+    def __init__(self, state_dir: str | None = None) -> None:
+        self._state_dir = state_dir or join(ROOT_DIR, CRAWL_STATE_DIR)
+        self._lock = threading.Lock()
+        self._stats = {"resumed_pages": 0, "completed_crawls": 0, "failed_crawls": 0}
+
+    def _get_filepath(self, scraper: type, search_key: str, suffix: str = ".bloom") -> str:
+        """
+        Derives the file storing the state of a search.
+
+        Args:
+            scraper (type): The scraper class.
+            search_key (str): The normalized query string.
+            suffix (str): The suffix of the kind of state.
+
+        Returns:
+            str: Path to the state file.
+        """
+        name = f"{scraper.__module__}.{scraper.__qualname__}\n{search_key}"
+        return join(self._state_dir, hashlib.sha256(name.encode()).hexdigest() + suffix)
+
+    def load(self, scraper: type, search_key: str) -> BloomFilter:
+        """
+        Loads the links seen by previous crawls of a search.
+
+        Args:
+            scraper (type): The scraper class.
+            search_key (str): The normalized query string.
+
+        Returns:
+            BloomFilter: The seen set, empty if the search was never crawled.
+        """
+        try:
+            with open(self._get_filepath(scraper, search_key), "rb") as file:
+                return BloomFilter.from_bytes(file.read())
+        except FileNotFoundError:
+            return BloomFilter(SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE)
+        except IOError as e:
+            logger.log_error(f"Unable to load seen links of '{search_key}': {e}")
+            return BloomFilter(SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE)
+
+    def save(self, scraper: type, search_key: str, seen: BloomFilter) -> None:
+        """
+        Persists the links seen by a crawl of a search.
+
+        Args:
+            scraper (type): The scraper class.
+            search_key (str): The normalized query string.
+            seen (BloomFilter): The seen set.
+        """
+        filepath = self._get_filepath(scraper, search_key)
+
+        try:
+            os.makedirs(self._state_dir, exist_ok=True)
+            with open(filepath + ".tmp", "wb") as file:
+                file.write(seen.to_bytes())
+            os.replace(filepath + ".tmp", filepath)
+        except IOError as e:
+            logger.log_error(f"Unable to save seen links of '{search_key}': {e}")
+
+    def open_checkpoint(self, scraper: type, search_key: str) -> CrawlCheckpoint:
+        """
+        Opens the checkpoint of a full crawl of a search, see CrawlCheckpoint.replay.
+
+        Args:
+            scraper (type): The scraper class.
+            search_key (str): The normalized query string.
+
+        Returns:
+            CrawlCheckpoint: The checkpoint, to be replayed before crawling.
+        """
+        return CrawlCheckpoint(self._get_filepath(scraper, search_key, self.CHECKPOINT_SUFFIX))
+
+    def clear_checkpoints(self) -> None:
+        """
+        Removes all checkpoints once a full run completed and was stored.
+        """
+        try:
+            names = os.listdir(self._state_dir)
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            if name.endswith(self.CHECKPOINT_SUFFIX):
+                try:
+                    os.remove(join(self._state_dir, name))
+                except IOError as e:
+                    logger.log_error(f"Unable to remove checkpoint {name}: {e}")
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Adds to a crawl statistic.
+
+        Args:
+            name (str): Name of the statistic, see get_stats.
+            value (int): The value added.
+        """
+        with self._lock:
+            self._stats[name] += value
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns crawl statistics collected since the last reset.
+
+        Returns:
+            dict[str, int]: Numbers of pages resumed from checkpoints, completed crawls and failed crawls.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        """
+        Resets crawl statistics, typically at the start of a Tasker run.
+        """
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+crawl_state = CrawlState()
@@ -28,4 +28,21 @@ class QueriesNotLoadedError(Exception):
 
     This exception is used when there is an issue with reading or parsing query 
     definitions from a file, which prevents the queries from being loaded properly.
-    """
\ No newline at end of file
+    """
+
+class InvalidConstraintError(Exception):
+    """
+    Exception raised when a constraint cannot be compiled.
+
+    This exception indicates that a constraint targets a record attribute that does not
+    exist, uses an unknown relation or has a value which is neither a string nor a number,
+    so the query owning it cannot be filtered.
+    """
+
+class StreamClosedError(Exception):
+    """
+    Exception raised when records are put into a stream whose consumer stopped reading.
+
+    This exception unwinds the scrapers still producing pages, so a run which failed
+    or was abandoned does not keep crawling in the background.
+    """
@@ -0,0 +1,54 @@
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+from aw import HTML_PARSER_BACKENDS
+
+class HtmlParser:
+    """
+    Pluggable HTML parsing backend for scraper plugins.
+
+    Picks the fastest BeautifulSoup tree builder installed (lxml when available, html.parser
+    otherwise), so plugins keep working with the BeautifulSoup API regardless of the backend.
+    A SoupStrainer can be passed to materialize only the subtrees a plugin actually needs.
+    """
+    _backend = None
+
+    @classmethod
+    def is_available(cls, backend: str) -> bool:
+        """
+        Checks whether a BeautifulSoup tree builder is installed.
+
+        Args:
+            backend (str): The tree builder name, e.g. "lxml" or "html.parser".
+
+        Returns:
+            bool: True if the backend can be used, False otherwise.
+        """
+        return builder_registry.lookup(backend) is not None
+
+    @classmethod
+    def get_backend(cls) -> str:
+        """
+        Returns the first available backend from HTML_PARSER_BACKENDS.
+
+        Returns:
+            str: The name of the tree builder used by default.
+        """
+        if cls._backend is None:
+            cls._backend = next((backend for backend in HTML_PARSER_BACKENDS if cls.is_available(backend)), "html.parser")
+        return cls._backend
+
+    @classmethod
+    def make_soup(cls, markup: str | bytes, parse_only: SoupStrainer | None = None, backend: str | None = None) -> BeautifulSoup:
+        """
+        Parses markup into a BeautifulSoup object.
+
+        Args:
+            markup (str | bytes): The HTML document.
+            parse_only (SoupStrainer | None): Optional strainer limiting which elements are built.
+            backend (str | None): Tree builder to use instead of the default one.
+
+        Returns:
+            BeautifulSoup: The parsed HTML content.
+        """
+        return BeautifulSoup(markup, backend or cls.get_backend(), parse_only=parse_only)
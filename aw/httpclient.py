@@ -0,0 +1,237 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests as rq
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from aw import REQUEST_GET_TIMEOUT_LIMIT, HTTP_POOL_SIZE, REQUEST_MAX_RETRIES, REQUEST_RETRY_DELAY
+from aw.metrics import metrics
+from aw.ratelimiter import RateLimiter, rate_limiter as shared_rate_limiter
+
+class RequestCancelledError(rq.RequestException):
+    """
+    Exception raised when a request is cancelled because its run passed the deadline.
+
+    It is a RequestException, so scrapers handle it as any request which failed and the
+    crawl is counted as failed, keeping the pages it already scraped.
+    """
+
+class HttpClient:
+    """
+    A shared HTTP client keeping one pooled keep-alive session per host.
+
+    Scraper plugins should fetch pages through the module-level `http_client` instance
+    instead of calling `requests.get`, so TCP and TLS connections are reused across
+    pages, queries and Tasker runs for the whole lifetime of the daemon. Every request
+    passes the per-host RateLimiter, failed and throttled requests are sent again, so a
+    single flaky page does not fail a whole crawl. Requests can be cancelled cooperatively,
+    see cancel.
+
+    Attributes:
+        _pool_size (int): Maximum number of kept-alive connections per host.
+        _timeout (float): Timeout (in seconds) used for every request.
+        _rate_limiter (RateLimiter): Limiter of requests per host.
+        _sessions (dict[str, requests.Session]): Pooled sessions keyed by host.
+        _lock (threading.Lock): Lock guarding sessions and statistics.
+        _requests (int): Number of requests sent since the last statistics reset.
+        _retries (int): Number of answered requests which were retries.
+        _bytes_received (int): Number of (possibly compressed) body bytes read from the wire.
+        _bytes_decoded (int): Number of body bytes after content decoding.
+        _handshakes_baseline (int): Number of connections opened before the last statistics reset.
+        _cancelled (threading.Event): Set while requests are cancelled.
+    """
+    THROTTLED_STATUSES = (429, 503)
+    """
+    Status codes of responses which throttle the client.
+    """
+
+    TRANSIENT_ERRORS = (rq.ConnectionError, rq.Timeout, rq.exceptions.ChunkedEncodingError)
+    """
+    Request errors which may pass when the request is sent again.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, timeout: float = REQUEST_GET_TIMEOUT_LIMIT, rate_limiter: RateLimiter = shared_rate_limiter) -> None:
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._bytes_received = 0
+        self._bytes_decoded = 0
+        self._handshakes_baseline = 0
+        self._cancelled = threading.Event()
+
+    def _create_session(self) -> rq.Session:
+        """
+        Creates a session with a connection pool and compression negotiation.
+
+        Only encodings urllib3 is able to decode are advertised, so brotli is
+        requested whenever the brotli package is installed.
+
+        Returns:
+            requests.Session: The new session.
+        """
+        session = rq.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+        return session
+
+    def _get_session(self, url: str) -> rq.Session:
+        """
+        Returns the pooled session for the host of the given URL, creating it when needed.
+
+        Args:
+            url (str): The URL about to be fetched.
+
+        Returns:
+            requests.Session: The session dedicated to the URL's host.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self._sessions[host] = session
+            return session
+
+    def _count_handshakes(self) -> int:
+        """
+        Counts all connections opened by the pools of every session.
+
+        Returns:
+            int: The total number of connections opened so far.
+        """
+        handshakes = 0
+        for session in self._sessions.values():
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    handshakes += getattr(pool, "num_connections", 0) if pool else 0
+        return handshakes
+
+    def get(self, url: str, **kwargs) -> rq.Response:
+        """
+        Sends a GET request through the pooled session of the URL's host.
+
+        The request waits for the host's rate limit. A request which fails transiently, or whose
+        response is a server error or throttles the client, is retried up to REQUEST_MAX_RETRIES times,
+        after the response's Retry-After delay or an exponential backoff. The last response
+        is returned, the last error is raised. While requests are cancelled, the request fails
+        instead of being sent, waiting for the rate limit or being retried.
+
+        Args:
+            url (str): The URL to fetch.
+            **kwargs: Additional keyword arguments passed to `requests.Session.get`.
+
+        Returns:
+            requests.Response: The response with its body already read.
+
+        Raises:
+            requests.RequestException: If the request fails.
+            RequestCancelledError: If requests are cancelled.
+        """
+        kwargs.setdefault("timeout", self._timeout)
+        host = urlparse(url).netloc
+        session = self._get_session(url)
+
+        backoff = 0
+
+        for retry in range(REQUEST_MAX_RETRIES + 1):
+            # a Retry-After delay is waited out by the rate limiter, other failures back off here
+            if self._cancelled.wait(backoff) or not self._rate_limiter.acquire(host, self._cancelled):
+                raise RequestCancelledError(f"Request to {url} cancelled.")
+            backoff = REQUEST_RETRY_DELAY * 2 ** retry
+
+            start = time.monotonic()
+            try:
+                response = session.get(url, **kwargs)
+            except rq.RequestException as e:
+                self._rate_limiter.release(host, time.monotonic() - start, False)
+                metrics.fetched_responses.inc(host=host, code="error")
+                if retry == REQUEST_MAX_RETRIES or not isinstance(e, self.TRANSIENT_ERRORS):
+                    raise
+                continue
+
+            throttled = response.status_code in self.THROTTLED_STATUSES
+            healthy = response.status_code < 500 and not throttled
+            retry_after = RateLimiter.parse_retry_after(response.headers.get("Retry-After")) if throttled else None
+            latency = time.monotonic() - start
+            self._rate_limiter.release(host, latency, healthy, retry_after)
+            bytes_received = response.raw.tell() if response.raw is not None else len(response.content)
+
+            with self._lock:
+                self._requests += 1
+                self._retries += bool(retry)
+                self._bytes_received += bytes_received
+                self._bytes_decoded += len(response.content)
+
+            metrics.fetch_duration.observe(latency, host=host)
+            metrics.fetched_responses.inc(host=host, code=response.status_code)
+            metrics.fetched_bytes.inc(bytes_received, host=host)
+
+            if healthy:
+                break
+            if retry_after is not None:
+                backoff = 0
+
+        return response
+
+    def cancel(self) -> None:
+        """
+        Cancels requests until resume is called: requests waiting to be sent or retried fail
+        right away and new requests fail without being sent. Requests already sent finish.
+        """
+        self._cancelled.set()
+        self._rate_limiter.interrupt()
+
+    def resume(self) -> None:
+        """
+        Lets requests be sent again after cancel.
+        """
+        self._cancelled.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns transfer statistics collected since the last reset.
+
+        Returns:
+            dict[str, int]: Numbers of requests, retries, connection handshakes, wire bytes and decoded bytes.
+        """
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "handshakes": self._count_handshakes() - self._handshakes_baseline,
+                "bytes_received": self._bytes_received,
+                "bytes_decoded": self._bytes_decoded
+            }
+
+    def reset_stats(self) -> None:
+        """
+        Resets transfer statistics, typically at the start of a Tasker run.
+        """
+        with self._lock:
+            self._requests = 0
+            self._retries = 0
+            self._bytes_received = 0
+            self._bytes_decoded = 0
+            self._handshakes_baseline = self._count_handshakes()
+
+    def close(self) -> None:
+        """
+        Closes all pooled sessions and their connections.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._handshakes_baseline = 0
+
+http_client = HttpClient()
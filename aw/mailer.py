@@ -1,88 +1,273 @@
+import base64
+import csv
 from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from email.mime.nonmultipart import MIMENonMultipart
+import gzip
+from html import escape
+import io
+from itertools import chain, islice, repeat
+from operator import attrgetter
 import smtplib
+import time
+from typing import Callable, Iterable, Iterator, TextIO
 
-from aw import LOGIN, PASSWORD, RECIPIENT, SERVER, PORT
+from aw import LOGIN, PASSWORD, RECIPIENT, SERVER, PORT, REPORT_INLINE_MAX_RECORDS, REPORT_PREVIEW_RECORDS, REPORT_MAX_ATTACHMENT_BYTES
 from aw.config import Config
 from aw.error import CloseThreadError
+from aw.metrics import metrics
+from aw.smtpconnection import SmtpConnection
 
 
-class Mailer:
-    @classmethod
-    def _compose_html_records_table(cls, records: list["Record"]) -> str: # type: ignore
+class _Base64Writer:
+    """
+    Stream encoding written text or bytes straight into a base64 MIME payload.
+
+    Text is UTF-8 encoded and base64 encoded in chunks as it is written, so the rendered
+    document never exists next to its encoded copy. Bytes are written as they are, so
+    the writer can back a gzip.GzipFile.
+
+    Attributes:
+        _pending (bytearray): Encoded text not yet forming a whole chunk.
+        _chunks (list[str]): Base64 lines of the whole chunks written so far.
+        size (int): Number of bytes written so far, before base64 encoding.
+    """
+    CHUNK_SIZE = 57 * 1024
+    """
+    Number of bytes encoded at once, a multiple of the 57 bytes filling one 76 character base64 line.
+    """
+
+    def __init__(self) -> None:
+        self._pending = bytearray()
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data: str | bytes) -> int:
         """
-        Composes an HTML table from a list of records.
+        Writes text or bytes to the payload.
 
         Args:
-            records (list[Record]): A list of Record objects to be included in the table.
+            data (str | bytes): The text or bytes to write.
 
         Returns:
-            str: An HTML string representing the table with the records.
+            int: Number of characters or bytes written.
+        """
+        encoded = data.encode() if isinstance(data, str) else data
+        self._pending += encoded
+        self.size += len(encoded)
+
+        if len(self._pending) >= self.CHUNK_SIZE:
+            whole_size = len(self._pending) - len(self._pending) % self.CHUNK_SIZE
+            self._chunks.append(base64.encodebytes(self._pending[:whole_size]).decode("ascii"))
+            del self._pending[:whole_size]
+
+        return len(data)
+
+    def flush(self) -> None:
         """
-        table_header = """\
-            <th>Book</th>
-            <th>Author</th>
-            <th>Price</th>
-            <th>Year</th>
-            <th>Publisher</th>
-            <th>Language</th>
-            <th>Link</th>
+        Does nothing, exists because gzip.GzipFile and io.TextIOWrapper flush the file they write to.
         """
+        pass
 
-        html_table = f"<table border='1' padding='2'><tr>{table_header}</tr>"
-        html_table_closing = "</table>"
+    def get_payload(self) -> str:
+        """
+        Finishes the payload.
+
+        Returns:
+            str: The base64 encoded text split into 76 character lines.
+        """
+        self._chunks.append(base64.encodebytes(self._pending).decode("ascii"))
+        self._pending = bytearray()
+        payload = "".join(self._chunks)
+        self._chunks = [payload]
+        return payload
 
+class Mailer:
+    RECORD_FIELDS = attrgetter("name", "author", "price", "issue_year", "publisher", "language", "link")
+    """
+    Getter of the record attributes shown in a report row, in the order of ROW_TEMPLATE placeholders.
+    """
+
+    TABLE_HEADER = (
+        "<table border='1' cellpadding='2'>\n"
+        "<tr><th>Book</th><th>Author</th><th>Price</th><th>Year</th>"
+        "<th>Publisher</th><th>Language</th><th>Link</th></tr>\n"
+    )
+    """
+    Opening of a report table including its header row.
+    """
+
+    ROW_TEMPLATE = (
+        "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td>"
+        "<td><a href=\"{}\">LINK</a></td></tr>\n"
+    ).format
+    """
+    Precompiled report row, formatted with the escaped RECORD_FIELDS of a record.
+    """
+
+    DOCUMENT_HEAD = (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset='utf-8'>\n"
+        "<title>Daily report</title>\n</head>\n<body>\n"
+    )
+    """
+    Opening of the report document.
+    """
+
+    DOCUMENT_TAIL = "</body>\n</html>\n"
+    """
+    Closing of the report document.
+    """
+
+    CSV_HEADER = ("status", "name", "author", "price", "issue_year", "publisher", "language", "link")
+    """
+    Header row of the CSV attachment, the status followed by RECORD_FIELDS.
+    """
+
+    @classmethod
+    def _write_html_records_table(cls, out: TextIO, records: Iterable["Record"]) -> None: # type: ignore
+        """
+        Writes an HTML table of records, one row at a time.
+
+        Every field is HTML escaped, rows are rendered by ROW_TEMPLATE, so rendering
+        takes linear time in the number of records.
+
+        Args:
+            out (TextIO): The stream receiving the HTML.
+            records (Iterable[Record]): Record objects to be included in the table, consumed once.
+        """
+        out.write(cls.TABLE_HEADER)
+
+        row_template = cls.ROW_TEMPLATE
+        record_fields = cls.RECORD_FIELDS
         for rec in records:
-            html_table += f"""
-                <tr>
-                    <td>{rec.name}</td>
-                    <td>{rec.author}</td>
-                    <td>{rec.price}</td>
-                    <td>{rec.issue_year}</td>
-                    <td>{rec.publisher}</td>
-                    <td>{rec.language}</td>
-                    <td><a href='{rec.link}'>LINK</a></td>
-                </tr>
-            """
-
-        html_table += html_table_closing
-
-        return html_table
+            out.write(row_template(*map(escape, record_fields(rec))))
+
+        out.write("</table>\n")
     
     @classmethod
-    def _compose_html_document(cls, html_table: str) -> str:
+    def _write_html_report(cls, out: TextIO, records: Iterable["Record"], disappeared_records: Iterable["Record"] | None) -> None: # type: ignore
         """
-        Composes an HTML document from the given HTML table.
+        Writes the HTML body of the report.
 
         Args:
-            html_table (str): An HTML string representing the table.
+            out (TextIO): The stream receiving the HTML.
+            records (Iterable[Record]): Records to report, the new listings if disappeared_records is given.
+            disappeared_records (Iterable[Record] | None): Listings gone since the previous run, None for a full report.
+        """
+        if disappeared_records is None:
+            cls._write_html_records_table(out, records)
+            return
 
-        Returns:
-            str: A complete HTML document as a string.
+        out.write("<h2>New listings</h2>\n")
+        cls._write_html_records_table(out, records)
+        out.write("<h2>Disappeared listings</h2>\n")
+        cls._write_html_records_table(out, disappeared_records)
+
+    @classmethod
+    def _write_html_document(cls, out: TextIO, records: Iterable["Record"], disappeared_records: Iterable["Record"] | None) -> None: # type: ignore
         """
-        html_document = f"""
-            <html>
-                <head>
-                    <meta charset='utf-8'>
-                    <title>Daily report</title>
-                </head>
-                <body>
-                    {html_table}
-                </body>
-            <html>
+        Writes a complete HTML document containing the report.
+
+        Args:
+            out (TextIO): The stream receiving the HTML.
+            records (Iterable[Record]): Records to report, see _write_html_report.
+            disappeared_records (Iterable[Record] | None): Listings gone since the previous run, see _write_html_report.
+        """
+        out.write(cls.DOCUMENT_HEAD)
+        cls._write_html_report(out, records, disappeared_records)
+        out.write(cls.DOCUMENT_TAIL)
+
+    @classmethod
+    def _render_html_part(cls, records: Iterable["Record"], disappeared_records: Iterable["Record"] | None) -> MIMENonMultipart: # type: ignore
+        """
+        Renders the report straight into a base64 encoded text/html MIME part.
+
+        Args:
+            records (Iterable[Record]): Records to report, see _write_html_report.
+            disappeared_records (Iterable[Record] | None): Listings gone since the previous run, see _write_html_report.
+
+        Returns:
+            MIMENonMultipart: The HTML part of the mail.
         """
+        writer = _Base64Writer()
+        cls._write_html_document(writer, records, disappeared_records)
+
+        html_part = MIMENonMultipart("text", "html", charset="utf-8")
+        html_part["Content-Transfer-Encoding"] = "base64"
+        html_part.set_payload(writer.get_payload())
 
-        return html_document
+        return html_part
     
     @classmethod
-    def _create_mail(cls, html_document: str, sender: str, recipient: str) -> MIMEMultipart:
+    def _write_csv_rows(cls, out: _Base64Writer, rows: Iterator[tuple[str, "Record"]], row: tuple[str, "Record"] | None, max_bytes: int) -> tuple[str, "Record"] | None: # type: ignore
+        """
+        Writes gzip compressed CSV rows until the compressed size reaches max_bytes.
+
+        At least one row is written, so every attachment carries some listings.
+
+        Args:
+            out (_Base64Writer): The payload receiving the compressed CSV.
+            rows (Iterator[tuple[str, Record]]): Statuses and records still to be written, consumed as written.
+            row (tuple[str, Record] | None): The first row to be written, taken from rows already.
+            max_bytes (int): Compressed size after which no further row is written.
+
+        Returns:
+            tuple[str, Record] | None: The first row which was not written, None if all rows were written.
+        """
+        record_fields = cls.RECORD_FIELDS
+        with io.TextIOWrapper(gzip.GzipFile(fileobj=out, mode="wb", mtime=0), encoding="utf-8", newline="") as text:
+            csv_writer = csv.writer(text)
+            csv_writer.writerow(cls.CSV_HEADER)
+            written = 0
+            while row is not None and (not written or out.size < max_bytes):
+                status, rec = row
+                csv_writer.writerow((status, *record_fields(rec)))
+                written += 1
+                row = next(rows, None)
+
+        return row
+
+    @classmethod
+    def _render_summary_part(cls, preview: list["Record"], new_count: int, disappeared_count: int, part: int) -> MIMENonMultipart: # type: ignore
+        """
+        Renders the compact summary sent in place of the full report next to a CSV attachment.
+
+        Args:
+            preview (list[Record]): The newest listings shown in the summary, empty in all but the first part.
+            new_count (int): Number of new listings in the whole report.
+            disappeared_count (int): Number of disappeared listings in the whole report.
+            part (int): Number of the message within the report, starting with 1.
+
+        Returns:
+            MIMENonMultipart: The HTML part of the mail.
+        """
+        writer = _Base64Writer()
+        writer.write(cls.DOCUMENT_HEAD)
+        writer.write(
+            f"<p>{new_count} new and {disappeared_count} disappeared listings found, "
+            f"too many to be shown here. Part {part} of the report is attached as a compressed CSV file.</p>\n"
+        )
+        if preview:
+            writer.write("<h2>Newest listings</h2>\n")
+            cls._write_html_records_table(writer, preview)
+        writer.write(cls.DOCUMENT_TAIL)
+
+        html_part = MIMENonMultipart("text", "html", charset="utf-8")
+        html_part["Content-Transfer-Encoding"] = "base64"
+        html_part.set_payload(writer.get_payload())
+
+        return html_part
+
+    @classmethod
+    def _create_mail(cls, html_part: MIMENonMultipart, sender: str, recipient: str, attachment: MIMENonMultipart | None = None, subject: str = "Daily report") -> MIMEMultipart:
         """
-        Creates an email message with the given HTML document.
+        Creates an email message with the given HTML part.
 
         Args:
-            html_document (str): The HTML content of the email.
+            html_part (MIMENonMultipart): The HTML content of the email, see _render_html_part.
             sender (str): The sender's email address.
             recipient (str): The recipient's email address.
+            attachment (MIMENonMultipart | None): An attachment, such as the gzip compressed CSV part built by compose_mails.
+            subject (str): The subject of the email.
 
         Returns:
             MIMEMultipart: The email message object.
@@ -90,52 +275,138 @@ class Mailer:
         message = MIMEMultipart()
         message["From"] = sender
         message["To"] = recipient
-        message["Subject"] = "Daily report"
-        message.attach(MIMEText(html_document, "html"))
+        message["Subject"] = subject
+        message.attach(html_part)
+        if attachment is not None:
+            message.attach(attachment)
 
         return message
     
     @classmethod
-    def send_mail(cls, records: list["Record"], config: Config) -> dict: # type: ignore
+    def compose_mail(cls, records: Iterable["Record"], sender: str, recipient: str, disappeared_records: Iterable["Record"] | None = None) -> MIMEMultipart: # type: ignore
         """
-        Composes HTML mail response containing list of Record objects
-        and sends mail via smtp server according to configuration provided.
-        
+        Composes the HTML report mail, consuming streamed records as the report is written.
+
+        Args:
+            records (Iterable[Record]): Record objects to report, see _write_html_report
+            sender (str): sender address
+            recipient (str): recipient address
+            disappeared_records (Iterable[Record] | None): listings gone since the previous run, see _write_html_report
+
+        Returns:
+            MIMEMultipart: the mail, ready to be sent or queued in the outbox
+        """
+        return cls._create_mail(cls._render_html_part(records, disappeared_records), sender, recipient)
+
+    @classmethod
+    def compose_mails(cls, records: Iterable["Record"], sender: str, recipient: str, disappeared_records: Iterable["Record"] | None = None, new_count: int | None = None, disappeared_count: int = 0, max_attachment_bytes: int = REPORT_MAX_ATTACHMENT_BYTES) -> Iterator[MIMEMultipart]: # type: ignore
+        """
+        Composes the report as one or more mails, sized for mail servers and clients.
+
+        A report of at most REPORT_INLINE_MAX_RECORDS listings is one inline HTML mail, see compose_mail.
+        A larger report is a compact summary previewing the newest listings with the whole report
+        attached as a gzip compressed CSV file. Once the attachment reaches max_attachment_bytes,
+        the rest of the report continues in another message. Messages are composed lazily,
+        so only the message being composed is held in memory.
+
+        Args:
+            records (Iterable[Record]): Record objects to report, see _write_html_report
+            sender (str): sender address
+            recipient (str): recipient address
+            disappeared_records (Iterable[Record] | None): listings gone since the previous run, see _write_html_report
+            new_count (int | None): number of records, None to always compose one inline mail
+            disappeared_count (int): number of disappeared records
+            max_attachment_bytes (int): compressed size of the attachment after which the report is split
+
+        Yields:
+            MIMEMultipart: the mails, ready to be sent or queued in the outbox one by one
+        """
+        start = time.perf_counter()
+
+        if new_count is None or new_count + disappeared_count <= REPORT_INLINE_MAX_RECORDS:
+            message = cls.compose_mail(records, sender, recipient, disappeared_records)
+            metrics.mail_render_duration.observe(time.perf_counter() - start)
+            yield message
+            return
+
+        records = iter(records)
+        preview = list(islice(records, REPORT_PREVIEW_RECORDS))
+        rows = chain(
+            zip(repeat("new"), chain(preview, records)),
+            zip(repeat("disappeared"), disappeared_records or ())
+        )
+        row = next(rows, None)
+        part = 0
+
+        while row is not None:
+            part += 1
+            writer = _Base64Writer()
+            row = cls._write_csv_rows(writer, rows, row, max_attachment_bytes)
+
+            attachment = MIMENonMultipart("application", "gzip")
+            attachment["Content-Transfer-Encoding"] = "base64"
+            attachment.add_header("Content-Disposition", "attachment", filename=f"report-part{part}.csv.gz")
+            attachment.set_payload(writer.get_payload())
+
+            subject = "Daily report" if part == 1 and row is None else f"Daily report (part {part})"
+            summary = cls._render_summary_part(preview if part == 1 else [], new_count, disappeared_count, part)
+            message = cls._create_mail(summary, sender, recipient, attachment, subject)
+            metrics.mail_render_duration.observe(time.perf_counter() - start)
+            yield message
+            start = time.perf_counter()
+
+    @classmethod
+    def create_connection(cls, config: Config, connection_factory: Callable[[str, int], smtplib.SMTP] = smtplib.SMTP_SSL) -> SmtpConnection:
+        """
+        Creates an SMTP connection according to configuration provided, to be shared by several mails.
+
         Args:
-            records (list[Record]): list of Record objects representing a book record
             config (Config): configuration handler
+            connection_factory (Callable[[str, int], smtplib.SMTP]): creates the underlying connection
 
         Raises:
-            CloseThreadError
+            CloseThreadError: If the mailer configuration is incomplete.
 
         Returns:
-            dict: messages which were not successfully sent, if empty, sending was successful
+            SmtpConnection: connection which opens on the first mail sent
         """
         try:
             cf_dict = config.get_mailer_keys()
-            login = cf_dict[LOGIN]
-            password = cf_dict[PASSWORD]
-            recipient = cf_dict[RECIPIENT]
-            server = cf_dict[SERVER]
-            port = cf_dict[PORT]
+            return SmtpConnection(cf_dict[SERVER], cf_dict[PORT], cf_dict[LOGIN], cf_dict[PASSWORD], connection_factory)
         except KeyError as e:
             raise CloseThreadError from e
 
-        html_table = cls._compose_html_records_table(records)
-        html_document = cls._compose_html_document(html_table)
-        message = cls._create_mail(html_document, login, recipient)
-
-        result = {}
+    @classmethod
+    def send_mail(cls, records: Iterable["Record"], config: Config, disappeared_records: Iterable["Record"] | None = None, recipient: str | None = None, connection: SmtpConnection | None = None) -> dict: # type: ignore
+        """
+        Composes HTML mail response containing Record objects
+        and sends mail via smtp server according to configuration provided.
 
-        try:
-            with smtplib.SMTP_SSL(server, port) as server:
-                server.login(login, password)
-                result = server.send_message(message)
-        except smtplib.SMTPAuthenticationError as e:
-            raise CloseThreadError(f"Autenthication to mail server failed: {e}")
-        except smtplib.SMTPConnectError as e:
-            raise CloseThreadError(f"Connection to SMTO server failed: {e}")
-        except smtplib.SMTPException as e:
-            raise CloseThreadError(f"Unexpected error during SMTP connection: {e}")
+        Records may be streamed, the report is written as they are consumed.
         
-        return result
\ No newline at end of file
+        Args:
+            records (Iterable[Record]): Record objects representing a book record
+            config (Config): configuration handler
+            disappeared_records (Iterable[Record] | None): listings gone since the previous run,
+                if given, records are reported as new listings next to them
+            recipient (str | None): recipient address, the recipient from config by default
+            connection (SmtpConnection | None): connection shared by several mails,
+                a connection used for this mail only by default
+
+        Raises:
+            CloseThreadError
+
+        Returns:
+            dict: messages which were not successfully sent, if empty, sending was successful
+        """
+        if recipient is None:
+            try:
+                recipient = config.get_mailer_keys()[RECIPIENT]
+            except KeyError as e:
+                raise CloseThreadError from e
+
+        if connection is None:
+            with cls.create_connection(config) as connection:
+                return cls.send_mail(records, config, disappeared_records, recipient, connection)
+
+        return connection.send(cls.compose_mail(records, connection.sender, recipient, disappeared_records))
@@ -0,0 +1,233 @@
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+from os.path import join
+import threading
+
+from aw import ROOT_DIR, METRICS_FILE
+from aw.logger import logger
+
+class _Metric:
+    """
+    A named metric with one series per combination of label values.
+
+    Attributes:
+        name (str): The metric name.
+        description (str): The description exposed as HELP.
+        label_names (tuple[str, ...]): Names of the labels every series is identified by.
+        _lock (threading.Lock): Lock guarding the series.
+        _series (dict[tuple[str, ...], object]): Series values keyed by label values.
+    """
+    TYPE = "untyped"
+    """
+    The metric type exposed as TYPE.
+    """
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _get_key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @classmethod
+    def _format_labels(cls, names: tuple[str, ...], values: tuple[str, ...]) -> str:
+        """
+        Formats a label set, escaping the values as the exposition format requires.
+
+        Args:
+            names (tuple[str, ...]): The label names.
+            values (tuple[str, ...]): The label values.
+
+        Returns:
+            str: The label set in braces, empty without labels.
+        """
+        if not names:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in values)
+        return "{" + ",".join(f"{name}=\"{value}\"" for name, value in zip(names, escaped)) + "}"
+
+    def _render_samples(self, key: tuple[str, ...], value: object) -> list[str]:
+        return [f"{self.name}{self._format_labels(self.label_names, key)} {value}"]
+
+    def render(self) -> str:
+        """
+        Renders the metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The HELP and TYPE lines followed by the samples of every series.
+        """
+        with self._lock:
+            series = sorted(self._series.items())
+
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.TYPE}"]
+        for key, value in series:
+            lines.extend(self._render_samples(key, value))
+        return "\n".join(lines) + "\n"
+
+class _Counter(_Metric):
+    TYPE = "counter"
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+class _Gauge(_Metric):
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._series[key] = value
+
+class _Histogram(_Metric):
+    """
+    A metric counting observations into cumulative buckets, see _Metric.
+
+    Every series holds the observation count per bucket (the last one being +Inf) and their sum.
+    """
+    TYPE = "histogram"
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    """
+    Buckets (in seconds) suited for request and processing latencies.
+    """
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, description, label_names)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _render_samples(self, key: tuple[str, ...], value: list) -> list[str]:
+        counts, total = value
+        names = (*self.label_names, "le")
+        lines = []
+        cumulative = 0
+
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._format_labels(names, (*key, bound))} {cumulative}")
+
+        labels = self._format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+class Metrics:
+    """
+    Counters and histograms of the whole pipeline, exposed in the Prometheus text format.
+
+    The Tasker writes them into METRICS_FILE after every run (readable by the node exporter
+    textfile collector), and they can be served from a local endpoint, see serve.
+    Metrics are cumulative over the lifetime of the process, as Prometheus expects.
+
+    Attributes:
+        fetch_duration (_Histogram): HTTP request latency per host.
+        fetched_responses (_Counter): HTTP responses per host and status code.
+        fetched_bytes (_Counter): Body bytes read from the wire per host.
+        scraped_pages (_Counter): Pages scraped per scraper.
+        scraped_records (_Counter): Records scraped per scraper.
+        skipped_records (_Counter): Malformed records skipped per scraper.
+        filter_duration (_Histogram): Time spent filtering one page for all of its queries.
+        passed_records (_Counter): Records passing the constraints per query.
+        mail_render_duration (_Histogram): Time spent composing one mail.
+        mail_send_duration (_Histogram): Time spent delivering one mail.
+        sent_mails (_Counter): Delivery attempts per result.
+        run_duration (_Histogram): Duration of Tasker runs per crawl mode.
+        runs (_Counter): Tasker runs per crawl mode and result.
+        last_run_timestamp (_Gauge): Unix time the last Tasker run finished.
+        _metrics (list[_Metric]): Every metric in exposition order.
+        _server (ThreadingHTTPServer | None): The metrics endpoint once served.
+    """
+    RUN_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+    """
+    Buckets (in seconds) suited for whole runs.
+    """
+
+    def __init__(self) -> None:
+        self.fetch_duration = _Histogram("aw_fetch_duration_seconds", "HTTP request latency.", ("host",))
+        self.fetched_responses = _Counter("aw_fetched_responses_total", "HTTP responses received.", ("host", "code"))
+        self.fetched_bytes = _Counter("aw_fetched_bytes_total", "HTTP body bytes read from the wire.", ("host",))
+        self.scraped_pages = _Counter("aw_scraped_pages_total", "Result pages scraped.", ("scraper",))
+        self.scraped_records = _Counter("aw_scraped_records_total", "Records scraped.", ("scraper",))
+        self.skipped_records = _Counter("aw_skipped_records_total", "Malformed records skipped while parsing.", ("scraper",))
+        self.filter_duration = _Histogram("aw_filter_duration_seconds", "Time spent filtering a page for all of its queries.")
+        self.passed_records = _Counter("aw_passed_records_total", "Records passing the constraints of a query.", ("query",))
+        self.mail_render_duration = _Histogram("aw_mail_render_duration_seconds", "Time spent composing a mail.")
+        self.mail_send_duration = _Histogram("aw_mail_send_duration_seconds", "Time spent delivering a mail.")
+        self.sent_mails = _Counter("aw_sent_mails_total", "Mail delivery attempts.", ("result",))
+        self.run_duration = _Histogram("aw_run_duration_seconds", "Duration of Tasker runs.", ("mode",), self.RUN_BUCKETS)
+        self.runs = _Counter("aw_runs_total", "Tasker runs.", ("mode", "result"))
+        self.last_run_timestamp = _Gauge("aw_last_run_timestamp_seconds", "Unix time the last Tasker run finished.")
+        self._metrics = [metric for metric in vars(self).values() if isinstance(metric, _Metric)]
+        self._server = None
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition.
+        """
+        return "".join(metric.render() for metric in self._metrics)
+
+    def write(self, filepath: str | None = None) -> None:
+        """
+        Writes all metrics into a file atomically, so a collector never reads a partial file.
+
+        Args:
+            filepath (str | None): The file, METRICS_FILE by default.
+        """
+        filepath = filepath or join(ROOT_DIR, METRICS_FILE)
+
+        try:
+            with open(filepath + ".tmp", "w", encoding="utf-8") as file:
+                file.write(self.render())
+            os.replace(filepath + ".tmp", filepath)
+        except IOError as e:
+            logger.log_error(f"Unable to write metrics to {filepath}: {e}")
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """
+        Serves all metrics over HTTP from a daemon thread.
+
+        Args:
+            port (int): The port to listen on.
+            host (str): The address to listen on, only the local host by default.
+        """
+        try:
+            self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.log_error(f"Unable to serve metrics on {host}:{port}: {e}")
+            return
+
+        self._server.daemon_threads = True
+        self._server.metrics = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.log_success(f"Metrics served on http://{host}:{port}/metrics")
+
+metrics = Metrics()
@@ -0,0 +1,149 @@
+from email.generator import BytesGenerator
+from email.message import Message
+from email.parser import BytesHeaderParser
+from email.utils import getaddresses
+import os
+from os.path import join
+import threading
+import time
+import uuid
+
+from aw import ROOT_DIR, OUTBOX_DIR
+from aw.error import CloseThreadError
+
+class Outbox:
+    """
+    Durable directory of rendered reports waiting to be delivered.
+
+    Every message is written atomically into its own .eml file, so a report survives a mail
+    outage or a restart and is never lost once the Tasker queued it. File names start with
+    the queueing time, so messages are delivered in the order they were queued.
+    Messages which cannot be delivered at all are moved into the failed subdirectory.
+
+    Attributes:
+        _outbox_dir (str): Directory storing the queued messages.
+        _condition (threading.Condition): Signalled whenever a message is queued.
+        _version (int): Number of times waiters were woken up, incremented by every queued message.
+    """
+    FAILED_DIR = "failed"
+    """
+    Subdirectory of undeliverable messages.
+    """
+
+    def __init__(self, outbox_dir: str | None = None) -> None:
+        self._outbox_dir = outbox_dir or join(ROOT_DIR, OUTBOX_DIR)
+        self._condition = threading.Condition()
+        self._version = 0
+
+    def put(self, message: Message) -> str:
+        """
+        Queues a message, writing it to disk before returning.
+
+        Args:
+            message (Message): The message, its From and To headers define the envelope.
+
+        Returns:
+            str: Name of the queued message.
+
+        Raises:
+            CloseThreadError: If the message cannot be written.
+        """
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.eml"
+        filepath = join(self._outbox_dir, name)
+
+        try:
+            os.makedirs(self._outbox_dir, exist_ok=True)
+            with open(filepath + ".tmp", "wb") as file:
+                BytesGenerator(file).flatten(message, linesep="\r\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(filepath + ".tmp", filepath)
+        except IOError as e:
+            raise CloseThreadError(f"Unable to queue message: {e}")
+
+        self.interrupt()
+        return name
+
+    def get_version(self) -> int:
+        """
+        Returns the current version, read before listing the outbox and passed to wait.
+
+        Returns:
+            int: The version of the outbox.
+        """
+        with self._condition:
+            return self._version
+
+    def wait(self, version: int, timeout: float | None) -> None:
+        """
+        Waits until a message is queued after the given version or the timeout expires.
+
+        Args:
+            version (int): The version the caller has seen, see get_version.
+            timeout (float | None): Maximum number of seconds to wait, None to wait indefinitely.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout)
+
+    def interrupt(self) -> None:
+        """
+        Wakes up all waiters as if a message was queued.
+        """
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+
+    def get_names(self) -> list[str]:
+        """
+        Lists the queued messages.
+
+        Returns:
+            list[str]: Names of the queued messages in the order they were queued.
+        """
+        try:
+            return sorted(name for name in os.listdir(self._outbox_dir) if name.endswith(".eml"))
+        except FileNotFoundError:
+            return []
+
+    def read(self, name: str) -> tuple[str, list[str], bytes]:
+        """
+        Reads a queued message.
+
+        Args:
+            name (str): Name of the message.
+
+        Returns:
+            tuple[str, list[str], bytes]: The envelope sender, the envelope recipients and the message.
+
+        Raises:
+            IOError: If the message cannot be read.
+        """
+        with open(join(self._outbox_dir, name), "rb") as file:
+            data = file.read()
+
+        headers = BytesHeaderParser().parsebytes(data)
+        sender = getaddresses(headers.get_all("From", []))[0][1]
+        recipients = [address for _, address in getaddresses(headers.get_all("To", []) + headers.get_all("Cc", []))]
+
+        return sender, recipients, data
+
+    def remove(self, name: str) -> None:
+        """
+        Removes a delivered message.
+
+        Args:
+            name (str): Name of the message.
+        """
+        os.remove(join(self._outbox_dir, name))
+
+    def move_to_failed(self, name: str) -> None:
+        """
+        Moves an undeliverable message aside, keeping it for inspection.
+
+        Args:
+            name (str): Name of the message.
+        """
+        os.makedirs(join(self._outbox_dir, self.FAILED_DIR), exist_ok=True)
+        os.replace(join(self._outbox_dir, name), join(self._outbox_dir, self.FAILED_DIR, name))
+
+outbox = Outbox()
@@ -0,0 +1,183 @@
+import random
+import smtplib
+import threading
+import time
+from typing import Callable
+
+from aw import OUTBOX_RETRY_BASE_DELAY, OUTBOX_RETRY_MAX_DELAY, OUTBOX_MAX_ATTEMPTS
+from aw.config import Config
+from aw.error import CloseThreadError
+from aw.logger import logger
+from aw.mailer import Mailer
+from aw.metrics import metrics
+from aw.outbox import Outbox, outbox as shared_outbox
+
+class OutboxSender:
+    """
+    Background thread delivering the messages queued in the outbox.
+
+    The sender wakes up whenever a message is queued, delivers every due message over one
+    SMTP connection and deletes it once the server accepted it. A message which fails is
+    retried with exponential backoff (with jitter) up to OUTBOX_MAX_ATTEMPTS times and then
+    moved aside. Scraping therefore never waits for SMTP, and a mail outage never loses a report.
+
+    Attributes:
+        _config (Config): Configuration handler, the mailer keys are read before every delivery.
+        _outbox (Outbox): The outbox to deliver.
+        _connection_factory (Callable[[str, int], smtplib.SMTP]): Creates the underlying SMTP connection.
+        _attempts (dict[str, int]): Failed delivery attempts per message name.
+        _next_attempt (dict[str, float]): Monotonic time of the next attempt per failed message name.
+        _stopped (threading.Event): Set when the sender should stop.
+        _thread (threading.Thread | None): The sender thread once started.
+    """
+    def __init__(self, config: Config, outbox: Outbox = shared_outbox, connection_factory: Callable[[str, int], smtplib.SMTP] = smtplib.SMTP_SSL) -> None:
+        self._config = config
+        self._outbox = outbox
+        self._connection_factory = connection_factory
+        self._attempts = {}
+        self._next_attempt = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _get_retry_delay(self, attempts: int) -> float:
+        """
+        Computes the delay before the next attempt.
+
+        Args:
+            attempts (int): Number of failed attempts so far.
+
+        Returns:
+            float: Number of seconds to wait, between half and the full exponential delay.
+        """
+        delay = min(OUTBOX_RETRY_MAX_DELAY, OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1)
+
+    def _fail(self, name: str, reason: str) -> None:
+        """
+        Records a failed attempt and schedules a retry, or moves the message aside after the last attempt.
+
+        Args:
+            name (str): Name of the message.
+            reason (str): Why the attempt failed.
+        """
+        attempts = self._attempts.get(name, 0) + 1
+
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.log_error(f"Message {name} is undeliverable after {attempts} attempts: {reason}")
+            self._forget(name)
+            try:
+                self._outbox.move_to_failed(name)
+            except IOError as e:
+                logger.log_error(f"Unable to move undeliverable message {name}: {e}")
+            return
+
+        delay = self._get_retry_delay(attempts)
+        logger.log_error(f"Delivery of message {name} failed (attempt {attempts}), retrying in {delay:.0f} s: {reason}")
+        self._attempts[name] = attempts
+        self._next_attempt[name] = time.monotonic() + delay
+
+    def _forget(self, name: str) -> None:
+        self._attempts.pop(name, None)
+        self._next_attempt.pop(name, None)
+
+    def deliver_due(self) -> int:
+        """
+        Delivers every queued message whose retry delay expired, all over one SMTP connection.
+
+        Retries of messages which are no longer queued, e.g. deleted from the outbox by hand, are forgotten.
+
+        Returns:
+            int: Number of delivered messages.
+        """
+        now = time.monotonic()
+        queued = self._outbox.get_names()
+        for name in (self._attempts.keys() | self._next_attempt.keys()) - set(queued):
+            self._forget(name)
+        names = [name for name in queued if self._next_attempt.get(name, now) <= now]
+        delivered = 0
+
+        if not names:
+            return delivered
+
+        try:
+            connection = Mailer.create_connection(self._config, self._connection_factory)
+        except CloseThreadError as e:
+            for name in names:
+                self._fail(name, f"mailer is not configured: {e}")
+            return delivered
+
+        with connection:
+            for name in names:
+                if self._stopped.is_set():
+                    break
+
+                try:
+                    sender, recipients, data = self._outbox.read(name)
+                except FileNotFoundError:
+                    self._forget(name)
+                    continue
+                except (IOError, IndexError) as e:
+                    self._fail(name, f"message cannot be read: {e}")
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    refused = connection.send_bytes(sender, recipients, data)
+                except CloseThreadError as e:
+                    metrics.sent_mails.inc(result="failed")
+                    self._fail(name, str(e))
+                    continue
+                finally:
+                    metrics.mail_send_duration.observe(time.perf_counter() - start)
+
+                if refused and len(refused) == len(recipients):
+                    metrics.sent_mails.inc(result="refused")
+                    self._fail(name, f"all recipients were refused: {refused}")
+                    continue
+                if refused:
+                    logger.log_error(f"Message {name} was refused by some recipients: {refused}")
+                metrics.sent_mails.inc(result="delivered")
+
+                self._forget(name)
+                self._outbox.remove(name)
+                delivered += 1
+                logger.log_success(f"Message {name} delivered to {', '.join(recipients)}.")
+
+        return delivered
+
+    def _get_timeout(self) -> float | None:
+        """
+        Computes how long the sender may sleep.
+
+        Returns:
+            float | None: Seconds until the next retry is due, None if no retry is scheduled.
+        """
+        if not self._next_attempt:
+            return None
+        return max(0, min(self._next_attempt.values()) - time.monotonic())
+
+    def _run(self) -> None:
+        """
+        Delivers due messages and sleeps until a message is queued or a retry is due, until stopped.
+        """
+        while not self._stopped.is_set():
+            version = self._outbox.get_version()
+            try:
+                self.deliver_due()
+            except Exception as e:
+                logger.log_error(f"Outbox delivery failed: {e}")
+            self._outbox.wait(version, self._get_timeout())
+
+    def start(self) -> None:
+        """
+        Starts the sender thread, delivering messages left in the outbox by previous runs first.
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the sender thread after the message being delivered.
+        """
+        self._stopped.set()
+        self._outbox.interrupt()
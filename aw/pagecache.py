@@ -0,0 +1,212 @@
+from collections import OrderedDict
+import hashlib
+import os
+from os.path import join
+import pickle
+import threading
+from typing import Any, Callable
+
+from aw import ROOT_DIR, PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES
+from aw.httpclient import http_client
+from aw.logger import logger
+from aw.scraperregistry import scraper_registry
+
+class PageCache:
+    """
+    Size-bounded on-disk cache of fetched pages and of the results parsed from them.
+
+    Every entry holds the content hash of the page body, the validators sent by the server
+    (ETag, Last-Modified), whatever the plugin parsed from the body and the version of the
+    parser. Cached pages are revalidated with conditional requests when the server supports
+    them, otherwise the body is downloaded and compared by hash. Either way an unchanged page
+    is never parsed again, unless it was parsed by another version of the plugin, e.g. before
+    the plugin was edited and reloaded. Entries are evicted in least recently used order once
+    the cache exceeds its size.
+
+    Attributes:
+        _cache_dir (str): Directory storing one pickle file per URL.
+        _max_bytes (int): Maximum total size of the cache files.
+        _index (OrderedDict[str, int]): File sizes keyed by file name, least recently used first.
+        _size (int): Total size of the cache files.
+        _lock (threading.Lock): Lock guarding the index, files and statistics.
+        _stats (dict[str, int]): Numbers of hits, misses and revalidations since the last reset.
+    """
+    def __init__(self, cache_dir: str | None = None, max_bytes: int = PAGE_CACHE_MAX_BYTES) -> None:
+        self._cache_dir = cache_dir or join(ROOT_DIR, PAGE_CACHE_DIR)
+        self._max_bytes = max_bytes
+        self._index = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0}
+
+        if os.path.isdir(self._cache_dir):
+            entries = [entry for entry in os.scandir(self._cache_dir) if entry.is_file()]
+            for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+                self._index[entry.name] = entry.stat().st_size
+                self._size += entry.stat().st_size
+
+    def _get_file_name(self, url: str) -> str:
+        """
+        Derives the cache file name of a URL.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            str: The file name of the cache entry.
+        """
+        return hashlib.sha256(url.encode()).hexdigest() + ".pickle"
+
+    def _load_entry(self, url: str) -> dict | None:
+        """
+        Loads the cache entry of a URL and marks it as recently used.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            dict | None: The cache entry, or None if the URL is not cached or the entry is unreadable.
+        """
+        file_name = self._get_file_name(url)
+
+        with self._lock:
+            if file_name not in self._index:
+                return None
+            try:
+                with open(join(self._cache_dir, file_name), "rb") as file:
+                    entry = pickle.load(file)
+                os.utime(join(self._cache_dir, file_name))
+                self._index.move_to_end(file_name)
+                return entry
+            except (IOError, pickle.PickleError, EOFError, AttributeError, ImportError) as e:
+                logger.log_error(f"Unable to read cached page {url}: {e}")
+                return None
+
+    def _store_entry(self, url: str, entry: dict) -> None:
+        """
+        Writes the cache entry of a URL and evicts least recently used entries over the size limit.
+
+        Args:
+            url (str): The page URL.
+            entry (dict): The cache entry.
+        """
+        file_name = self._get_file_name(url)
+
+        with self._lock:
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                data = pickle.dumps(entry)
+                with open(join(self._cache_dir, file_name), "wb") as file:
+                    file.write(data)
+            except (IOError, pickle.PickleError) as e:
+                logger.log_error(f"Unable to cache page {url}: {e}")
+                return
+
+            self._size += len(data) - self._index.pop(file_name, 0)
+            self._index[file_name] = len(data)
+
+            while self._size > self._max_bytes and len(self._index) > 1:
+                evicted_name, evicted_size = self._index.popitem(last=False)
+                self._size -= evicted_size
+                try:
+                    os.remove(join(self._cache_dir, evicted_name))
+                except IOError as e:
+                    logger.log_error(f"Unable to evict cached page {evicted_name}: {e}")
+
+    def _get_parser_version(self, parse: Callable[[str], Any]) -> str:
+        """
+        Identifies the version of a parse function, its module and the content hash of the plugin
+        file it was loaded from, or the hash of its code if it does not come from a plugin.
+
+        Args:
+            parse (Callable[[str], Any]): Plugin function parsing the page body.
+
+        Returns:
+            str: The parser version.
+        """
+        module_name = getattr(parse, "__module__", None)
+        digest = scraper_registry.get_module_digest(module_name)
+        if digest is None:
+            code = getattr(getattr(parse, "__func__", parse), "__code__", None)
+            digest = hashlib.sha256(code.co_code if code is not None else repr(parse).encode()).hexdigest()
+        return f"{module_name}:{digest}"
+
+    def fetch(self, url: str, parse: Callable[[str], Any]) -> Any:
+        """
+        Returns the parsed content of a page, parsing it only when the page changed.
+
+        Args:
+            url (str): The page URL.
+            parse (Callable[[str], Any]): Plugin function parsing the page body, its result must be picklable.
+
+        Returns:
+            Any: The result of parse for the current page content.
+
+        Raises:
+            requests.RequestException: If the page cannot be fetched.
+        """
+        parser = self._get_parser_version(parse)
+        entry = self._load_entry(url)
+        if entry is not None and entry.get("parser") != parser:
+            entry = None
+        headers = {}
+
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = http_client.get(url, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self._stats["revalidations"] += 1
+            return entry["parsed"]
+
+        response.raise_for_status()
+        body = response.text
+        digest = hashlib.sha256(body.encode()).hexdigest()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if entry is not None and entry["digest"] == digest:
+            with self._lock:
+                self._stats["hits"] += 1
+            if (entry["etag"], entry["last_modified"]) == (etag, last_modified):
+                return entry["parsed"]
+            parsed = entry["parsed"]
+        else:
+            with self._lock:
+                self._stats["misses"] += 1
+            parsed = parse(body)
+
+        self._store_entry(url, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "digest": digest,
+            "parser": parser,
+            "parsed": parsed
+        })
+
+        return parsed
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns cache statistics collected since the last reset.
+
+        Returns:
+            dict[str, int]: Numbers of hits, misses and revalidations.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        """
+        Resets cache statistics, typically at the start of a Tasker run.
+        """
+        with self._lock:
+            self._stats = {"hits": 0, "misses": 0, "revalidations": 0}
+
+page_cache = PageCache()
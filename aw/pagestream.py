@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from typing import Any, Iterator
+
+from aw import STREAM_MAX_PAGES
+from aw.error import StreamClosedError
+
+class PageStream:
+    """
+    Bounded channel passing pages of records from scraper threads to a single consumer.
+
+    Producers block while the stream is full, so pages are scraped no faster than they are
+    filtered and stored and at most `max_pages` pages wait in memory. Once the consumer stops
+    reading, blocked and future puts raise StreamClosedError. A stream with a deadline stops
+    itself when the deadline passes, the items already put can then be drained.
+
+    Attributes:
+        _queue (queue.Queue): The pages waiting for the consumer, followed by the end marker.
+        _stopped (threading.Event): Set when the consumer stopped reading.
+        _deadline (float | None): Monotonic time the stream stops at, None for no deadline.
+        expired (bool): Whether the stream stopped because its deadline passed.
+    """
+    POLL_INTERVAL = 0.1
+    """
+    Number of seconds a blocked producer waits before checking whether the consumer stopped.
+    """
+
+    _END = object()
+
+    def __init__(self, max_pages: int = STREAM_MAX_PAGES, deadline: float | None = None) -> None:
+        self._queue = queue.Queue(maxsize=max_pages)
+        self._stopped = threading.Event()
+        self._deadline = deadline
+        self.expired = False
+
+    def put(self, item: Any) -> None:
+        """
+        Passes an item to the consumer, waiting while the stream is full.
+
+        Args:
+            item (Any): The item, typically a page of records.
+
+        Raises:
+            StreamClosedError: If the consumer stopped reading.
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=self.POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+        raise StreamClosedError("The consumer stopped reading the stream.")
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """
+        Marks the end of the stream, called once all producers finished.
+
+        Args:
+            error (BaseException | None): The error which stopped the producers, re-raised to the consumer.
+        """
+        try:
+            self.put((self._END, error))
+        except StreamClosedError:
+            pass
+
+    def stop(self) -> None:
+        """
+        Stops the stream from the consumer side, unblocking all producers.
+        """
+        self._stopped.set()
+
+    def _get(self) -> Any:
+        """
+        Takes the next item, waiting for it until the deadline passes.
+
+        Returns:
+            Any: The item, or the end marker once the deadline passed.
+        """
+        if self._deadline is None:
+            return self._queue.get()
+
+        remaining = self._deadline - time.monotonic()
+        if remaining > 0:
+            try:
+                return self._queue.get(timeout=remaining)
+            except queue.Empty:
+                pass
+
+        self.expired = True
+        self.stop()
+        return (self._END, None)
+
+    def drain(self) -> Iterator[Any]:
+        """
+        Yields the items left in a stopped stream, to be called once all producers finished.
+        """
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not (isinstance(item, tuple) and len(item) == 2 and item[0] is self._END):
+                yield item
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Yields items in the order they were put until the stream finishes or its deadline passes.
+
+        Raises:
+            BaseException: The error the stream was finished with, if any.
+        """
+        while True:
+            item = self._get()
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is self._END:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
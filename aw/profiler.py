@@ -0,0 +1,280 @@
+import cProfile
+from collections import Counter
+from datetime import datetime
+import os
+from os.path import join
+from pathlib import Path
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from types import CodeType
+
+from aw import (
+    ROOT_DIR, LOG_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_SNAPSHOT_INTERVAL, PROFILE_MAX_SNAPSHOTS,
+    PROFILE_TRACEBACK_DEPTH, PROFILE_TOP_ALLOCATIONS
+)
+from aw.config import Config
+from aw.logger import logger
+from aw.querymanager import QueryManager
+from aw.tasker import Tasker
+
+class _Sampler(threading.Thread):
+    """
+    Daemon thread sampling the stacks of the profiled threads and snapshotting the traced memory.
+
+    Snapshots are only kept while profiling and broken down once the traced memory is no
+    longer traced, as the breakdown's own allocations would be traced too and slow it down
+    by orders of magnitude. Beyond max_snapshots, every other snapshot is dropped and the
+    interval between snapshots doubled, so their number stays bounded however long the run.
+
+    Attributes:
+        interval (float): Number of seconds between two stack samples.
+        snapshot_interval (float): Number of seconds between two snapshots.
+        max_snapshots (int): Maximum number of snapshots kept.
+        stacks (Counter[str]): Sample counts per collapsed stack, rooted at the thread name.
+        snapshots (list[tracemalloc.Snapshot]): Snapshots of the traced memory in the order they were taken.
+        _ignored (set[int]): Identifiers of the threads which are not sampled.
+        _labels (dict[CodeType, str]): Stack frame labels of the code objects seen so far.
+        _stopped (threading.Event): Set once sampling should stop.
+    """
+    def __init__(self, interval: float, snapshot_interval: float, max_snapshots: int, ignored: set[int]) -> None:
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.max_snapshots = max_snapshots
+        self.stacks = Counter()
+        self.snapshots = []
+        self._ignored = ignored
+        self._labels = {}
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        next_snapshot = time.monotonic()
+
+        while not self._stopped.wait(self.interval):
+            self._sample_stacks()
+            if time.monotonic() >= next_snapshot:
+                self.snapshot()
+                next_snapshot = time.monotonic() + self.snapshot_interval
+
+    def _sample_stacks(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident in self._ignored or ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code not in self._labels:
+                    self._labels[code] = f"{code.co_name} ({Profiler._format_filename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(self._labels[code])
+                frame = frame.f_back
+            # pool workers differ only by their number, merging them keeps the flamegraph readable
+            stack.append(re.sub(r"[-_]\d+", "", names.get(ident, "thread")))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def snapshot(self) -> None:
+        self.snapshots.append(tracemalloc.take_snapshot())
+        if len(self.snapshots) > self.max_snapshots:
+            del self.snapshots[1::2]
+            self.snapshot_interval *= 2
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+class Profiler:
+    """
+    Profiles a single Tasker run on demand, in CPU time as well as in memory.
+
+    The run is profiled by cProfile in every thread it starts (by one profiler per thread
+    before Python 3.12, which only profiles the thread enabling it), its stacks are sampled for
+    flamegraphs and its allocations are traced by tracemalloc. Allocations are attributed
+    to the pipeline stage of the innermost project frame they were made from, see STAGES,
+    allocations made from other project modules count as "other". As the traced memory is
+    snapshotted periodically, memory held only briefly between two snapshots is not reported.
+    """
+    STAGES = (
+        ("fetch", ("aw/httpclient.py", "aw/pagecache.py", "aw/ratelimiter.py")),
+        ("parse", ("aw/htmlparser.py", "scrapers/")),
+        ("filter", ("aw/scrapermanager.py", "aw/pagestream.py", "aw/constraint.py")),
+        ("render", ("aw/mailer.py",))
+    )
+    """
+    Pipeline stages with the project paths (relative to ROOT_DIR) whose allocations they own.
+    """
+
+    @classmethod
+    def get_stages(cls) -> list[str]:
+        """
+        Returns:
+            list[str]: Names of the stages allocations are attributed to, "other" being the last one.
+        """
+        return [stage for stage, _ in cls.STAGES] + ["other"]
+
+    @classmethod
+    def _format_filename(cls, filename: str) -> str:
+        """
+        Shortens a source file name, project files relative to ROOT_DIR and others to their package and module.
+
+        Args:
+            filename (str): The file name of a code object.
+
+        Returns:
+            str: The shortened file name with forward slashes.
+        """
+        path = Path(filename)
+        try:
+            return path.relative_to(ROOT_DIR).as_posix()
+        except ValueError:
+            return "/".join(path.parts[-2:])
+
+    @classmethod
+    def _get_origin(cls, traceback: tracemalloc.Traceback) -> tuple[str | None, tracemalloc.Frame | None]:
+        """
+        Finds the stage an allocation was made in.
+
+        Args:
+            traceback (tracemalloc.Traceback): The traceback of the allocation, oldest frame first.
+
+        Returns:
+            tuple[str | None, tracemalloc.Frame | None]: The stage, None for allocations of the profiler
+                itself, and the innermost project frame, None when the allocation was not made from the project.
+        """
+        for frame in reversed(traceback):
+            path = Path(frame.filename)
+            if not path.is_relative_to(ROOT_DIR):
+                continue
+            if frame.filename == __file__:
+                return None, frame
+            relative = path.relative_to(ROOT_DIR).as_posix()
+            for stage, prefixes in cls.STAGES:
+                if relative.startswith(prefixes):
+                    return stage, frame
+            return "other", frame
+        return "other", None
+
+    @classmethod
+    def _format_size(cls, size: int) -> str:
+        return f"{size / 1024 / 1024:.1f} MiB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KiB"
+
+    @classmethod
+    def _write_allocations(cls, filepath: str, snapshots: list[tracemalloc.Snapshot], peak: int, top: int) -> None:
+        """
+        Writes the top allocation sites of every stage in the snapshot where the stage held the most memory.
+
+        A site is the allocating line followed by the project line it was made from.
+
+        Args:
+            filepath (str): The report file.
+            snapshots (list[tracemalloc.Snapshot]): Snapshots of the traced memory taken during the run.
+            peak (int): The peak traced memory (in bytes) of the run.
+            top (int): Number of sites reported per stage.
+        """
+        origins = {}
+        peaks = {stage: (0, Counter(), Counter()) for stage in cls.get_stages()}
+
+        for snapshot in snapshots:
+            sizes = {stage: (0, Counter(), Counter()) for stage in peaks}
+            for trace in snapshot.traces:
+                traceback = trace.traceback
+                if traceback not in origins:
+                    origins[traceback] = cls._get_origin(traceback)
+                stage, origin = origins[traceback]
+                if stage is None:
+                    continue
+                size, site_sizes, site_blocks = sizes[stage]
+                site = (traceback[-1], origin)
+                site_sizes[site] += trace.size
+                site_blocks[site] += 1
+                sizes[stage] = (size + trace.size, site_sizes, site_blocks)
+            for stage, stage_sizes in sizes.items():
+                if stage_sizes[0] > peaks[stage][0]:
+                    peaks[stage] = stage_sizes
+
+        with open(filepath, "w", encoding="utf-8") as file:
+            file.write(f"Peak traced memory: {cls._format_size(peak)} ({len(snapshots)} snapshots)\n")
+            for stage, (size, site_sizes, site_blocks) in peaks.items():
+                file.write(f"\n{stage}: {cls._format_size(size)} at peak\n")
+                for (site, origin), site_size in site_sizes.most_common(top):
+                    via = f" <- {cls._format_filename(origin.filename)}:{origin.lineno}" if origin and origin != site else ""
+                    file.write(f"  {cls._format_size(site_size):>12} {site_blocks[site, origin]:>8} blocks  "
+                               f"{cls._format_filename(site.filename)}:{site.lineno}{via}\n")
+
+    @classmethod
+    def profile_task(cls, config: Config, qm: QueryManager, output_dir: str | None = None) -> dict[str, str]:
+        """
+        Runs the task once under the profilers and writes their results, after the run in progress if any.
+
+        Three files sharing a timestamped name are written: the cProfile statistics of all
+        threads (.pstats, readable by pstats or snakeviz), the sampled stacks in the collapsed
+        format of flamegraph.pl and speedscope (.collapsed) and the top allocation sites of
+        every stage (.allocations.txt).
+
+        Args:
+            config (Config): Configuration passed to the Tasker.
+            qm (QueryManager): Query manager passed to the Tasker.
+            output_dir (str | None): The directory of the results, LOG_DIR by default.
+
+        Returns:
+            dict[str, str]: Paths of the written files keyed by "pstats", "collapsed" and "allocations".
+        """
+        output_dir = output_dir or join(ROOT_DIR, LOG_DIR)
+        os.makedirs(output_dir, exist_ok=True)
+        prefix = join(output_dir, datetime.now().strftime("profile-%Y%m%d-%H%M%S"))
+        files = {"pstats": prefix + ".pstats", "collapsed": prefix + ".collapsed", "allocations": prefix + ".allocations.txt"}
+
+        profiles = [cProfile.Profile()]
+        lock = threading.Lock()
+        # since Python 3.12 cProfile is built on sys.monitoring, so one profiler sees every thread
+        # and a second one cannot be enabled
+        per_thread = sys.version_info < (3, 12)
+
+        def profile_thread(frame, event, arg) -> None:
+            # runs once in every new thread, replacing itself by a profiler of that thread
+            sys.setprofile(None)
+            profile = cProfile.Profile()
+            with lock:
+                profiles.append(profile)
+            profile.enable()
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(PROFILE_TRACEBACK_DEPTH)
+        tracemalloc.reset_peak()
+        ignored = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        sampler = _Sampler(PROFILE_SAMPLE_INTERVAL, PROFILE_SNAPSHOT_INTERVAL, PROFILE_MAX_SNAPSHOTS, ignored)
+
+        logger.log_success("Profiling a task run.")
+        sampler.start()
+        if per_thread:
+            threading.setprofile(profile_thread)
+        profiles[0].enable()
+        try:
+            Tasker.trigger(config, qm, wait=True)
+        finally:
+            profiles[0].disable()
+            if per_thread:
+                threading.setprofile(None)
+            sampler.stop()
+            sampler.snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+
+        try:
+            with lock:
+                pstats.Stats(*profiles).dump_stats(files["pstats"])
+            with open(files["collapsed"], "w", encoding="utf-8") as file:
+                file.writelines(f"{stack} {count}\n" for stack, count in sorted(sampler.stacks.items()))
+            cls._write_allocations(files["allocations"], sampler.snapshots, peak, PROFILE_TOP_ALLOCATIONS)
+        except IOError as e:
+            logger.log_error(f"Unable to write profile {prefix}: {e}")
+            raise
+
+        logger.log_success(f"Profile written to {prefix}.*")
+        return files
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class Query:
@@ -9,9 +9,15 @@ class Query:
         query_string (str): The query string associated with the query.
         constraint_list (List[Constraint]): A list of Constraint objects defining the constraints for the query.
         asciize (bool, optional): If True, normalize string values to ASCII characters (default is True).
+        recipients (List[str], optional): Addresses receiving the results of the query,
+            the recipient from config if empty (default is empty).
+        period (int | None, optional): Number of minutes between two scheduled runs of the query,
+            None to follow the schedule from config (default is None).
     """
     id: int
     query_string: str
     constraint_list: list["Constraint"] # type: ignore
     asciize: bool = True
+    recipients: list[str] = field(default_factory=list)
+    period: int | None = None
 
@@ -96,7 +96,9 @@ class QueryManager:
             "id": query.id,
             "query_string": query.query_string,
             "asciize": query.asciize,
-            "constraint_list": [self._constraint_to_dict(con) for con in query.constraint_list]
+            "constraint_list": [self._constraint_to_dict(con) for con in query.constraint_list],
+            "recipients": list(query.recipients),
+            "period": query.period
         }
     
     def _to_query(self, query_dict: dict) -> Query:
@@ -113,7 +115,9 @@ class QueryManager:
             id = query_dict["id"],
             query_string = query_dict["query_string"],
             asciize = query_dict["asciize"],
-            constraint_list = [self._to_constraint(con) for con in query_dict["constraint_list"]]
+            constraint_list = [self._to_constraint(con) for con in query_dict["constraint_list"]],
+            recipients = query_dict.get("recipients") or [],
+            period = query_dict.get("period")
         )
     
     def _to_constraint(self, con_dict: dict) -> Constraint:
@@ -0,0 +1,206 @@
+from email.utils import parsedate_to_datetime
+import threading
+import time
+
+from aw import HOST_REQUESTS_PER_SECOND, HOST_REQUEST_BURST, HOST_INITIAL_CONCURRENCY, HOST_MAX_CONCURRENCY, HOST_LATENCY_TOLERANCE, HOST_MAX_RETRY_AFTER
+
+class _HostLimit:
+    """
+    Token bucket and adaptive concurrency limit of one host.
+
+    Attributes:
+        tokens (float): Requests which may be sent before the bucket is empty.
+        refilled_at (float): Monotonic time the bucket was last refilled.
+        concurrency (float): Current concurrency limit, its integer part is enforced.
+        in_flight (int): Number of requests sent and not yet answered.
+        latency (float | None): Smoothed latency of healthy responses, None before the first response.
+        decreased_at (float): Monotonic time the concurrency limit was last decreased.
+        blocked_until (float): Monotonic time before which no request may be sent, set by Retry-After.
+        throttled (int): Number of responses which throttled or failed since the last statistics reset.
+    """
+    def __init__(self, burst: int, concurrency: int) -> None:
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.concurrency = float(concurrency)
+        self.in_flight = 0
+        self.latency = None
+        self.decreased_at = 0.0
+        self.blocked_until = 0.0
+        self.throttled = 0
+
+class RateLimiter:
+    """
+    Per-host request limiter shared by all scraper fetches.
+
+    Every host has a token bucket capping the request rate and a concurrency limit adapted
+    by AIMD: the limit grows by one request per round of healthy responses and is halved
+    when a response fails, is throttled or takes HOST_LATENCY_TOLERANCE times longer than
+    usual. A Retry-After header pauses all requests to the host for the given delay.
+    Hosts thus settle at the highest concurrency they serve without degrading.
+
+    Attributes:
+        _rate (float): Sustained requests per second per host.
+        _burst (int): Capacity of the token bucket.
+        _initial_concurrency (int): Concurrency limit of a newly seen host.
+        _max_concurrency (int): Upper bound of the concurrency limit.
+        _hosts (dict[str, _HostLimit]): Limits keyed by host.
+        _condition (threading.Condition): Guards the limits, signalled whenever a request finishes.
+    """
+    MIN_CONCURRENCY = 1
+    """
+    Lower bound of the concurrency limit.
+    """
+
+    LATENCY_SMOOTHING = 0.1
+    """
+    Weight of the latest response in the smoothed latency.
+    """
+
+    def __init__(self, rate: float = HOST_REQUESTS_PER_SECOND, burst: int = HOST_REQUEST_BURST,
+                 initial_concurrency: int = HOST_INITIAL_CONCURRENCY, max_concurrency: int = HOST_MAX_CONCURRENCY) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._initial_concurrency = initial_concurrency
+        self._max_concurrency = max_concurrency
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _get_limit(self, host: str) -> _HostLimit:
+        limit = self._hosts.get(host)
+        if limit is None:
+            limit = _HostLimit(self._burst, self._initial_concurrency)
+            self._hosts[host] = limit
+        return limit
+
+    def _get_delay(self, limit: _HostLimit, now: float) -> float | None:
+        """
+        Refills the bucket and computes how long a request to the host has to wait.
+
+        Args:
+            limit (_HostLimit): The host's limit.
+            now (float): The current monotonic time.
+
+        Returns:
+            float | None: Seconds until a token is available or the host unblocks, 0 if the request
+            may be sent now, None if it has to wait for another request to finish.
+        """
+        limit.tokens = min(self._burst, limit.tokens + (now - limit.refilled_at) * self._rate)
+        limit.refilled_at = now
+
+        if now < limit.blocked_until:
+            return limit.blocked_until - now
+        if limit.in_flight >= int(limit.concurrency):
+            return None
+        if limit.tokens < 1:
+            return (1 - limit.tokens) / self._rate
+        return 0
+
+    def acquire(self, host: str, cancelled: threading.Event | None = None) -> bool:
+        """
+        Waits until a request to the host may be sent and reserves it, see release.
+
+        Args:
+            host (str): The host about to be requested.
+            cancelled (threading.Event | None): Stops the wait once set, see interrupt.
+
+        Returns:
+            bool: True if the request was reserved, False if the wait was cancelled.
+        """
+        with self._condition:
+            limit = self._get_limit(host)
+            while (delay := self._get_delay(limit, time.monotonic())) != 0:
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                self._condition.wait(delay)
+            limit.tokens -= 1
+            limit.in_flight += 1
+            return True
+
+    def interrupt(self) -> None:
+        """
+        Wakes up every waiting acquire, so waits whose cancelled event was set return.
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+    def release(self, host: str, latency: float, healthy: bool, retry_after: float | None = None) -> None:
+        """
+        Finishes a request reserved by acquire and adapts the host's concurrency limit.
+
+        Args:
+            host (str): The requested host.
+            latency (float): Seconds the request took.
+            healthy (bool): Whether the host answered without an error or throttling.
+            retry_after (float | None): Seconds the host asked to wait before the next request.
+        """
+        with self._condition:
+            limit = self._get_limit(host)
+            limit.in_flight -= 1
+            now = time.monotonic()
+
+            if retry_after is not None:
+                limit.blocked_until = max(limit.blocked_until, now + min(retry_after, HOST_MAX_RETRY_AFTER))
+
+            slow = limit.latency is not None and latency > HOST_LATENCY_TOLERANCE * limit.latency
+            if healthy and not slow:
+                limit.concurrency = min(self._max_concurrency, limit.concurrency + 1 / int(limit.concurrency))
+            elif now - limit.decreased_at > (limit.latency or latency):
+                # one decrease per round trip, requests failing together are one congestion signal
+                limit.concurrency = max(self.MIN_CONCURRENCY, limit.concurrency / 2)
+                limit.decreased_at = now
+
+            if not healthy:
+                limit.throttled += 1
+            elif limit.latency is None:
+                limit.latency = latency
+            else:
+                limit.latency += self.LATENCY_SMOOTHING * (latency - limit.latency)
+
+            self._condition.notify_all()
+
+    @classmethod
+    def parse_retry_after(cls, value: str | None) -> float | None:
+        """
+        Parses a Retry-After header given in seconds or as an HTTP date.
+
+        Args:
+            value (str | None): The header value.
+
+        Returns:
+            float | None: Seconds to wait, None if the header is missing or invalid.
+        """
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """
+        Returns the current limits of every host.
+
+        Returns:
+            dict[str, dict[str, float]]: Concurrency limit, smoothed latency and throttled responses per host.
+        """
+        with self._condition:
+            return {
+                host: {
+                    "concurrency": int(limit.concurrency),
+                    "latency": round(limit.latency or 0, 3),
+                    "throttled": limit.throttled
+                }
+                for host, limit in self._hosts.items()
+            }
+
+    def reset_stats(self) -> None:
+        """
+        Resets throttling counters, the learned limits are kept.
+        """
+        with self._condition:
+            for limit in self._hosts.values():
+                limit.throttled = 0
+
+rate_limiter = RateLimiter()
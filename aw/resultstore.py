@@ -0,0 +1,393 @@
+from datetime import datetime, timedelta
+from os.path import join
+import sqlite3
+from itertools import islice
+from typing import Iterable, Iterator
+
+from aw import ROOT_DIR, RESULTS_DB_FILE, FULL_CRAWL_INTERVAL
+from aw.error import CloseThreadError
+from aw.record import Record
+
+class ResultStore:
+    """
+    SQLite-backed store of listings seen by previous runs.
+
+    Every run upserts its records in bulk, each listing (identified by its link) remembers the
+    first and the last run it was seen in. New listings are those first seen in the current run,
+    disappeared listings are those last seen in the previous run, so the whole diff is answered
+    by two indexed lookups.
+
+    Incremental runs only see the newest listings, so listings are compared against the
+    previous full run and only full runs report disappeared listings. A run counts as full
+    only once its crawl is known to have completed, a partial run is stored as incremental.
+    Records are staged in a temporary table batch by batch as they stream in and merged into
+    the store in one short transaction once the run ends, so the database is not locked for
+    the whole crawl and a run which breaks off leaves no trace. The diff is streamed back from
+    the database, so neither side holds a whole run in memory. Listings are reported in the order
+    of the (search, scraper) pairs which scraped them, then in page order, so reports do not
+    depend on network timing. Listings remember the recipients they were routed to, so every
+    recipient's diff is read separately.
+
+    Attributes:
+        _filepath (str): Path to the SQLite database file.
+    """
+    RECORD_COLUMNS = ("link", "name", "author", "price", "publisher", "issue_year", "language")
+    """
+    Record attributes stored for every listing, the link being the primary key.
+    """
+
+    MATCHES_JOIN = """
+        JOIN matches ON matches.link = records.link AND matches.recipient = ? AND matches.run = records.last_seen_run
+    """
+    """
+    Join restricting listings to those routed to a recipient when they were last seen, takes the recipient as parameter.
+    """
+
+    BATCH_SIZE = 1000
+    """
+    Number of streamed results staged at once.
+    """
+
+    RANK_SHIFT = 32
+    """
+    Number of low bits of seen_order counting results in arrival order, the high bits hold the rank of the result.
+    """
+
+    def __init__(self, filepath: str | None = None) -> None:
+        self._filepath = filepath or join(ROOT_DIR, RESULTS_DB_FILE)
+
+        connection = self._connect()
+
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    finished_at TEXT NOT NULL,
+                    full INTEGER NOT NULL DEFAULT 1
+                );
+                CREATE TABLE IF NOT EXISTS records (
+                    link TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    price TEXT NOT NULL,
+                    publisher TEXT NOT NULL,
+                    issue_year TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    first_seen_run INTEGER NOT NULL,
+                    last_seen_run INTEGER NOT NULL,
+                    seen_order INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS matches (
+                    link TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    run INTEGER NOT NULL,
+                    PRIMARY KEY (link, recipient)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS unlinked_records (
+                    run INTEGER NOT NULL,
+                    seen_order INTEGER NOT NULL,
+                    recipient TEXT NOT NULL DEFAULT '',
+                    link TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    price TEXT NOT NULL,
+                    publisher TEXT NOT NULL,
+                    issue_year TEXT NOT NULL,
+                    language TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS records_first_seen_run ON records (first_seen_run);
+                CREATE INDEX IF NOT EXISTS records_last_seen_run ON records (last_seen_run);
+            """)
+            for table, column, definition in (
+                ("runs", "full", "INTEGER NOT NULL DEFAULT 1"),
+                ("records", "seen_order", "INTEGER NOT NULL DEFAULT 0"),
+                ("unlinked_records", "recipient", "TEXT NOT NULL DEFAULT ''")
+            ):
+                if column not in {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to initialize result store {self._filepath}: {e}")
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection, so the store can be used from any thread.
+
+        Returns:
+            sqlite3.Connection: The database connection.
+
+        Raises:
+            CloseThreadError: If the database cannot be opened.
+        """
+        try:
+            connection = sqlite3.connect(self._filepath)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            return connection
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to open result store {self._filepath}: {e}")
+
+    def _to_record(self, row: sqlite3.Row) -> Record:
+        """
+        Converts a database row into a Record object.
+
+        Args:
+            row (sqlite3.Row): The row selected from the records table.
+
+        Returns:
+            Record: The Record object.
+        """
+        return Record(**{column: row[column] for column in self.RECORD_COLUMNS})
+
+    def is_full_crawl_due(self, interval: int = FULL_CRAWL_INTERVAL) -> bool:
+        """
+        Checks whether the next run should crawl everything instead of only the newest listings.
+
+        Args:
+            interval (int): Maximum number of seconds between two full runs.
+
+        Returns:
+            bool: True if no full run finished within the interval, False otherwise.
+
+        Raises:
+            CloseThreadError: If the store cannot be read.
+        """
+        connection = self._connect()
+
+        try:
+            finished_at = connection.execute("SELECT MAX(finished_at) FROM runs WHERE full = 1").fetchone()[0]
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to read result store: {e}")
+        finally:
+            connection.close()
+
+        return finished_at is None or datetime.now() - datetime.fromisoformat(finished_at) >= timedelta(seconds=interval)
+
+    def save_run(self, results: Iterable[tuple[Record, str, int]], full: bool = True) -> int:
+        """
+        Stores the records of a finished run, consuming them as they stream in.
+
+        Results are staged in batches of BATCH_SIZE straight from the iterable, so the run is never
+        held in memory, and each batch is committed on its own. The staged results are merged into
+        the store in one transaction once the iterable is exhausted, which is when the run finishes.
+        Each listing remembers the recipients it was routed to in the run and its position, ordered
+        by rank and then by arrival. Records without a link cannot be tracked between runs, they are
+        kept for the current run only and are always reported as new. The diff against the previous
+        full run is read afterwards with count_changes, iter_new_records and iter_disappeared_records.
+
+        Args:
+            results (Iterable[tuple[Record, str, int]]): All records collected by the run, each with a recipient
+                it is routed to and its rank (see ScraperManager.iter_results). A record routed to several
+                recipients appears once per recipient.
+            full (bool): Whether the run crawled all listings, a run which may turn out partial
+                is stored as incremental and marked with mark_full once it completed.
+
+        Returns:
+            int: The ID of the stored run.
+
+        Raises:
+            CloseThreadError: If the records cannot be stored.
+        """
+        connection = self._connect()
+        columns = ", ".join(self.RECORD_COLUMNS)
+        placeholders = ", ".join("?" * len(self.RECORD_COLUMNS))
+
+        try:
+            connection.execute(f"""
+                CREATE TEMP TABLE staged_results (
+                    seen_order INTEGER NOT NULL,
+                    recipient TEXT NOT NULL,
+                    {", ".join(f"{column} TEXT NOT NULL" for column in self.RECORD_COLUMNS)}
+                )
+            """)
+
+            results = iter(results)
+            arrival = 0
+
+            for batch in iter(lambda: list(islice(results, self.BATCH_SIZE)), []):
+                params = []
+                for record, recipient, rank in batch:
+                    values = tuple(getattr(record, column) for column in self.RECORD_COLUMNS)
+                    params.append(((rank << self.RANK_SHIFT) + arrival, recipient, values[0] or "", *values[1:]))
+                    arrival += 1
+                with connection:
+                    connection.executemany(f"""
+                        INSERT INTO temp.staged_results (seen_order, recipient, {columns})
+                        VALUES (?, ?, {placeholders})
+                    """, params)
+
+            with connection:
+                previous_full_run = connection.execute("SELECT MAX(id) FROM runs WHERE full = 1").fetchone()[0] or 0
+                run = connection.execute(
+                    "INSERT INTO runs (finished_at, full) VALUES (?, ?)", (datetime.now().isoformat(), int(full))
+                ).lastrowid
+                connection.execute("DELETE FROM unlinked_records WHERE run < ?", (run,))
+                connection.execute(f"""
+                    INSERT INTO records ({columns}, first_seen_run, last_seen_run, seen_order)
+                    SELECT {columns}, ?, ?, seen_order FROM temp.staged_results
+                    WHERE link != '' ORDER BY seen_order
+                    ON CONFLICT (link) DO UPDATE SET
+                        {", ".join(f"{column} = excluded.{column}" for column in self.RECORD_COLUMNS[1:])},
+                        first_seen_run = CASE
+                            WHEN records.last_seen_run < ? THEN excluded.first_seen_run
+                            ELSE records.first_seen_run
+                        END,
+                        seen_order = CASE
+                            WHEN records.last_seen_run = excluded.last_seen_run THEN MIN(records.seen_order, excluded.seen_order)
+                            ELSE excluded.seen_order
+                        END,
+                        last_seen_run = excluded.last_seen_run
+                """, (run, run, previous_full_run))
+                connection.execute("""
+                    INSERT INTO matches (link, recipient, run)
+                    SELECT link, recipient, ? FROM temp.staged_results WHERE link != ''
+                    ON CONFLICT (link, recipient) DO UPDATE SET run = excluded.run
+                """, (run,))
+                connection.execute(f"""
+                    INSERT INTO unlinked_records (run, seen_order, recipient, {columns})
+                    SELECT ?, seen_order, recipient, {columns} FROM temp.staged_results WHERE link = ''
+                """, (run,))
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to store results: {e}")
+        finally:
+            connection.close()
+
+        return run
+
+    def mark_full(self, run: int) -> None:
+        """
+        Marks a stored run as full once its crawl is known to have completed.
+
+        Args:
+            run (int): The ID of the run.
+
+        Raises:
+            CloseThreadError: If the run cannot be updated.
+        """
+        connection = self._connect()
+
+        try:
+            with connection:
+                connection.execute("UPDATE runs SET full = 1 WHERE id = ?", (run,))
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to store results: {e}")
+        finally:
+            connection.close()
+
+    def _get_previous_full_run(self, connection: sqlite3.Connection, run: int) -> int | None:
+        """
+        Finds the full run a full run is diffed against.
+
+        Args:
+            connection (sqlite3.Connection): The database connection.
+            run (int): The ID of the run.
+
+        Returns:
+            int | None: ID of the previous full run, or None if the run is incremental or the first full run.
+        """
+        row = connection.execute("SELECT full FROM runs WHERE id = ?", (run,)).fetchone()
+        if row is None or not row["full"]:
+            return None
+        return connection.execute("SELECT MAX(id) FROM runs WHERE full = 1 AND id < ?", (run,)).fetchone()[0]
+
+    def count_changes(self, run: int, recipient: str) -> tuple[int, int]:
+        """
+        Counts the listings routed to a recipient which a run found new
+        and which disappeared since the previous full run.
+
+        Args:
+            run (int): The ID of the run.
+            recipient (str): The recipient address.
+
+        Returns:
+            tuple[int, int]: Numbers of new and disappeared listings.
+
+        Raises:
+            CloseThreadError: If the store cannot be read.
+        """
+        connection = self._connect()
+
+        try:
+            new_count = connection.execute(f"""
+                SELECT
+                    (SELECT COUNT(*) FROM records {self.MATCHES_JOIN} WHERE records.first_seen_run = ?)
+                    + (SELECT COUNT(*) FROM unlinked_records WHERE run = ? AND recipient = ?)
+            """, (recipient, run, run, recipient)).fetchone()[0]
+            previous_full_run = self._get_previous_full_run(connection, run)
+            disappeared_count = 0 if previous_full_run is None else connection.execute(f"""
+                SELECT COUNT(*) FROM records {self.MATCHES_JOIN}
+                WHERE records.last_seen_run >= ? AND records.last_seen_run < ?
+            """, (recipient, previous_full_run, run)).fetchone()[0]
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to read result store: {e}")
+        finally:
+            connection.close()
+
+        return new_count, disappeared_count
+
+    def iter_new_records(self, run: int, recipient: str) -> Iterator[Record]:
+        """
+        Streams the listings routed to a recipient which were first seen in a run, in the order they were collected.
+
+        A listing which disappeared and came back later is reported as new again.
+
+        Args:
+            run (int): The ID of the run.
+            recipient (str): The recipient address.
+
+        Yields:
+            Record: The new listings.
+
+        Raises:
+            CloseThreadError: If the store cannot be read.
+        """
+        columns = ", ".join(self.RECORD_COLUMNS)
+        connection = self._connect()
+
+        try:
+            yield from map(self._to_record, connection.execute(f"""
+                SELECT {", ".join(f"records.{column}" for column in self.RECORD_COLUMNS)}, records.seen_order
+                FROM records {self.MATCHES_JOIN} WHERE records.first_seen_run = ?
+                UNION ALL
+                SELECT {columns}, seen_order FROM unlinked_records WHERE run = ? AND recipient = ?
+                ORDER BY seen_order
+            """, (recipient, run, run, recipient)))
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to read result store: {e}")
+        finally:
+            connection.close()
+
+    def iter_disappeared_records(self, run: int, recipient: str) -> Iterator[Record]:
+        """
+        Streams the listings routed to a recipient which disappeared between the previous full run and a full run.
+
+        A listing is routed to the recipients it was routed to when it was last seen.
+        An incremental run never reports disappeared listings, as it does not see the older ones.
+
+        Args:
+            run (int): The ID of the run.
+            recipient (str): The recipient address.
+
+        Yields:
+            Record: The disappeared listings.
+
+        Raises:
+            CloseThreadError: If the store cannot be read.
+        """
+        connection = self._connect()
+
+        try:
+            previous_full_run = self._get_previous_full_run(connection, run)
+            if previous_full_run is None:
+                return
+            yield from map(self._to_record, connection.execute(f"""
+                SELECT records.* FROM records {self.MATCHES_JOIN}
+                WHERE records.last_seen_run >= ? AND records.last_seen_run < ?
+                ORDER BY records.rowid
+            """, (recipient, previous_full_run, run)))
+        except sqlite3.Error as e:
+            raise CloseThreadError(f"Unable to read result store: {e}")
+        finally:
+            connection.close()
@@ -1,10 +1,14 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+import heapq
+from itertools import count
+import os
 import threading
-from time import sleep
+import time
 
 from aw import TIME, PERIOD, WEEKDAY
-from aw import SLEEP_SCHEDULER_CYCLE_FOR_MINUTE
+from aw import QUERIES_YAML_FILE, SCHEDULER_MAX_WAIT, SCHEDULER_QUERIES_RELOAD_INTERVAL
 from aw.config import Config
+from aw.error import QueriesNotLoadedError
 from aw.logger import logger
 from aw.querymanager import QueryManager
 from aw.tasker import Tasker
@@ -13,6 +17,20 @@ class Scheduler:
     """
     Manages the scheduling of tasks based on a specified time, period, and configuration.
 
+    Instead of polling the clock, the scheduler computes the next fire time and sleeps
+    on a condition variable until then. It is woken up early only when the configuration
+    changes or when it is enabled or disabled.
+
+    Queries with their own period are run every that many minutes, the other queries follow
+    the schedule from the configuration. The scheduler keeps a heap of the next due times of
+    the configured schedule and of every query with its own period, sleeps until the earliest
+    one and runs only the queries which are due. A run due on the configured schedule which
+    covers every query is a run of all queries, so it may count as a full run.
+
+    The queries file is reloaded only when it changes or SCHEDULER_QUERIES_RELOAD_INTERVAL
+    after the last load. A file which cannot be loaded is reported and the last loaded
+    periods are kept, so a broken file never stops the scheduler.
+
     Args:
         p_config (Config): Configuration object that includes scheduler settings.
         p_query_manager (QueryManager): Manages queries used in the scheduled tasks.
@@ -24,49 +42,271 @@ class Scheduler:
         time (str): The time at which tasks should be triggered.
         day (int): The day of the week for weekly tasks (0=Monday, 6=Sunday).
         period (str): The scheduling period ('hourly', 'daily', or 'weekly').
+        _condition (threading.Condition): Condition the scheduler sleeps on between fire times.
+        _changed (bool): Flag set when the scheduler should re-evaluate its state before the timeout.
+        _heap (list[tuple[datetime, int, int | None]]): Next due times with a tie-breaking sequence number
+            and the ID of the query, None standing for the queries following the configured schedule.
+        _sequence (itertools.count): Sequence numbers keeping heap entries with equal due times in insertion order.
+        _periods (dict[int, int]): Periods (in minutes) of the queries with their own period, as last loaded.
+        _scheduled_query_ids (set[int] | None): IDs of the queries following the configured schedule,
+            None if the queries could not be loaded.
+        _query_ids (set[int] | None): IDs of all queries as last loaded, None if the queries could not be loaded.
+        _queries_mtime (int | None): Modification time of the queries file at the last load, in nanoseconds.
+        _queries_loaded_at (float | None): Monotonic time of the last load of the queries file.
+        _last_fire (datetime | None): The last fire time of the configured schedule.
+        _rescheduled (bool): Flag set when the configured schedule changed and the heap has to be rebuilt.
 
     Methods:
-        _check_time() -> bool:
-            Checks if the current time matches the scheduled time for the task.
-        
+        _get_next_fire_time(since: datetime) -> datetime | None:
+            Computes the earliest fire time not earlier than the given instant.
+
+        _update_heap(now: datetime) -> None:
+            Rebuilds the heap of due times when the schedule or the query periods changed.
+
+        _pop_due_queries(now: datetime) -> set[int] | None:
+            Pops the due entries from the heap, schedules their next runs and returns the due queries,
+            None if all queries are due.
+
         schedule() -> None:
             Loads scheduling details from the configuration and enables or disables the scheduler.
-        
+
         enable() -> None:
             Enables the scheduler if the configuration is valid.
-        
+
         disable() -> None:
             Disables the scheduler.
-        
+
         start() -> None:
-            Continuously monitors the time and executes tasks when scheduled.
+            Sleeps until the next fire time and executes tasks when scheduled.
     """
     def __init__(self, p_config: Config, p_query_manager: QueryManager):
         self.config = p_config
         self.query_manager = p_query_manager
+        self._condition = threading.Condition()
+        self._changed = False
+        self._heap = []
+        self._sequence = count()
+        self._periods = {}
+        self._scheduled_query_ids = None
+        self._query_ids = None
+        self._queries_mtime = None
+        self._queries_loaded_at = None
+        self._last_fire = None
+        self._rescheduled = True
         if self.config.is_valid():
             self.enabled = True
         else:
             self.enabled = False
 
+        self.config.add_change_listener(self._notify)
         self.schedule()
 
-    def _check_time(self) -> bool:
+    def _notify(self) -> None:
         """
-        Checks if the current time matches the scheduled time for the task.
+        Wakes up the scheduler so it re-evaluates its configuration and next fire time.
+        """
+        with self._condition:
+            self._changed = True
+            self._condition.notify_all()
+
+    def _wait(self, timeout: float | None) -> None:
+        """
+        Blocks until the timeout elapses or the scheduler is notified about a change.
+
+        Args:
+            timeout (float | None): Number of seconds to sleep, None sleeps until notified.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._changed, timeout)
+            self._changed = False
+
+    def _get_next_fire_time(self, since: datetime) -> datetime | None:
+        """
+        Computes the earliest moment matching the schedule which is not earlier than `since`.
+
+        Args:
+            since (datetime): The instant to search from.
 
         Returns:
-            bool: True if the current time matches the scheduled time, False otherwise.
+            datetime | None: The next fire time, or None if the period is unknown.
         """
-        current_time = datetime.now()
+        hour, minute = (int(part) for part in self.time.split(":"))
+        candidate = since.replace(minute=minute, second=0, microsecond=0)
 
         if self.period == "hourly":
-            return current_time.strftime("%M") == self.time[3:]
+            if candidate < since:
+                candidate += timedelta(hours=1)
+            return candidate
+
+        candidate = candidate.replace(hour=hour)
+
         if self.period == "daily":
-            return current_time.strftime("%H:%M") == self.time
+            if candidate < since:
+                candidate += timedelta(days=1)
+            return candidate
         if self.period == "weekly":
-            return current_time.strftime("%H:%M") == self.time and current_time.weekday() == self.day
-        
+            candidate += timedelta(days=(self.day - candidate.weekday()) % 7)
+            if candidate < since:
+                candidate += timedelta(weeks=1)
+            return candidate
+
+        return None
+
+    def _is_valid_period(self, period: object) -> bool:
+        """
+        Args:
+            period (object): The period of a query as found in the queries file.
+
+        Returns:
+            bool: True if the period is a positive number of minutes, False otherwise.
+        """
+        return isinstance(period, int) and not isinstance(period, bool) and period > 0
+
+    def _get_queries_mtime(self) -> int | None:
+        """
+        Returns:
+            int | None: Modification time of the queries file in nanoseconds, None if it does not exist.
+        """
+        try:
+            return os.stat(QUERIES_YAML_FILE).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_query_periods(self) -> dict[int, object]:
+        """
+        Loads the queries and remembers which of them follow the configured schedule.
+
+        The queries file is read only when it changed since the last load or the last load
+        is older than SCHEDULER_QUERIES_RELOAD_INTERVAL. Any error loading it is logged and
+        the last loaded queries are kept.
+
+        Returns:
+            dict[int, object]: Periods of the queries with their own period as found in the queries file,
+                the last loaded periods if the queries are not reloaded or cannot be loaded.
+        """
+        mtime = self._get_queries_mtime()
+        if (
+            self._queries_loaded_at is not None
+            and mtime == self._queries_mtime
+            and time.monotonic() - self._queries_loaded_at < SCHEDULER_QUERIES_RELOAD_INTERVAL
+        ):
+            return self._periods
+
+        self._queries_mtime = mtime
+        self._queries_loaded_at = time.monotonic()
+        try:
+            queries = self.query_manager.fetch_queries()
+        except QueriesNotLoadedError:
+            self._scheduled_query_ids = None
+            self._query_ids = None
+            return self._periods
+        except Exception as e:
+            logger.log_error(f"Queries couldn't be loaded by the scheduler, the last loaded periods are kept: {e}")
+            return self._periods
+
+        self._query_ids = {query.id for query in queries}
+        self._scheduled_query_ids = {query.id for query in queries if not self._is_valid_period(query.period)}
+        return {query.id: query.period for query in queries if query.period is not None}
+
+    def _push(self, due: datetime, query_id: int | None) -> None:
+        """
+        Adds a due time to the heap.
+
+        Args:
+            due (datetime): The time the entry is due.
+            query_id (int | None): The ID of the query, None for the configured schedule.
+        """
+        heapq.heappush(self._heap, (due, next(self._sequence), query_id))
+
+    def _update_heap(self, now: datetime) -> None:
+        """
+        Rebuilds the heap of due times when the configured schedule or the query periods changed.
+
+        Queries keep their due time while their period is unchanged, a new or changed period
+        is first due one period from now. Periods which are not a positive number of minutes
+        are reported and the query follows the configured schedule instead.
+
+        Args:
+            now (datetime): The current time, truncated to minutes.
+        """
+        periods = self._load_query_periods()
+        if periods == self._periods and not self._rescheduled:
+            return
+
+        due_times = {query_id: due for due, _, query_id in self._heap}
+        previous_periods = self._periods
+        self._periods = periods
+        self._rescheduled = False
+        self._heap = []
+
+        since = now if self._last_fire is None else max(now, self._last_fire + timedelta(minutes=1))
+        next_fire = self._get_next_fire_time(since)
+        if next_fire is not None:
+            self._push(next_fire, None)
+
+        for query_id, period in periods.items():
+            if not self._is_valid_period(period):
+                logger.log_error(f"Query {query_id} has invalid period {period!r}, it follows the configured schedule.")
+                continue
+            if query_id in due_times and previous_periods.get(query_id) == period:
+                self._push(due_times[query_id], query_id)
+            else:
+                self._push(now + timedelta(minutes=period), query_id)
+
+    def _pop_due_queries(self, now: datetime) -> set[int] | None:
+        """
+        Pops all entries due by now from the heap and pushes their next due times.
+
+        A query which missed several of its runs, e.g. while the computer was asleep, is run
+        only once and then continues one period later.
+
+        Args:
+            now (datetime): The current time.
+
+        Returns:
+            set[int] | None: IDs of the due queries, None if all queries are due or if the configured
+                schedule is due and the queries could not be loaded, so all of them are run.
+        """
+        query_ids = set()
+
+        while self._heap and self._heap[0][0] <= now:
+            due, _, query_id = heapq.heappop(self._heap)
+            if query_id is None:
+                self._last_fire = due
+                next_fire = self._get_next_fire_time(due + timedelta(minutes=1))
+                if next_fire is not None:
+                    self._push(next_fire, None)
+                if self._scheduled_query_ids is None or query_ids is None:
+                    query_ids = None
+                else:
+                    query_ids |= self._scheduled_query_ids
+            else:
+                period = timedelta(minutes=self._periods[query_id])
+                self._push(due + period if due + period > now else now + period, query_id)
+                if query_ids is not None:
+                    query_ids.add(query_id)
+
+        if query_ids and self._query_ids is not None and query_ids >= self._query_ids:
+            return None
+        return query_ids
+
+    def _run_task(self, query_ids: set[int] | None) -> None:
+        """
+        Triggers a Tasker run in a separate daemon thread, coalesced with the run in progress if any.
+
+        Args:
+            query_ids (set[int] | None): IDs of the queries to run, None for all queries.
+        """
+        try:
+            tasker_thread = threading.Thread(
+                target=Tasker.trigger, args=(self.config, self.query_manager), kwargs={"query_ids": query_ids}
+            )
+            tasker_thread.setDaemon(True)
+            tasker_thread.start()
+            logger.log_success("Scheduled task started.")
+        except Exception as e:
+            logger.log_error(f"Scheduled task halted: {e}")
+
     def schedule(self):
         """
         Loads scheduling details from the configuration and enables or disables the scheduler.
@@ -75,11 +315,12 @@ class Scheduler:
         self.time = cf_dict[TIME]
         self.day = int(cf_dict[WEEKDAY])
         self.period = cf_dict[PERIOD]
+        self._rescheduled = True
 
         if self.config.is_valid():
             self.enable()
         else:
-            self.disable() 
+            self.disable()
 
     def enable(self):
         """
@@ -90,6 +331,7 @@ class Scheduler:
         if self.config.is_valid():
             logger.log_success("Scheduler enabled.")
             self.enabled = True
+            self._notify()
         else:
             logger.log_error("Scheduler enable failed due to invalid configuration.")
 
@@ -100,25 +342,35 @@ class Scheduler:
         """
         logger.log_success("Scheduler disabled.")
         self.enabled = False
+        self._notify()
 
     def start(self):
         """
-        Continuously monitors the time and executes tasks when scheduled.
+        Sleeps until the next due time and executes tasks when it is reached.
+
+        The loop never busy-waits: while disabled it sleeps until notified, while enabled
+        it sleeps until the earliest due time in the heap (at most SCHEDULER_MAX_WAIT seconds,
+        so wall-clock jumps and changed query periods are picked up). The configured schedule
+        fires at most once per scheduled minute. Every run covers only the queries which are due.
         """
         while True:
+            if not self.config.is_scheduler_up_to_date():
+                self.schedule()
+
             if not self.enabled:
+                self._wait(None)
                 continue
 
-            if not self.config.is_scheduler_up_to_date():
-                self.schedule()
+            self._update_heap(datetime.now().replace(second=0, microsecond=0))
+            if not self._heap:
+                self._wait(SCHEDULER_MAX_WAIT)
+                continue
 
-            if self._check_time():
-                try:
-                    tasker_thread = threading.Thread(target=Tasker.do_task, args=(self.config, self.query_manager))
-                    tasker_thread.setDaemon(True)
-                    tasker_thread.start()
-                    logger.log_success("Scheduled task started.")
-                except Exception as e:
-                    logger.log_error(f"Scheduled task halted: {e}")
+            delay = (self._heap[0][0] - datetime.now()).total_seconds()
+            if delay > 0:
+                self._wait(min(delay, SCHEDULER_MAX_WAIT))
+                continue
 
-                sleep(SLEEP_SCHEDULER_CYCLE_FOR_MINUTE)
+            query_ids = self._pop_due_queries(datetime.now())
+            if query_ids is None or query_ids:
+                self._run_task(query_ids)
@@ -1,9 +1,16 @@
 from abc import ABC, abstractmethod
+from itertools import islice
+from typing import AsyncIterator, Iterator
 
 class Scraper(ABC):
     """
     Abstract base class for defining a scraper interface.
 
+    Scrapers are consumed as streams of pages. Plugins returning whole lists only implement
+    get_results (and optionally get_new_results), the default iter_pages and iter_new_pages
+    adapt them into a stream of a single page. Streaming plugins override iter_pages and
+    iter_new_pages, so only about one page per scraper is held in memory.
+
     Attributes:
         None
 
@@ -16,7 +23,117 @@ class Scraper(ABC):
 
             Returns:
                 List[Record]: A list of Record objects representing the scraped results.
+
+        get_new_results(query_string: str, seen: BloomFilter) -> List[Record]:
+            Retrieves at least all records not in `seen`, used by incremental crawls.
+            Scrapers able to stop paginating early override it, the default crawls everything.
+
+            Args:
+                query_string (str): The query string to search for.
+                seen (BloomFilter): Links of listings seen by previous crawls.
+
+            Returns:
+                List[Record]: A list of Record objects including all new listings.
+
+        can_crawl_incrementally() -> bool:
+            Tells whether get_new_results and iter_new_pages stop early, so an incremental crawl
+            fetches less than a full one. The default returns False, as the defaults crawl everything.
+
+        iter_pages(query_string: str) -> Iterator[List[Record]]:
+            Yields the results of get_results page by page, the default yields them as one page.
+
+        iter_new_pages(query_string: str, seen: BloomFilter) -> Iterator[List[Record]]:
+            Yields the results of get_new_results page by page, the default yields them as one page.
+
+        iter_pages_from(query_string: str, start_page: int) -> Iterator[List[Record]]:
+            Yields the pages of iter_pages following the first start_page pages, used to resume
+            a full crawl from its checkpoint. The default crawls and drops the skipped pages,
+            scrapers able to fetch a page directly override it.
     """
     @abstractmethod
     def get_results(self, query_string: str) -> list["Record"]: # type: ignore
-        pass
\ No newline at end of file
+        pass
+
+    @classmethod
+    def get_new_results(cls, query_string: str, seen: "BloomFilter") -> list["Record"]: # type: ignore
+        return cls.get_results(query_string)
+
+    @classmethod
+    def can_crawl_incrementally(cls) -> bool:
+        return False
+
+    @classmethod
+    def iter_pages(cls, query_string: str) -> Iterator[list["Record"]]: # type: ignore
+        yield cls.get_results(query_string)
+
+    @classmethod
+    def iter_new_pages(cls, query_string: str, seen: "BloomFilter") -> Iterator[list["Record"]]: # type: ignore
+        yield cls.get_new_results(query_string, seen)
+
+    @classmethod
+    def iter_pages_from(cls, query_string: str, start_page: int) -> Iterator[list["Record"]]: # type: ignore
+        yield from islice(cls.iter_pages(query_string), start_page, None)
+
+class AsyncScraper(ABC):
+    """
+    Abstract base class for defining a native asyncio scraper interface.
+
+    Async scrapers are awaited on the single event loop driven by ScraperManager,
+    so a plugin can keep many page requests in flight without spawning threads.
+
+    Attributes:
+        None
+
+    Methods:
+        get_results(query_string: str) -> List[Record]:
+            Abstract coroutine to retrieve a list of records based on a query string.
+
+            Args:
+                query_string (str): The query string to search for.
+
+            Returns:
+                List[Record]: A list of Record objects representing the scraped results.
+
+        get_new_results(query_string: str, seen: BloomFilter) -> List[Record]:
+            Coroutine retrieving at least all records not in `seen`, see Scraper.get_new_results.
+
+        can_crawl_incrementally() -> bool:
+            Tells whether get_new_results and iter_new_pages stop early, see Scraper.can_crawl_incrementally.
+
+        iter_pages(query_string: str) -> AsyncIterator[List[Record]]:
+            Async generator yielding the results of get_results page by page, see Scraper.iter_pages.
+
+        iter_new_pages(query_string: str, seen: BloomFilter) -> AsyncIterator[List[Record]]:
+            Async generator yielding the results of get_new_results page by page, see Scraper.iter_new_pages.
+
+        iter_pages_from(query_string: str, start_page: int) -> AsyncIterator[List[Record]]:
+            Async generator yielding the pages of iter_pages following the first start_page pages,
+            see Scraper.iter_pages_from.
+    """
+    @abstractmethod
+    async def get_results(self, query_string: str) -> list["Record"]: # type: ignore
+        pass
+
+    @classmethod
+    async def get_new_results(cls, query_string: str, seen: "BloomFilter") -> list["Record"]: # type: ignore
+        return await cls.get_results(query_string)
+
+    @classmethod
+    def can_crawl_incrementally(cls) -> bool:
+        return False
+
+    @classmethod
+    async def iter_pages(cls, query_string: str) -> AsyncIterator[list["Record"]]: # type: ignore
+        yield await cls.get_results(query_string)
+
+    @classmethod
+    async def iter_new_pages(cls, query_string: str, seen: "BloomFilter") -> AsyncIterator[list["Record"]]: # type: ignore
+        yield await cls.get_new_results(query_string, seen)
+
+    @classmethod
+    async def iter_pages_from(cls, query_string: str, start_page: int) -> AsyncIterator[list["Record"]]: # type: ignore
+        page_index = 0
+        async for page in cls.iter_pages(query_string):
+            if page_index >= start_page:
+                yield page
+            page_index += 1
@@ -1,188 +1,547 @@
-import importlib
-import os
-from types import ModuleType
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from itertools import product
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator
 from unidecode import unidecode
 
-from aw import SCRAPERS_DIR
+from aw import SCRAPER_MAX_WORKERS, SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE
 
+from aw.bloomfilter import BloomFilter
 from aw.constraint import Constraint
-from aw.error import CloseThreadError, SkipScraperError
+from aw.crawlcheckpoint import CrawlCheckpoint
+from aw.crawlstate import crawl_state
+from aw.error import CloseThreadError, InvalidConstraintError, SkipScraperError, StreamClosedError
+from aw.httpclient import http_client
 from aw.logger import logger
+from aw.metrics import metrics
+from aw.pagestream import PageStream
 from aw.query import Query
 from aw.record import Record
-from aw.scraper import Scraper
+from aw.scraper import AsyncScraper, Scraper
+from aw.scraperregistry import scraper_registry
+
+class _AsciizeTable(dict):
+    """
+    Translation table for str.translate mapping code points to their unidecode replacement.
+
+    unidecode transliterates every code point independently, so each character is looked up
+    only once and the cached table then makes asciizing run at str.translate speed.
+    """
+    def __missing__(self, code_point: int) -> str:
+        replacement = unidecode(chr(code_point))
+        self[code_point] = replacement
+        return replacement
 
 class ScraperManager: 
+    RECORD_KEYS = frozenset(field.name for field in fields(Record))
+    """
+    Record attribute names a constraint can target.
+    """
+
+    RELATIONS = frozenset(("eq", "nq", "gt", "ge", "lt", "le", "in", "ni"))
+    """
+    Relations a constraint can use, each backed by a comparison function named _<relation>.
+    """
+
+    _asciize_table = _AsciizeTable()
+
     @classmethod
-    def _get_files_from_scrapers_directory(cls, dir_name:str) -> list[str]:
+    def _compile_constraints(cls, constraints: list[Constraint]) -> Callable[[Record], bool]:
         """
-        Get a list of Python file names from the specified directory.
+        Compile the constraints of a query into a single predicate.
+
+        Keys, relations and values are validated and comparison functions resolved up front, constraint
+        values are normalized once. Numbers are compared as the strings they are written as, e.g. a
+        price of 150 in the queries file. The predicate normalizes every record field at most once
+        and shares it between all constraints targeting that field.
 
         Args:
-            dir_name (str): The directory name where scraper modules are located.
+            constraints (List[Constraint]): The list of constraints to compile.
+
+        Raises:
+            InvalidConstraintError: If a constraint targets an unknown key, uses an unknown relation
+                or its value is neither a string nor a number.
 
         Returns:
-            List[str]: A list of Python file names (without directories).
+            Callable[[Record], bool]: Predicate returning True if a record passes at least one constraint,
+            or every record if there are no constraints.
         """
-        try:
-            py_files_list = [file for file in os.listdir(dir_name) if file.endswith(".py")]
-            return py_files_list
-        except IOError as e:
-            raise CloseThreadError(f"Error accessing directory '{dir_name}': {e}")
+        if not constraints:
+            return lambda record: True
+
+        compiled_constraints = []
+
+        for constraint in constraints:
+            if constraint.key not in cls.RECORD_KEYS:
+                raise InvalidConstraintError(f"Constraint {constraint.id} targets unknown key '{constraint.key}'.")
+            if constraint.relation not in cls.RELATIONS:
+                raise InvalidConstraintError(f"Constraint {constraint.id} uses unknown relation '{constraint.relation}'.")
+            if isinstance(constraint.value, bool) or not isinstance(constraint.value, (str, int, float)):
+                raise InvalidConstraintError(f"Constraint {constraint.id} has invalid value {constraint.value!r}.")
+
+            value = str(constraint.value)
+            compiled_constraints.append((
+                constraint.key,
+                constraint.asciize,
+                getattr(cls, f"_{constraint.relation}"),
+                cls.asciize(value) if constraint.asciize else value
+            ))
+
+        def predicate(record: Record) -> bool:
+            asciized_values = {}
+
+            for key, asciize, operation, constraint_value in compiled_constraints:
+                record_value = getattr(record, key)
+                if asciize:
+                    if key not in asciized_values:
+                        asciized_values[key] = cls.asciize(record_value)
+                    record_value = asciized_values[key]
+
+                if operation(record_value, constraint_value):
+                    return True
+
+            return False
+
+        return predicate
+
+    @classmethod
+    def asciize(cls, text: str) -> str:
+        """
+        Normalize text to ASCII characters.
+
+        Equivalent to unidecode(text).lower(), using a per-character translation table.
+        ASCII text is left untouched by unidecode, so it is only lowercased.
+
+        Args:
+            text (str): The text to normalize.
+
+        Returns:
+            str: The normalized text.
+        """
+        if text.isascii():
+            return text.lower()
+        return text.translate(cls._asciize_table).lower()
+        
     
     @classmethod
-    def _get_modules_from_py_files(cls, py_files: list[str], scrapers_dir: str) -> list[ModuleType]:
+    def _filter_results(cls, constraints: list[Constraint], unfiltered_results: list[Record]) -> list[Record]:
         """
-        Import modules from a list of Python file names.
+        Filter results based on the constraints.
 
         Args:
-            py_files (List[str]): A list of Python file names.
-            scrapers_dir (str): The directory path where scraper modules are located.
+            constraints (List[Constraint]): The list of constraints to apply.
+            unfiltered_results (List[Record]): The list of unfiltered result records.
+
+        Raises:
+            InvalidConstraintError: If the constraints cannot be compiled.
 
         Returns:
-            List[ModuleType]: A list of imported modules.
+            List[Record]: A list of filtered result records that pass at least one constraint.
+        """
+        predicate = cls._compile_constraints(constraints)
+        return [result for result in unfiltered_results if predicate(result)]
+
+    @classmethod
+    def _add_links(cls, links: BloomFilter, page: list[Record]) -> None:
+        """
+        Adds the links of the records on a page to a set of links.
+
+        Args:
+            links (BloomFilter): The set of links.
+            page (List[Record]): The records.
+        """
+        for record in page:
+            if record.link:
+                links.add(record.link)
+
+    @classmethod
+    def _count_page(cls, scraper: type[Scraper] | type[AsyncScraper], page: list[Record]) -> None:
+        metrics.scraped_pages.inc(scraper=scraper.__name__)
+        metrics.scraped_records.inc(len(page), scraper=scraper.__name__)
+
+    @classmethod
+    def _save_seen(cls, scraper: type[Scraper] | type[AsyncScraper], search_key: str, seen: BloomFilter | None, crawled: BloomFilter) -> None:
         """
-        modules_list = []
+        Persists the seen set of a search after a completed crawl.
 
-        for py_file in py_files:
+        Args:
+            scraper (Type[Scraper] | Type[AsyncScraper]): The scraper class which was run.
+            search_key (str): The normalized query string.
+            seen (BloomFilter | None): Links seen by previous crawls, None for a full crawl which rebuilds the set.
+            crawled (BloomFilter): Links crawled by this crawl.
+        """
+        if seen is not None:
             try:
-                relative_path = os.path.join(scrapers_dir, py_file)
-                spec = importlib.util.spec_from_file_location(os.path.splitext(py_file)[0], relative_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                modules_list.append(module)
-            except (FileNotFoundError, ImportError, AttributeError) as e:
-                raise CloseThreadError(f"Error importing module: {e}")
-
-        return modules_list
-    
+                seen.update(crawled)
+                crawled = seen
+            except ValueError:
+                logger.log_error(f"Seen links of '{search_key}' have a different size and are rebuilt.")
+
+        crawl_state.save(scraper, search_key, crawled)
+
     @classmethod
-    def _get_scrapers_from_modules(cls, modules_list: list[ModuleType]) -> list[type[Scraper]]:
+    def _iter_checkpointed_pages(cls, scraper: type[Scraper], query_string: str, checkpoint: CrawlCheckpoint) -> Iterator[list[Record]]:
         """
-        Extract scraper classes from a list of modules.
+        Yields the pages of a full crawl, resuming it from its checkpoint.
+
+        Pages persisted by previous runs are replayed first, the remaining pages are then
+        crawled and persisted one by one before they are yielded.
 
         Args:
-            modules_list (List[ModuleType]): A list of imported modules.
+            scraper (Type[Scraper]): The scraper class to run.
+            query_string (str): The search query string.
+            checkpoint (CrawlCheckpoint): The checkpoint of the crawl.
 
-        Returns:
-            List[Type[Scraper]]: A list of scraper classes.
+        Yields:
+            List[Record]: The Record objects of one result page.
         """
-        scrapers_list = []
+        yield from checkpoint.replay()
+        crawl_state.count("resumed_pages", checkpoint.pages)
+        if checkpoint.complete:
+            return
 
-        for module in modules_list:
-            for object_name in dir(module): # dir(module) lists all object names in module as strings
-                try:
-                    object = getattr(module, object_name, None) # try to access attribute by it's name, third arg says return None if nothing found
-                    if isinstance(object, type) and issubclass(object, Scraper) and not issubclass(Scraper, object): # exclude Scraper itself, include only subclasses
-                        scrapers_list.append(object)
-                except AttributeError as e:
-                    raise CloseThreadError(f"Error accessing object {object_name} in module {module.__name__}: {e}")
+        pages = scraper.iter_pages_from(query_string, checkpoint.pages) if checkpoint.pages else scraper.iter_pages(query_string)
+        for page in pages:
+            checkpoint.append(page)
+            yield page
+        checkpoint.finish()
+
+    @classmethod
+    async def _aiter_checkpointed_pages(cls, scraper: type[AsyncScraper], query_string: str, checkpoint: CrawlCheckpoint) -> AsyncIterator[list[Record]]:
+        """
+        Async counterpart of _iter_checkpointed_pages for async scrapers.
+        """
+        for page in checkpoint.replay():
+            yield page
+        crawl_state.count("resumed_pages", checkpoint.pages)
+        if checkpoint.complete:
+            return
+
+        pages = scraper.iter_pages_from(query_string, checkpoint.pages) if checkpoint.pages else scraper.iter_pages(query_string)
+        async for page in pages:
+            checkpoint.append(page)
+            yield page
+        checkpoint.finish()
 
-        return scrapers_list
-    
     @classmethod
-    def _validate_result(cls, record: Record, constraint: Constraint) -> bool:
+    def _fail_crawl(cls, scraper: type[Scraper] | type[AsyncScraper], query: Query, error: Exception) -> None:
         """
-        Validate a record against a given constraint.
+        Records a crawl which did not complete, the pages it passed to the stream are kept.
 
         Args:
-            record (Record): The record object to validate.
-            constraint (Constraint): The constraint to validate against.
+            scraper (Type[Scraper] | Type[AsyncScraper]): The scraper class which was run.
+            query (Query): The query which was searched for.
+            error (Exception): Why the crawl did not complete.
+        """
+        crawl_state.count("failed_crawls")
+        if isinstance(error, SkipScraperError):
+            logger.log_error(f"Scraper {scraper.BASE_URL} is skipped: {error}")
+        else:
+            logger.log_error(f"Scraping {scraper.BASE_URL} with query {query.query_string} failed, scraped pages are kept: {error}")
 
-        Returns:
-            bool: True if the record passes the constraint, False otherwise.
+    @classmethod
+    def _scrape(cls, scraper: type[Scraper], query: Query, stream: PageStream, incremental: bool = False, rank: int = 0) -> None:
         """
-        try:
-            record_value = getattr(record, constraint.key)
-            operation = getattr(cls, f"_{constraint.relation}")
-            
-            final_constraint_value = cls.asciize(constraint.value) if constraint.asciize else constraint.value
-            final_record_value = cls.asciize(record_value) if constraint.asciize else record_value
+        Run a single scraper with a single query, passing its pages to the stream as they are scraped.
 
-        except AttributeError as e:
-            raise CloseThreadError(f"Error trying to get attribute {constraint.key} value from {record}: {e}")
-            
-        return operation(final_record_value, final_constraint_value)
+        Links are collected into a separate set during the crawl, so a scraper deciding where to stop
+        only ever sees links of previous crawls. A scraper which cannot stop early crawls everything
+        even in an incremental run and keeps no seen set, as nothing would ever read it.
+        A full crawl resumes from its checkpoint.
+        A crawl which fails, or is stopped because the consumer stopped reading the stream,
+        keeps the pages already passed to the stream and is counted as failed, so the run
+        continues with partial results.
 
+        Args:
+            scraper (Type[Scraper]): The scraper class to run.
+            query (Query): The query to search for.
+            stream (PageStream): The stream receiving (search key, rank, page) items.
+            incremental (bool): If True, the scraper may stop at listings seen by previous crawls.
+            rank (int): The rank of the (search, scraper) pair, see iter_results.
+        """
+        search_key = cls._get_search_key(query)
+        can_stop_early = scraper.can_crawl_incrementally()
+        stops_early = incremental and can_stop_early
+        seen = crawl_state.load(scraper, search_key) if stops_early else None
+        checkpoint = None if incremental else crawl_state.open_checkpoint(scraper, search_key)
+        crawled = BloomFilter(SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE) if can_stop_early else None
+
+        try:
+            logger.log_success(f"Scraping {scraper.BASE_URL} with query {query.query_string} started.")
+            if stops_early:
+                pages = scraper.iter_new_pages(query.query_string, seen)
+            elif incremental:
+                pages = scraper.iter_pages(query.query_string)
+            else:
+                pages = cls._iter_checkpointed_pages(scraper, query.query_string, checkpoint)
+            for page in pages:
+                stream.put((search_key, rank, page))
+                if crawled is not None:
+                    cls._add_links(crawled, page)
+                cls._count_page(scraper, page)
+        except (SkipScraperError, CloseThreadError, StreamClosedError) as e:
+            cls._fail_crawl(scraper, query, e)
+            return
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        crawl_state.count("completed_crawls")
+        if crawled is not None:
+            cls._save_seen(scraper, search_key, seen, crawled)
 
     @classmethod
-    def asciize(cls, text: str) -> str:
+    async def _scrape_async(cls, scraper: type[Scraper] | type[AsyncScraper], query: Query, executor: ThreadPoolExecutor, stream: PageStream, incremental: bool = False, rank: int = 0) -> None:
         """
-        Normalize text to ASCII characters.
+        Run a single scraper with a single query on the running event loop.
+
+        Async scrapers are iterated directly, sync scrapers are bridged through the executor.
+        Waiting for room in the stream happens off the event loop. Checkpoints and failures
+        are handled as in _scrape.
 
         Args:
-            text (str): The text to normalize.
+            scraper (Type[Scraper] | Type[AsyncScraper]): The scraper class to run.
+            query (Query): The query to search for.
+            executor (ThreadPoolExecutor): The executor running blocking scrapers.
+            stream (PageStream): The stream receiving (search key, rank, page) items.
+            incremental (bool): If True, the scraper may stop at listings seen by previous crawls.
+            rank (int): The rank of the (search, scraper) pair, see iter_results.
+        """
+        if not issubclass(scraper, AsyncScraper):
+            return await asyncio.get_running_loop().run_in_executor(executor, cls._scrape, scraper, query, stream, incremental, rank)
+
+        search_key = cls._get_search_key(query)
+        can_stop_early = scraper.can_crawl_incrementally()
+        stops_early = incremental and can_stop_early
+        seen = crawl_state.load(scraper, search_key) if stops_early else None
+        checkpoint = None if incremental else crawl_state.open_checkpoint(scraper, search_key)
+        crawled = BloomFilter(SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE) if can_stop_early else None
+
+        try:
+            logger.log_success(f"Scraping {scraper.BASE_URL} with query {query.query_string} started.")
+            if stops_early:
+                pages = scraper.iter_new_pages(query.query_string, seen)
+            elif incremental:
+                pages = scraper.iter_pages(query.query_string)
+            else:
+                pages = cls._aiter_checkpointed_pages(scraper, query.query_string, checkpoint)
+            async for page in pages:
+                await asyncio.to_thread(stream.put, (search_key, rank, page))
+                if crawled is not None:
+                    cls._add_links(crawled, page)
+                cls._count_page(scraper, page)
+        except (SkipScraperError, CloseThreadError, StreamClosedError) as e:
+            cls._fail_crawl(scraper, query, e)
+            return
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        crawl_state.count("completed_crawls")
+        if crawled is not None:
+            cls._save_seen(scraper, search_key, seen, crawled)
+
+    @classmethod
+    def can_crawl_incrementally(cls) -> bool:
+        """
+        Tells whether an incremental run fetches less than a full one, i.e. every scraper can stop early.
+
+        A scraper which cannot stop early crawls everything anyway, so a run should then be full
+        and report disappeared listings.
 
         Returns:
-            str: The normalized text.
+            bool: True if every scraper can crawl incrementally, False otherwise.
+
+        Raises:
+            CloseThreadError: If the scrapers cannot be loaded.
         """
-        return unidecode(text).lower()
-        
-    
+        return all(scraper.can_crawl_incrementally() for scraper in scraper_registry.get_scrapers())
+
     @classmethod
-    def _filter_results(cls, constraints: list[Constraint], unfiltered_results: list[Record]) -> list[Record]:
+    def _get_search_key(cls, query: Query) -> str:
         """
-        Filter results based on the constraints.
+        Normalize a query string so equivalent searches share one key.
+
+        Whitespace is always collapsed, case and diacritics are dropped when the query is asciized.
 
         Args:
-            constraints (List[Constraint]): The list of constraints to apply.
-            unfiltered_results (List[Record]): The list of unfiltered result records.
+            query (Query): The query to compute the key for.
 
         Returns:
-            List[Record]: A list of filtered result records that pass at least one constraint.
+            str: The normalized query string.
         """
-        filtered_res = []
+        normalized = " ".join(query.query_string.split())
+        return cls.asciize(normalized) if query.asciize else normalized
 
-        for result in unfiltered_results:
-            is_passing = False
+    @classmethod
+    async def _produce_pages(cls, searches: list[Query], scrapers: list[type[Scraper] | type[AsyncScraper]], max_workers: int, incremental: bool, stream: PageStream) -> None:
+        """
+        Run every (search, scraper) pair concurrently on one event loop, streaming their pages.
 
-            if not constraints:
-                is_passing = True
+        The first error finishes the stream right away, the remaining scrapers are unwound
+        once the consumer stops reading.
 
-            for constraint in constraints:
-                if cls._validate_result(result, constraint) == True:
-                    is_passing = True
-                    break
-            
-            if is_passing:
-                filtered_res.append(result)
+        Args:
+            searches (List[Query]): One query per distinct search.
+            scrapers (List[Type[Scraper] | Type[AsyncScraper]]): A list of scraper classes.
+            max_workers (int): The maximum number of sync scrapers running at the same time.
+            incremental (bool): If True, scrapers may stop at listings seen by previous crawls.
+            stream (PageStream): The stream receiving (search key, rank, page) items.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tasks = [
+                asyncio.ensure_future(cls._scrape_async(scraper, query, executor, stream, incremental, rank))
+                for rank, (query, scraper) in enumerate(product(searches, scrapers))
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException as e:
+                stream.finish(e)
+                await asyncio.gather(*tasks, return_exceptions=True)
+                return
 
-        return filtered_res
+        stream.finish()
 
     @classmethod
-    def collect_results(cls, queries: list[Query]) -> list[Record]:
+    def _produce(cls, searches: list[Query], scrapers: list[type[Scraper] | type[AsyncScraper]], max_workers: int, incremental: bool, stream: PageStream) -> None:
+        """
+        Drives the event loop of the producer thread, see _produce_pages.
         """
-        Collect results for the given queries by executing all scrapers and filtering based on constraints.
+        try:
+            asyncio.run(cls._produce_pages(searches, scrapers, max_workers, incremental, stream))
+        except BaseException as e:
+            stream.finish(e)
+
+    @classmethod
+    def _filter_page(cls, page: list[Record], compiled_queries: list[tuple[Query, Callable[[Record], bool]]]) -> list[tuple[Query, Record]]:
+        """
+        Filters a page for every query of its search.
+
+        Args:
+            page (List[Record]): The Record objects of the page.
+            compiled_queries (List[tuple[Query, Callable[[Record], bool]]]): The queries with their compiled constraints.
+
+        Returns:
+            List[tuple[Query, Record]]: Records passing the constraints with the query they passed.
+        """
+        start = time.perf_counter()
+        passed = []
+        for query, predicate in compiled_queries:
+            results = [result for result in page if predicate(result)]
+            metrics.passed_records.inc(len(results), query=query.id)
+            passed.extend((query, result) for result in results)
+        metrics.filter_duration.observe(time.perf_counter() - start)
+        return passed
+
+    @classmethod
+    def iter_results(cls, queries: list[Query], max_workers: int = SCRAPER_MAX_WORKERS, incremental: bool = False, deadline: float | None = None) -> Iterator[tuple[Query, Record, int]]:
+        """
+        Stream results for the given queries by executing all scrapers and filtering based on constraints.
+
+        Scrapers come from the shared plugin registry, which only reloads changed files.
+        Every distinct (search, scraper) pair runs concurrently on a single asyncio event loop in
+        a producer thread: async scrapers are iterated directly, sync scrapers run in a bounded
+        thread pool. Queries sharing the same normalized query string are fetched only once per
+        scraper. Pages are passed through a bounded PageStream and filtered lazily as the caller
+        consumes the records, so memory holds about one page per active scraper instead of
+        the whole result set. Records of a (search, scraper) pair keep their page order, pairs
+        interleave as their pages arrive. Every record comes with the rank of its pair (searches
+        in query order, scrapers in registry order), so sorting by rank stably restores an order
+        which does not depend on network timing.
+        Constraints are compiled before scraping starts, queries with invalid constraints are skipped.
+
+        Links of crawled listings are remembered per search. In an incremental run scrapers
+        may stop paginating at listings seen before, so the results only contain the newest listings.
+        Seen sets are only saved for crawls which completed. Pages of a full run are checkpointed,
+        so a failed or interrupted full run resumes where it stopped. A (search, scraper) pair
+        which fails after its page retries does not abort the run, its results stay partial and
+        the failure is counted in crawl_state statistics.
+
+        When the deadline passes, scraping stops cooperatively: requests not yet sent are
+        cancelled, the crawls still running are counted as failed and the pages scraped
+        so far are still filtered, so the run ends with partial results.
 
         Args:
             queries (List[Query]): A list of queries to execute.
+            max_workers (int): The maximum number of sync scrapers running at the same time.
+            incremental (bool): If True, run an incremental crawl instead of a full one.
+            deadline (float | None): Monotonic time at which scraping is cancelled, None for no deadline.
 
         Raises:
             CloseThreadError
 
-        Returns:
-            List[Record]: A list of filtered result records.
+        Yields:
+            tuple[Query, Record, int]: Filtered result records with the query they passed and the rank
+            of their (search, scraper) pair, a record passing several queries is yielded once per query.
         """
         try:
-            files = cls._get_files_from_scrapers_directory(SCRAPERS_DIR)
-            modules = cls._get_modules_from_py_files(files, SCRAPERS_DIR)
-            scrapers = cls._get_scrapers_from_modules(modules)
-            filtered_results = []
+            scrapers = scraper_registry.get_scrapers()
 
+            queries_per_search = {}
             for query in queries:
-                unfiltered_results_per_query = []
-                for scraper in scrapers:
+                try:
+                    predicate = cls._compile_constraints(query.constraint_list)
+                except InvalidConstraintError as e:
+                    logger.log_error(f"Query {query.id} is skipped: {e}")
+                    continue
+                queries_per_search.setdefault(cls._get_search_key(query), []).append((query, predicate))
+
+            searches = [compiled_queries[0][0] for compiled_queries in queries_per_search.values()]
+            duplicate_count = sum(len(compiled_queries) for compiled_queries in queries_per_search.values()) - len(searches)
+            if duplicate_count:
+                logger.log_success(f"{duplicate_count} duplicate searches merged.")
+
+            stream = PageStream(deadline=deadline)
+            producer = threading.Thread(
+                target=cls._produce, args=(searches, scrapers, max_workers, incremental, stream), daemon=True
+            )
+            producer.start()
+
+            try:
+                for search_key, rank, page in stream:
+                    for query, record in cls._filter_page(page, queries_per_search[search_key]):
+                        yield query, record, rank
+
+                if stream.expired:
+                    logger.log_error("Run deadline passed, outstanding fetches cancelled, partial results kept.")
+                    http_client.cancel()
                     try:
-                        logger.log_success(f"Scraping {scraper.BASE_URL} with query {query.query_string} started.")
-                        unfiltered_results_per_scraper = scraper.get_results(query.query_string)
-                        unfiltered_results_per_query.extend(unfiltered_results_per_scraper)
-                    except SkipScraperError as e:
-                        logger.log_error(f"Scraper {scraper.BASE_URL} is skipped: {e}")
-                filtered_results.extend(cls._filter_results(query.constraint_list, unfiltered_results_per_query))
-
-            return filtered_results
+                        producer.join()
+                    finally:
+                        http_client.resume()
+                    for search_key, rank, page in stream.drain():
+                        for query, record in cls._filter_page(page, queries_per_search[search_key]):
+                            yield query, record, rank
+            finally:
+                stream.stop()
+                producer.join()
         except Exception as e:
             raise CloseThreadError(f"Uncaught exception: {e}") from e
+
+    @classmethod
+    def collect_results(cls, queries: list[Query], max_workers: int = SCRAPER_MAX_WORKERS, incremental: bool = False) -> list[Record]:
+        """
+        Collect results for the given queries into a list, see iter_results.
+
+        Records are ordered by their (search, scraper) pair, then by page, regardless of
+        the order in which the pages arrived.
+
+        Args:
+            queries (List[Query]): A list of queries to execute.
+            max_workers (int): The maximum number of sync scrapers running at the same time.
+            incremental (bool): If True, run an incremental crawl instead of a full one.
+
+        Raises:
+            CloseThreadError
+
+        Returns:
+            List[Record]: A list of filtered result records.
+        """
+        results = sorted(cls.iter_results(queries, max_workers, incremental), key=lambda result: result[2])
+        return [record for _, record, _ in results]
     
     ##################################
     ###### comparison functions ######
@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+from types import ModuleType
+
+@dataclass
+class ScraperPlugin:
+    """
+    Represents a scraper module loaded from the scrapers directory.
+
+    Attributes:
+        file_name (str): Name of the Python file the plugin was loaded from.
+        mtime (float): Modification time of the file when it was last checked.
+        digest (str): SHA-256 hash of the file content the module was executed from.
+        module (ModuleType): The executed module.
+        scrapers (list[type]): Scraper and AsyncScraper subclasses found in the module.
+        load_time (float): Number of seconds it took to execute the module.
+    """
+    file_name: str
+    mtime: float
+    digest: str
+    module: ModuleType
+    scrapers: list[type]
+    load_time: float
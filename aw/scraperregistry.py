@@ -0,0 +1,178 @@
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from types import ModuleType
+
+from aw import SCRAPERS_DIR
+from aw.error import CloseThreadError
+from aw.logger import logger
+from aw.scraper import AsyncScraper, Scraper
+from aw.scraperplugin import ScraperPlugin
+
+class ScraperRegistry:
+    """
+    Keeps scraper plugins loaded between Tasker runs.
+
+    Each scraper file is executed once. On every refresh the registry only stats the files
+    and reloads a plugin when its modification time changed and its content hash differs,
+    so a long-running daemon neither repeats import work nor creates new scraper classes.
+
+    Attributes:
+        _scrapers_dir (str): The directory where scraper modules are located.
+        _plugins (dict[str, ScraperPlugin]): Loaded plugins keyed by file name.
+        _lock (threading.Lock): Lock ensuring only one refresh runs at a time.
+    """
+    def __init__(self, scrapers_dir: str = SCRAPERS_DIR) -> None:
+        self._scrapers_dir = scrapers_dir
+        self._plugins = {}
+        self._lock = threading.Lock()
+
+    def _get_files_from_scrapers_directory(self) -> list[str]:
+        """
+        Get a sorted list of Python file names from the scrapers directory.
+
+        Returns:
+            List[str]: A list of Python file names (without directories).
+
+        Raises:
+            CloseThreadError: If the directory cannot be listed.
+        """
+        try:
+            return sorted(file for file in os.listdir(self._scrapers_dir) if file.endswith(".py"))
+        except IOError as e:
+            raise CloseThreadError(f"Error accessing directory '{self._scrapers_dir}': {e}")
+
+    def _get_scrapers_from_module(self, module: ModuleType) -> list[type]:
+        """
+        Extract scraper classes from a module.
+
+        Args:
+            module (ModuleType): An imported module.
+
+        Returns:
+            List[type]: A list of Scraper and AsyncScraper subclasses.
+        """
+        scrapers_list = []
+
+        for object_name in dir(module): # dir(module) lists all object names in module as strings
+            object = getattr(module, object_name, None) # third arg says return None if nothing found
+            if not isinstance(object, type):
+                continue
+            for base in (Scraper, AsyncScraper):
+                if issubclass(object, base) and not issubclass(base, object): # exclude base classes, include only subclasses
+                    scrapers_list.append(object)
+
+        return scrapers_list
+
+    def _load_plugin(self, file_name: str, mtime: float, digest: str) -> ScraperPlugin:
+        """
+        Executes a scraper module and collects its scraper classes.
+
+        Args:
+            file_name (str): Name of the Python file.
+            mtime (float): Modification time of the file.
+            digest (str): SHA-256 hash of the file content.
+
+        Returns:
+            ScraperPlugin: The loaded plugin.
+
+        Raises:
+            CloseThreadError: If the module cannot be imported.
+        """
+        start = time.perf_counter()
+
+        try:
+            relative_path = os.path.join(self._scrapers_dir, file_name)
+            spec = importlib.util.spec_from_file_location(os.path.splitext(file_name)[0], relative_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        except (FileNotFoundError, ImportError, AttributeError) as e:
+            raise CloseThreadError(f"Error importing module: {e}")
+
+        plugin = ScraperPlugin(
+            file_name = file_name,
+            mtime = mtime,
+            digest = digest,
+            module = module,
+            scrapers = self._get_scrapers_from_module(module),
+            load_time = time.perf_counter() - start
+        )
+        logger.log_success(f"Scraper plugin {file_name} loaded in {plugin.load_time * 1000:.1f} ms.")
+
+        return plugin
+
+    def refresh(self) -> None:
+        """
+        Loads new plugins, reloads changed ones and forgets plugins whose files were removed.
+
+        Raises:
+            CloseThreadError: If the directory or a changed module cannot be read or imported.
+        """
+        with self._lock:
+            files = self._get_files_from_scrapers_directory()
+
+            for file_name in set(self._plugins) - set(files):
+                del self._plugins[file_name]
+                logger.log_success(f"Scraper plugin {file_name} unloaded.")
+
+            for file_name in files:
+                path = os.path.join(self._scrapers_dir, file_name)
+                plugin = self._plugins.get(file_name)
+
+                try:
+                    mtime = os.stat(path).st_mtime
+                    if plugin is not None and plugin.mtime == mtime:
+                        continue
+                    with open(path, "rb") as file:
+                        digest = hashlib.sha256(file.read()).hexdigest()
+                except IOError as e:
+                    raise CloseThreadError(f"Error reading scraper file '{path}': {e}")
+
+                if plugin is not None and plugin.digest == digest:
+                    plugin.mtime = mtime
+                    continue
+
+                self._plugins[file_name] = self._load_plugin(file_name, mtime, digest)
+
+    def get_plugins(self) -> list[ScraperPlugin]:
+        """
+        Returns the currently loaded plugins in file name order.
+
+        Returns:
+            List[ScraperPlugin]: The loaded plugins including their load times.
+        """
+        with self._lock:
+            return [self._plugins[file_name] for file_name in sorted(self._plugins)]
+
+    def get_module_digest(self, module_name: str) -> str | None:
+        """
+        Finds the content hash of the plugin file a module was executed from.
+
+        Args:
+            module_name (str): Name of the plugin module, the file name without extension.
+
+        Returns:
+            str | None: SHA-256 hash of the plugin file, or None if no loaded plugin has the module.
+        """
+        with self._lock:
+            for plugin in self._plugins.values():
+                if plugin.module.__name__ == module_name:
+                    return plugin.digest
+        return None
+
+    def get_scrapers(self) -> list[type]:
+        """
+        Refreshes the registry and returns all scraper classes in a deterministic order.
+
+        Returns:
+            List[type]: Scraper and AsyncScraper subclasses of all loaded plugins.
+
+        Raises:
+            CloseThreadError: If the plugins cannot be refreshed.
+        """
+        self.refresh()
+        return [scraper for plugin in self.get_plugins() for scraper in plugin.scrapers]
+
+scraper_registry = ScraperRegistry()
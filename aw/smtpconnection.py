@@ -0,0 +1,163 @@
+from email.message import Message
+import smtplib
+from typing import Callable
+
+from aw.error import CloseThreadError
+from aw.logger import logger
+
+class SmtpConnection:
+    """
+    One authenticated SMTP connection reused for every message sent during a run.
+
+    The connection is opened lazily by the first message, so a run without mail never
+    connects. When the server drops an idle or overloaded connection, the message is
+    sent again over a new connection.
+
+    Attributes:
+        _server (str): The SMTP server address.
+        _port (int): The SMTP server port.
+        _login (str): The login, also used as the sender address.
+        _password (str): The password.
+        _connection_factory (Callable[[str, int], smtplib.SMTP]): Creates the underlying connection,
+            smtplib.SMTP_SSL by default, smtplib.SMTP for a local stand-in server.
+        _smtp (smtplib.SMTP | None): The open connection, None until the first message.
+        _stats (dict[str, int]): Numbers of messages sent, connections opened and reconnects.
+    """
+    MAX_ATTEMPTS = 2
+    """
+    Number of times a message is sent before a dropped connection is reported as an error.
+    """
+
+    def __init__(self, server: str, port: int, login: str, password: str, connection_factory: Callable[[str, int], smtplib.SMTP] = smtplib.SMTP_SSL) -> None:
+        self._server = server
+        self._port = int(port)
+        self._login = login
+        self._password = password
+        self._connection_factory = connection_factory
+        self._smtp = None
+        self._stats = {"messages": 0, "connections": 0, "reconnects": 0}
+
+    @property
+    def sender(self) -> str:
+        return self._login
+
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Opens and authenticates a new connection.
+
+        Returns:
+            smtplib.SMTP: The authenticated connection.
+
+        Raises:
+            CloseThreadError: If the server cannot be reached or rejects the login.
+        """
+        try:
+            smtp = self._connection_factory(self._server, self._port)
+        except (smtplib.SMTPException, OSError) as e:
+            raise CloseThreadError(f"Connection to SMTP server failed: {e}")
+
+        try:
+            smtp.login(self._login, self._password)
+        except smtplib.SMTPAuthenticationError as e:
+            smtp.close()
+            raise CloseThreadError(f"Autenthication to mail server failed: {e}")
+        except (smtplib.SMTPException, OSError) as e:
+            smtp.close()
+            raise CloseThreadError(f"Unexpected error during SMTP connection: {e}")
+
+        self._stats["connections"] += 1
+        return smtp
+
+    def _send(self, send: Callable[[smtplib.SMTP], dict]) -> dict:
+        """
+        Runs a send over the shared connection, reconnecting if the server dropped it.
+
+        Args:
+            send (Callable[[smtplib.SMTP], dict]): Sends one message over the given connection.
+
+        Returns:
+            dict: Recipients which were refused, if empty, sending was successful.
+
+        Raises:
+            CloseThreadError: If the message cannot be sent.
+        """
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            if self._smtp is None:
+                self._smtp = self._connect()
+
+            try:
+                result = send(self._smtp)
+                self._stats["messages"] += 1
+                return result
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._smtp.close()
+                self._smtp = None
+                if attempt == self.MAX_ATTEMPTS:
+                    raise CloseThreadError(f"SMTP server repeatedly dropped the connection: {e}")
+                self._stats["reconnects"] += 1
+                logger.log_error(f"SMTP connection dropped, reconnecting: {e}")
+            except smtplib.SMTPRecipientsRefused as e:
+                return e.recipients
+            except smtplib.SMTPException as e:
+                raise CloseThreadError(f"Unexpected error during SMTP connection: {e}")
+
+    def send(self, message: Message) -> dict:
+        """
+        Sends a message over the shared connection, reconnecting if the server dropped it.
+
+        Args:
+            message (Message): The message, its From and To headers define the envelope.
+
+        Returns:
+            dict: Recipients which were refused, if empty, sending was successful.
+
+        Raises:
+            CloseThreadError: If the message cannot be sent.
+        """
+        return self._send(lambda smtp: smtp.send_message(message))
+
+    def send_bytes(self, sender: str, recipients: list[str], data: bytes) -> dict:
+        """
+        Sends an already serialized message over the shared connection, see send.
+
+        Args:
+            sender (str): The envelope sender.
+            recipients (list[str]): The envelope recipients.
+            data (bytes): The message with CRLF line endings.
+
+        Returns:
+            dict: Recipients which were refused, if empty, sending was successful.
+
+        Raises:
+            CloseThreadError: If the message cannot be sent.
+        """
+        return self._send(lambda smtp: smtp.sendmail(sender, recipients, data))
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns delivery statistics of the connection.
+
+        Returns:
+            dict[str, int]: Numbers of messages sent, connections opened and reconnects.
+        """
+        return dict(self._stats)
+
+    def close(self) -> None:
+        """
+        Closes the connection politely, ignoring a server which already dropped it.
+        """
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        finally:
+            self._smtp = None
+
+    def __enter__(self) -> "SmtpConnection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
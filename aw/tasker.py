@@ -1,37 +1,229 @@
+import threading
+import time
+from typing import Iterable, Iterator
+
+from aw import LOGIN, RECIPIENT, TASK_DEADLINE
 from aw.mailer import Mailer
 from aw.scrapermanager import ScraperManager
 from aw.config import Config
+from aw.crawlstate import crawl_state
 from aw.error import CloseThreadError, QueriesNotLoadedError
+from aw.httpclient import http_client
 from aw.logger import logger
+from aw.metrics import metrics
+from aw.outbox import outbox
+from aw.pagecache import page_cache
+from aw.query import Query
 from aw.querymanager import QueryManager
+from aw.ratelimiter import rate_limiter
+from aw.record import Record
+from aw.resultstore import ResultStore
 
 class Tasker:
+    """
+    Runs the scraping and reporting task, at most one run at a time.
+
+    Attributes:
+        _condition (threading.Condition): Guards the run state, signalled when a run finishes.
+        _running (bool): Whether a run is in progress.
+        _pending (bool): Whether a run was triggered while another one was in progress.
+        _pending_query_ids (set[int] | None): IDs of the queries the follow-up run covers, None for all queries.
+    """
+    _condition = threading.Condition()
+    _running = False
+    _pending = False
+    _pending_query_ids = None
+
+    @classmethod
+    def _route_results(cls, results: Iterable[tuple[Query, Record, int]], default_recipient: str) -> Iterator[tuple[Record, str, int]]:
+        """
+        Routes every result to the recipients of the query it passed.
+
+        Args:
+            results (Iterable[tuple[Query, Record, int]]): Filtered records with their queries and ranks.
+            default_recipient (str): Recipient of queries without their own recipients.
+
+        Yields:
+            tuple[Record, str, int]: The record, a recipient and the rank of the record, once per recipient.
+        """
+        for query, record, rank in results:
+            for recipient in query.recipients or (default_recipient,):
+                yield record, recipient, rank
+
+    @classmethod
+    def _merge_query_ids(cls, first: set[int] | None, second: Iterable[int] | None) -> set[int] | None:
+        """
+        Merges the query selections of two triggers.
+
+        Args:
+            first (set[int] | None): IDs of the queries selected by one trigger, None for all queries.
+            second (Iterable[int] | None): IDs of the queries selected by the other trigger, None for all queries.
+
+        Returns:
+            set[int] | None: IDs of the queries selected by either trigger, None for all queries.
+        """
+        if first is None or second is None:
+            return None
+        return first | set(second)
+
     @classmethod
-    def do_task(cls, config: Config, qm: QueryManager) -> None:
+    def trigger(cls, config: Config, qm: QueryManager, wait: bool = False, query_ids: Iterable[int] | None = None) -> bool:
+        """
+        Runs the task unless a run is already in progress, single-flight.
+
+        Triggers arriving during a run are coalesced: however many arrive, the run in progress
+        is followed by a single further run covering the queries of all of them, so runs never
+        overlap and a slow run is never followed by a burst of runs.
+
+        Args:
+            config (Config): Configuration object passed to do_task.
+            qm (QueryManager): Query manager passed to do_task.
+            wait (bool): If True, wait for the run in progress to finish and run afterwards
+                instead of coalescing.
+            query_ids (Iterable[int] | None): IDs of the queries to run, None for all queries.
+
+        Returns:
+            bool: True if the task ran in this call, False if the trigger was coalesced.
+        """
+        query_ids = None if query_ids is None else set(query_ids)
+
+        with cls._condition:
+            if wait:
+                cls._condition.wait_for(lambda: not cls._running)
+            elif cls._running:
+                cls._pending_query_ids = cls._merge_query_ids(cls._pending_query_ids, query_ids) if cls._pending else query_ids
+                cls._pending = True
+                logger.log_success("Task already running, the trigger is coalesced into a follow-up run.")
+                return False
+            cls._running = True
+
+        try:
+            while True:
+                cls.do_task(config, qm, query_ids=query_ids)
+                with cls._condition:
+                    if not cls._pending:
+                        break
+                    query_ids = cls._pending_query_ids
+                    cls._pending = False
+                    cls._pending_query_ids = None
+                logger.log_success("Starting follow-up run of coalesced triggers.")
+        finally:
+            with cls._condition:
+                cls._running = False
+                cls._condition.notify_all()
+
+        return True
+
+    @classmethod
+    def do_task(cls, config: Config, qm: QueryManager, deadline: float | None = TASK_DEADLINE, query_ids: Iterable[int] | None = None) -> None:
         """
         Executes the main task of fetching queries, scraping results, and sending emails.
 
+        Results are streamed from the scrapers straight into the result store and only
+        listings which are new or which disappeared since the previous run are mailed. Between full runs, which happen at most
+        FULL_CRAWL_INTERVAL apart, runs are incremental and only crawl the newest listings,
+        unless some scraper cannot stop early, in which case every run of all queries is full.
+        A run in which some crawls failed keeps its partial results but does not count as
+        full, so the next run crawls fully again, resuming from the checkpoints of this one.
+        A run which resumed from checkpoints does not count as full either: listings shift
+        between pages of the live search while the crawl is paused, so the resumed crawl may
+        miss some of them and must not report them as disappeared. Its checkpoints are cleared,
+        so the run after it crawls everything afresh.
+        Every recipient gets one report covering all of their queries, large reports are
+        sent as compressed attachments split over several mails. Reports are queued
+        in the outbox and delivered by the OutboxSender, so the run never waits for SMTP.
+        Pipeline metrics are written to METRICS_FILE after every run.
+        Scraping is cancelled once the deadline passes, the run then keeps and mails the
+        results scraped so far like a run in which some crawls failed.
+        A run may cover only some queries, such as those due on their own schedule. It is then
+        incremental, unless a full crawl is due, in which case it covers all queries, as
+        disappeared listings can only be told apart in a run crawling all of them.
+        Runs should be started through trigger, which never lets them overlap.
+
         Args:
             config (Config): Configuration object containing email and other settings.
             qm (QueryManager): Manages query fetching from the data source.
+            deadline (float | None): Seconds after the start of the run at which scraping is cancelled, None for no deadline.
+            query_ids (Iterable[int] | None): IDs of the queries to run, None for all queries.
 
         Returns:
             None
         """
+        start = time.monotonic()
+        mode = "unknown"
+        result = "error"
+
         try:
+            http_client.reset_stats()
+            page_cache.reset_stats()
+            crawl_state.reset_stats()
+            rate_limiter.reset_stats()
+            store = ResultStore()
+            full_crawl_due = store.is_full_crawl_due()
+            sender = config.get_key(LOGIN)
+            default_recipient = config.get_key(RECIPIENT)
             queries = qm.fetch_queries()
             logger.log_success("Queries fetched successfully.")
-            results = ScraperManager.collect_results(queries)
+            if query_ids is not None:
+                if full_crawl_due:
+                    logger.log_success("Full crawl is due, all queries are run.")
+                    query_ids = None
+                else:
+                    query_ids = set(query_ids)
+                    queries = [query for query in queries if query.id in query_ids]
+                    if not queries:
+                        logger.log_success("None of the scheduled queries exist anymore, run skipped.")
+                        result = "skipped"
+                        return
+                    logger.log_success(f"Running {len(queries)} scheduled queries: {', '.join(str(query.id) for query in queries)}.")
+            incremental = not full_crawl_due and (query_ids is not None or ScraperManager.can_crawl_incrementally())
+            mode = "incremental" if incremental else "full"
+            logger.log_success(f"Starting {'incremental' if incremental else 'full'} crawl.")
+            results = ScraperManager.iter_results(
+                queries, incremental=incremental, deadline=start + deadline if deadline is not None else None
+            )
+            run = store.save_run(cls._route_results(results, default_recipient), full=False)
+            crawl_stats = crawl_state.get_stats()
+            if crawl_stats["failed_crawls"]:
+                logger.log_error(f"{crawl_stats['failed_crawls']} crawls failed, partial results stored.")
+            elif not incremental:
+                crawl_state.clear_checkpoints()
+                if crawl_stats["resumed_pages"]:
+                    logger.log_success("Crawl resumed from checkpoints, the run does not count as full and the next run crawls fully again.")
+                else:
+                    store.mark_full(run)
             logger.log_success("Results scraped successfully.")
-            status = Mailer.send_mail(results, config)
-            if not status:
-                logger.log_success("Mail sent successfully.")
-            else:
-                logger.log_error("Mail sending failed.")
+            logger.log_success(f"Crawl stats: {crawl_stats}")
+            logger.log_success(f"HTTP stats: {http_client.get_stats()}")
+            logger.log_success(f"Page cache stats: {page_cache.get_stats()}")
+            logger.log_success(f"Rate limits: {rate_limiter.get_stats()}")
+
+            recipients = list(dict.fromkeys(
+                recipient for query in queries for recipient in query.recipients or (default_recipient,)
+            ))
+
+            for recipient in recipients:
+                new_count, disappeared_count = store.count_changes(run, recipient)
+                logger.log_success(f"{new_count} new and {disappeared_count} disappeared listings found for {recipient}.")
+                if not new_count and not disappeared_count:
+                    logger.log_success(f"No listings changed, mail to {recipient} not sent.")
+                    continue
+                messages = Mailer.compose_mails(
+                    store.iter_new_records(run, recipient), sender, recipient,
+                    store.iter_disappeared_records(run, recipient), new_count, disappeared_count
+                )
+                for message in messages:
+                    logger.log_success(f"Mail to {recipient} queued as {outbox.put(message)}.")
+
+            result = "partial" if crawl_stats["failed_crawls"] else "success"
         except CloseThreadError as e:
             logger.log_error(f"Thread unexpectedly closed: {e}")
         except QueriesNotLoadedError:
             logger.log_error("Queries couldn't be loaded. Thread closed.")
         except Exception as e:
             logger.log_error(f"Uncaught exception: {e}")
-        
+        finally:
+            metrics.run_duration.observe(time.monotonic() - start, mode=mode)
+            metrics.runs.inc(mode=mode, result=result)
+            metrics.last_run_timestamp.set(time.time())
+            metrics.write()
@@ -0,0 +1,88 @@
+"""
+Benchmark of mail delivery throughput against a local SMTP stand-in.
+
+Sends the same number of small reports once over a fresh connection per message
+(the former Mailer behaviour) and once over a shared SmtpConnection, optionally with
+the stand-in dropping the shared connection every few messages, and prints the
+messages per second of each mode as JSON lines.
+
+Usage:
+    python -m benchmarks.mail_delivery [--messages N] [--records R] [--drop-after D]
+"""
+import argparse
+import json
+import smtplib
+import sys
+import time
+
+from aw.mailer import Mailer
+from aw.smtpconnection import SmtpConnection
+from benchmarks.report_render import generate_records
+from benchmarks.smtp_standin import SmtpStandIn
+
+def deliver(server: SmtpStandIn, messages: int, records: int, shared: bool) -> dict:
+    """
+    Sends reports to distinct recipients.
+
+    Args:
+        server (SmtpStandIn): The running stand-in.
+        messages (int): Number of reports.
+        records (int): Number of records per report.
+        shared (bool): Whether all reports share one connection.
+
+    Returns:
+        dict: The measured results.
+    """
+    def connect() -> SmtpConnection:
+        return SmtpConnection("127.0.0.1", server.port, "watchdog@localhost", "secret", smtplib.SMTP)
+
+    shared_connection = connect() if shared else None
+    start = time.perf_counter()
+
+    for i in range(messages):
+        connection = shared_connection or connect()
+        html_part = Mailer._render_html_part(generate_records(records), [])
+        connection.send(Mailer._create_mail(html_part, connection.sender, f"reader{i}@localhost"))
+        if not shared:
+            connection.close()
+
+    seconds = time.perf_counter() - start
+    stats = shared_connection.get_stats() if shared else {"connections": messages, "reconnects": 0}
+    if shared:
+        shared_connection.close()
+
+    return {
+        "benchmark": "mail_delivery",
+        "mode": "shared" if shared else "per_message",
+        "drop_after": server.drop_after,
+        "messages": messages,
+        "records_per_message": records,
+        "seconds": round(seconds, 4),
+        "messages_per_second": round(messages / seconds, 1),
+        "connections": stats["connections"],
+        "reconnects": stats["reconnects"]
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--records", type=int, default=20)
+    parser.add_argument("--drop-after", type=int, default=50)
+    args = parser.parse_args()
+
+    for drop_after, shared in ((None, False), (None, True), (args.drop_after, True)):
+        server = SmtpStandIn(drop_after).start()
+        try:
+            result = deliver(server, args.messages, args.records, shared)
+        finally:
+            server.shutdown()
+            server.server_close()
+        if server.messages != args.messages:
+            print(f"Stand-in received {server.messages} of {args.messages} messages.", file=sys.stderr)
+            return 1
+        print(json.dumps(result))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
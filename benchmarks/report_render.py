@@ -0,0 +1,86 @@
+"""
+Benchmark of rendering the HTML mail report.
+
+Renders a report of synthetic records into the MIME part, once timed and once under
+tracemalloc, and prints the results as a JSON line. Exits with status 1 when a limit is exceeded.
+
+Usage:
+    python -m benchmarks.report_render [--records N] [--max-seconds S] [--max-mib M]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Iterator
+
+from aw.mailer import Mailer
+from aw.record import Record
+
+def generate_records(count: int) -> Iterator[Record]:
+    """
+    Generates records resembling scraped listings, including characters which must be escaped.
+
+    Args:
+        count (int): Number of records.
+
+    Yields:
+        Record: The synthetic records.
+    """
+    for i in range(count):
+        yield Record(
+            name = f"Válka s mloky & <Krakatit> {i}",
+            author = "Karel Čapek",
+            price = f"{100 + i % 900} Kč",
+            publisher = "Fr. Borový \"Praha\"",
+            issue_year = str(1920 + i % 100),
+            link = f"https://www.trhknih.cz/kniha/{i}?ref=search&page={i // 20 + 1}"
+        )
+
+def render(count: int) -> int:
+    """
+    Renders a report of new and disappeared listings, half of the records each.
+
+    Args:
+        count (int): Total number of records.
+
+    Returns:
+        int: Size of the base64 encoded payload in characters.
+    """
+    html_part = Mailer._render_html_part(generate_records(count - count // 2), generate_records(count // 2))
+    return len(html_part.get_payload())
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--max-mib", type=float, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    payload_size = render(args.records)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(args.records)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "benchmark": "report_render",
+        "records": args.records,
+        "seconds": round(seconds, 4),
+        "records_per_second": round(args.records / seconds),
+        "payload_bytes": payload_size,
+        "peak_mib": round(peak / 2 ** 20, 2)
+    }
+    print(json.dumps(result))
+
+    if args.max_seconds is not None and seconds > args.max_seconds:
+        return 1
+    if args.max_mib is not None and result["peak_mib"] > args.max_mib:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Minimal local SMTP server standing in for the real mail server in benchmarks.
+
+It speaks just enough ESMTP for smtplib: EHLO/HELO, AUTH PLAIN/LOGIN (any credentials),
+MAIL, RCPT, DATA, RSET, NOOP and QUIT. Messages are counted, not stored. It can drop
+every connection after a number of messages to exercise reconnect paths.
+"""
+import socketserver
+import threading
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP stand-in listening on a free local port.
+
+    Attributes:
+        drop_after (int | None): Number of messages after which a connection is dropped, None to never drop.
+        messages (int): Number of messages received.
+        connections (int): Number of connections accepted.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drop_after: int | None = None) -> None:
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.drop_after = drop_after
+        self.messages = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "SmtpStandIn":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        self.server.count("connections")
+        messages = 0
+        self._reply("220 localhost ESMTP stand-in")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+
+            if command.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif command.startswith("AUTH LOGIN"):
+                for prompt in ("334 VXNlcm5hbWU6", "334 UGFzc3dvcmQ6"):
+                    self._reply(prompt)
+                    self.rfile.readline()
+                self._reply("235 Authentication successful")
+            elif command.startswith("AUTH"):
+                self._reply("235 Authentication successful")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.count("messages")
+                messages += 1
+                self._reply("250 OK queued")
+                if self.server.drop_after is not None and messages >= self.server.drop_after:
+                    return
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
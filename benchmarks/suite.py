@@ -0,0 +1,394 @@
+"""
+Offline benchmark suite of the scraping and reporting pipeline.
+
+Every stage is measured separately and without network access:
+    parse    TrhknihScraper parsing of the saved result pages: building the strained soup
+             and extracting records (_get_serp_item_class_elements, _get_record_from_element)
+    filter   ScraperManager._filter_results over a grid of constraint and record counts,
+             after checking that asciize matches unidecode on the generated records
+    render   Mailer rendering of inline reports and of reports composed as mails
+    do_task  a whole Tasker.do_task run against a local stand-in serving the saved pages,
+             cold (empty store and cache) and warm (revalidating the cached pages)
+
+Every case prints one JSON line, timings are the best of --repeat runs. With --baseline,
+the results are compared to a previous output of the suite and the suite exits with
+status 1 when a case is slower than its baseline by more than --tolerance.
+
+Usage:
+    python -m benchmarks.suite [--stage STAGE ...] [--repeat N] [--baseline FILE] [--tolerance T]
+"""
+import argparse
+from contextlib import contextmanager
+from dataclasses import astuple
+from datetime import datetime
+import json
+import logging
+import os
+from os.path import join
+import sys
+import tempfile
+import time
+from typing import Callable, Iterator
+from unidecode import unidecode
+
+import aw.config
+import aw.metrics
+import aw.querymanager
+import aw.resultstore
+from aw import LOGIN, PASSWORD, RECIPIENT, SERVER, PORT, LOG_DIR
+from aw.config import Config
+from aw.constraint import Constraint
+from aw.crawlstate import crawl_state
+from aw.htmlparser import HtmlParser
+from aw.httpclient import http_client
+from aw.logger import logger
+from aw.mailer import Mailer
+from aw.outbox import outbox
+from aw.pagecache import page_cache
+from aw.query import Query
+from aw.querymanager import QueryManager
+from aw.ratelimiter import RateLimiter
+from aw.record import Record
+from aw.scrapermanager import ScraperManager
+from aw.scraperregistry import scraper_registry
+from aw.tasker import Tasker
+from benchmarks.report_render import generate_records
+from benchmarks.trhknih_standin import TrhknihStandIn
+from scrapers.trhknih import TrhknihScraper
+
+STAGES = ("parse", "filter", "render", "do_task")
+"""
+Benchmarked stages in the order they run.
+"""
+
+CONSTRAINT_TEMPLATES = (
+    ("name", "in", "krakatit> 7"),
+    ("price", "lt", "150"),
+    ("author", "eq", "bohumil hrabal"),
+    ("issue_year", "ge", "2015"),
+    ("publisher", "in", "odeon")
+)
+"""
+Constraints cycled through to build queries with many constraints, the value gets a suffix when repeated.
+"""
+
+def measure(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    """
+    Runs a function several times.
+
+    Args:
+        fn (Callable[[], object]): The measured function.
+        repeat (int): Number of runs.
+
+    Returns:
+        tuple[float, object]: The fastest run in seconds and the result of the last run.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def load_fixture_pages() -> list[str]:
+    """
+    Reads the saved result pages in page order.
+
+    Returns:
+        list[str]: The HTML of every page.
+    """
+    server = TrhknihStandIn()
+    server.server_close()
+    return [server.pages[page].decode() for page in sorted(server.pages)]
+
+def bench_parse(repeat: int, passes: int = 20) -> Iterator[dict]:
+    """
+    Measures parsing of the saved pages, passes times over all pages per run.
+
+    Yields:
+        dict: Results of building the soups, of extracting records from built soups and of both.
+    """
+    pages = load_fixture_pages() * passes
+
+    def make_soups() -> list:
+        return [HtmlParser.make_soup(html, parse_only=TrhknihScraper.PARSE_ONLY) for html in pages]
+
+    def extract_records(soups: list) -> int:
+        return sum(
+            1 for soup in soups
+            for item in TrhknihScraper._get_serp_item_class_elements(soup)
+            if TrhknihScraper._get_record_from_element(item)
+        )
+
+    soups = make_soups()
+    record_count = extract_records(soups)
+    cases = (
+        ("make_soup", lambda: len(make_soups())),
+        ("extract_records", lambda: extract_records(soups)),
+        ("parse_page", lambda: sum(len(TrhknihScraper._parse_page(html)[0]) for html in pages))
+    )
+
+    for case, fn in cases:
+        seconds, _ = measure(fn, repeat)
+        yield {
+            "benchmark": "parse",
+            "case": case,
+            "pages": len(pages),
+            "records": record_count,
+            "seconds": round(seconds, 4),
+            "pages_per_second": round(len(pages) / seconds, 1)
+        }
+
+def make_constraints(count: int) -> list[Constraint]:
+    """
+    Builds distinct constraints by cycling through CONSTRAINT_TEMPLATES.
+
+    Args:
+        count (int): Number of constraints.
+
+    Returns:
+        list[Constraint]: The constraints.
+    """
+    constraints = []
+    for i in range(count):
+        key, relation, value = CONSTRAINT_TEMPLATES[i % len(CONSTRAINT_TEMPLATES)]
+        repetition = i // len(CONSTRAINT_TEMPLATES)
+        constraints.append(Constraint(i, key, f"{value}{repetition}" if repetition else value, relation))
+    return constraints
+
+def check_asciize(records: list[Record]) -> None:
+    """
+    Checks that ScraperManager.asciize, which translates character by character, matches unidecode.
+
+    Args:
+        records (list[Record]): Records whose values are asciized.
+
+    Raises:
+        AssertionError: If any value is asciized differently.
+    """
+    mismatches = [
+        value for record in records for value in astuple(record)
+        if ScraperManager.asciize(value) != unidecode(value).lower()
+    ]
+    if mismatches:
+        raise AssertionError(f"asciize differs from unidecode for {len(mismatches)} values, e.g. {mismatches[0]!r}")
+
+def bench_filter(repeat: int) -> Iterator[dict]:
+    """
+    Measures ScraperManager._filter_results over a grid of constraint and record counts.
+
+    Yields:
+        dict: One result per grid point.
+    """
+    for record_count in (1_000, 10_000, 100_000):
+        records = list(generate_records(record_count))
+        check_asciize(records[:1_000])
+        for constraint_count in (1, 5, 20):
+            constraints = make_constraints(constraint_count)
+            seconds, passed = measure(lambda: len(ScraperManager._filter_results(constraints, records)), repeat)
+            yield {
+                "benchmark": "filter",
+                "case": f"constraints={constraint_count},records={record_count}",
+                "records": record_count,
+                "constraints": constraint_count,
+                "passed": passed,
+                "seconds": round(seconds, 4),
+                "records_per_second": round(record_count / seconds)
+            }
+
+def bench_render(repeat: int) -> Iterator[dict]:
+    """
+    Measures rendering the inline HTML report and composing the report mails.
+
+    Half of the records are reported as new and half as disappeared listings.
+
+    Yields:
+        dict: One result per case and record count.
+    """
+    def render_inline(count: int) -> int:
+        html_part = Mailer._render_html_part(generate_records(count - count // 2), generate_records(count // 2))
+        return len(html_part.get_payload())
+
+    def compose_mails(count: int) -> int:
+        messages = Mailer.compose_mails(
+            generate_records(count - count // 2), "watchdog@localhost", "reader@localhost",
+            generate_records(count // 2), count - count // 2, count // 2
+        )
+        return sum(len(message.as_bytes()) for message in messages)
+
+    for count in (1_000, 10_000, 100_000):
+        for case, fn in (("inline", render_inline), ("mails", compose_mails)):
+            seconds, size = measure(lambda: fn(count), repeat)
+            yield {
+                "benchmark": "render",
+                "case": f"{case},records={count}",
+                "records": count,
+                "bytes": size,
+                "seconds": round(seconds, 4),
+                "records_per_second": round(count / seconds)
+            }
+
+@contextmanager
+def isolated_state(state_dir: str) -> Iterator[None]:
+    """
+    Redirects every file the Tasker reads or writes into a directory, restoring the defaults afterwards.
+
+    Args:
+        state_dir (str): The directory receiving the config, queries, result store, crawl state,
+            page cache, outbox, metrics and logs.
+    """
+    saved = (
+        aw.config.ROOT_DIR, aw.resultstore.ROOT_DIR, aw.metrics.ROOT_DIR, aw.querymanager.QUERIES_YAML_FILE,
+        crawl_state._state_dir, outbox._outbox_dir,
+        page_cache._cache_dir, page_cache._index.copy(), page_cache._size,
+        logger._log_folder, logger._file_handler
+    )
+
+    aw.config.ROOT_DIR = aw.resultstore.ROOT_DIR = aw.metrics.ROOT_DIR = state_dir
+    aw.querymanager.QUERIES_YAML_FILE = join(state_dir, "queries.yaml")
+    crawl_state._state_dir = join(state_dir, "crawlstate")
+    outbox._outbox_dir = join(state_dir, "outbox")
+    page_cache._cache_dir = join(state_dir, "cache")
+    page_cache._index.clear()
+    page_cache._size = 0
+    logger._log_folder = join(state_dir, LOG_DIR)
+    os.makedirs(logger._log_folder, exist_ok=True)
+    logger._file_handler = logging.FileHandler(join(logger._log_folder, datetime.now().strftime("%Y-%m-%d")))
+    logger._file_handler.setFormatter(logger._formatter)
+    logger._logger.removeHandler(saved[-1])
+    logger._logger.addHandler(logger._file_handler)
+
+    try:
+        yield
+    finally:
+        logger._logger.removeHandler(logger._file_handler)
+        logger._file_handler.close()
+        (
+            aw.config.ROOT_DIR, aw.resultstore.ROOT_DIR, aw.metrics.ROOT_DIR, aw.querymanager.QUERIES_YAML_FILE,
+            crawl_state._state_dir, outbox._outbox_dir,
+            page_cache._cache_dir, index, page_cache._size,
+            logger._log_folder, logger._file_handler
+        ) = saved
+        logger._logger.addHandler(logger._file_handler)
+        page_cache._index.clear()
+        page_cache._index.update(index)
+
+def bench_do_task(repeat: int, query_count: int = 3) -> Iterator[dict]:
+    """
+    Measures whole Tasker runs against the local stand-in, every repetition starting from an empty state.
+
+    Scrapers are pointed at the stand-in and the per-host rate limit is lifted, so the run
+    measures the pipeline and not the politeness delay.
+
+    Args:
+        repeat (int): Number of repetitions.
+        query_count (int): Number of queries, each crawling all saved pages.
+
+    Yields:
+        dict: Results of the cold and the warm run.
+    """
+    server = TrhknihStandIn().start()
+    scrapers = scraper_registry.get_scrapers()
+    saved_urls = [scraper.BASE_URL for scraper in scrapers]
+    saved_rate_limiter = http_client._rate_limiter
+    http_client._rate_limiter = RateLimiter(rate=1e9, burst=10 ** 9, max_concurrency=10 ** 3)
+    results = {"cold": [], "warm": []}
+
+    try:
+        for scraper in scrapers:
+            scraper.BASE_URL = server.base_url
+
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as state_dir, isolated_state(state_dir):
+                config = Config()
+                config.set_multiple_keys({
+                    SERVER: "127.0.0.1", PORT: "465", LOGIN: "watchdog@localhost",
+                    PASSWORD: "secret", RECIPIENT: "reader@localhost"
+                })
+                qm = QueryManager()
+                qm.update_queries([Query(i, f"capek {i}", []) for i in range(query_count)])
+
+                for case in ("cold", "warm"):
+                    requests, not_modified = server.requests, server.not_modified
+                    queued = len(outbox.get_names())
+                    start = time.perf_counter()
+                    Tasker.do_task(config, qm)
+                    results[case].append({
+                        "seconds": time.perf_counter() - start,
+                        "requests": server.requests - requests,
+                        "not_modified": server.not_modified - not_modified,
+                        "queued_mails": len(outbox.get_names()) - queued
+                    })
+    finally:
+        for scraper, url in zip(scrapers, saved_urls):
+            scraper.BASE_URL = url
+        http_client._rate_limiter = saved_rate_limiter
+        server.shutdown()
+        server.server_close()
+
+    for case, runs in results.items():
+        best = min(runs, key=lambda run: run["seconds"])
+        yield {
+            "benchmark": "do_task",
+            "case": case,
+            "queries": query_count,
+            "pages": len(server.pages) * query_count,
+            "requests": best["requests"],
+            "not_modified": best["not_modified"],
+            "queued_mails": best["queued_mails"],
+            "seconds": round(best["seconds"], 4)
+        }
+
+BENCHMARKS = {"parse": bench_parse, "filter": bench_filter, "render": bench_render, "do_task": bench_do_task}
+"""
+Benchmark function of every stage.
+"""
+
+def compare(results: list[dict], baseline_file: str, tolerance: float) -> list[str]:
+    """
+    Compares results to a previous output of the suite.
+
+    Args:
+        results (list[dict]): The current results.
+        baseline_file (str): File with the JSON lines of a previous run.
+        tolerance (float): Allowed relative slowdown, 0.25 allows a case to be 25 % slower.
+
+    Returns:
+        list[str]: Descriptions of the cases which got slower than allowed.
+    """
+    with open(baseline_file) as file:
+        baseline = {(result["benchmark"], result["case"]): result for result in map(json.loads, filter(str.strip, file))}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["case"]))
+        if previous and result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{result['benchmark']} {result['case']}: {result['seconds']} s, baseline {previous['seconds']} s"
+            )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stage", action="append", choices=STAGES, help="stage to run, all stages by default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=None, help="JSON lines of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = []
+    for stage in args.stage or STAGES:
+        for result in BENCHMARKS[stage](args.repeat):
+            print(json.dumps(result), flush=True)
+            results.append(result)
+
+    if args.baseline is None:
+        return 0
+
+    regressions = compare(results, args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Minimal local HTTP server standing in for trhknih.cz in benchmarks.
+
+It serves the result pages saved in benchmarks/fixtures/trhknih, choosing the page by the
+`page` query parameter (the first page by default) whatever the searched query is. Pages
+carry an ETag and conditional requests are answered with 304, like the real site.
+"""
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import listdir
+from os.path import dirname, join
+import re
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = join(dirname(__file__), "fixtures", "trhknih")
+"""
+Directory of the saved result pages, named page-<number>.html.
+"""
+
+class TrhknihStandIn(ThreadingHTTPServer):
+    """
+    Threaded HTTP stand-in listening on a free local port.
+
+    Attributes:
+        pages (dict[int, bytes]): Saved result pages by page number.
+        etags (dict[int, str]): ETags of the saved pages by page number.
+        requests (int): Number of requests received.
+        not_modified (int): Number of requests answered with 304.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR) -> None:
+        super().__init__(("127.0.0.1", 0), _TrhknihHandler)
+        self.pages = {}
+        for name in listdir(fixtures_dir):
+            match = re.fullmatch(r"page-(\d+)\.html", name)
+            if match:
+                with open(join(fixtures_dir, name), "rb") as file:
+                    self.pages[int(match.group(1))] = file.read()
+        self.etags = {page: f"\"{sha256(body).hexdigest()[:16]}\"" for page, body in self.pages.items()}
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "TrhknihStandIn":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class _TrhknihHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.server.count("requests")
+        params = parse_qs(urlsplit(self.path).query)
+        page = int(params.get("page", ["1"])[0])
+        body = self.server.pages.get(page)
+
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = self.server.etags[page]
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
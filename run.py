@@ -2,15 +2,18 @@ from aw.config import Config
 from aw.querymanager import QueryManager
 from aw.configeditor import ConfigEditor
 from aw.antiquewatchdog import AntiqueWatchdog
+from aw.profiler import Profiler
+from aw import PROFILE_ENV_VAR
 
-from os import system
+from os import environ, system
 
 def main():
     """
     Main function to initialize and run the application.
 
     This function performs the following tasks:
-    1. Initializes the configuration and query manager.
+    1. Initializes the configuration and query manager. When the PROFILE_ENV_VAR environment
+       variable is set, profiles a single task run instead and exits.
     2. Launches the ConfigEditor for user configuration.
     3. (Placeholder) Runs the query editor, which is not yet implemented.
     4. Starts the AntiqueWatchdog application in a separate thread.
@@ -19,6 +22,7 @@ def main():
     Commands in the REPL:
     - "config": Launches the ConfigEditor again.
     - "query": Placeholder for future query editor functionality.
+    - "profile": Profiles a single task run and prints where the results were written.
     - "exit": Exits the application.
 
     The REPL continues to run until the user inputs "exit". Any exceptions are caught
@@ -28,6 +32,12 @@ def main():
     c = Config()
     qm = QueryManager()
 
+    # profiling mode
+    if environ.get(PROFILE_ENV_VAR):
+        for name, filepath in Profiler.profile_task(c, qm).items():
+            print(f"{name}: {filepath}")
+        return
+
     # run config editor
     ConfigEditor(c).run()
 
@@ -47,6 +57,9 @@ def main():
                     ConfigEditor(c).run()
                 case "query":
                     pass
+                case "profile":
+                    for name, filepath in Profiler.profile_task(c, qm).items():
+                        print(f"{name}: {filepath}")
                 case "exit":
                     exit()
         except Exception as e:
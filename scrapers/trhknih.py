@@ -1,10 +1,19 @@
-import requests as rq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+import re
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
 from requests import RequestException
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from bs4.element import Tag
 
-from aw import REQUEST_GET_TIMEOUT_LIMIT
+from aw.bloomfilter import BloomFilter
+from aw.htmlparser import HtmlParser
+from aw.pagecache import page_cache
 from aw.logger import logger
+from aw.metrics import metrics
 from aw.error import CloseThreadError, SkipRecordError
 from aw.record import Record
 from aw.scraper import Scraper
@@ -18,44 +27,70 @@ class TrhknihScraper(Scraper):
         ENDPOINT (str): search endpoint
         Q_PARAM (str): query parameter without query value
         LAST_PARAMS_FULL: full params following the query
+        PAGINATION_ATTRS (dict): attributes of the pagination div
+        PARSE_ONLY (SoupStrainer): strainer keeping only serp items and the pagination div
+        MAX_PAGE_WORKERS (int): maximum number of result pages fetched concurrently
+        NEWEST_FIRST_PARAMS (str | None): params following the query which sort results newest first,
+            None disables stopping incremental crawls early. The sort param of the site is not known yet,
+            so incremental mode saves no requests for this scraper: every run crawls all pages and is full.
     """
 
     BASE_URL = "https://www.trhknih.cz"
     ENDPOINT = "hledat" # joined with params 
     Q_PARAM = "q=" # follows endpoint, should be joined with query: ENDPOINT + Q_PARAM
     LAST_PARAMS_FULL = "type=issue&chap=1" # joined to URL: URL&LAST_PARAMS_FULL
+    PAGINATION_ATTRS = {"class": "pagination pagination-large pagination-left"}
+    PARSE_ONLY = SoupStrainer("div", attrs={"class": re.compile(r"(^|\s)(serp-item|pagination)(\s|$)")})
+    MAX_PAGE_WORKERS = 4
+    NEWEST_FIRST_PARAMS = None # replaces LAST_PARAMS_FULL in incremental crawls once the sort param is known
 
     @classmethod
-    def _compose_url(cls, query_string: str) -> str:
+    def _compose_url(cls, query_string: str, last_params: str | None = None) -> str:
         """
         Composes the full URL for the search query.
 
         Args:
             query_string (str): The search query string.
+            last_params (str | None): Params following the query, LAST_PARAMS_FULL by default.
 
         Returns:
             str: The full URL for the search query.
         """ 
-        return f"{cls.BASE_URL}/{cls.ENDPOINT}?{cls.Q_PARAM}{query_string}&{cls.LAST_PARAMS_FULL}"
+        return f"{cls.BASE_URL}/{cls.ENDPOINT}?{cls.Q_PARAM}{query_string}&{last_params or cls.LAST_PARAMS_FULL}"
     
     @classmethod
-    def _make_soup(cls, url: str) -> BeautifulSoup:
+    def _parse_page(cls, html: str) -> tuple[list[Record], list[str] | None, str | None]:
         """
-        Fetches the content of the given URL and parses it into a BeautifulSoup object.
+        Parses a result page into its records and pagination links.
+
+        Only the serp items and the pagination div are materialized.
+
+        Args:
+            html (str): The HTML content of the page.
+
+        Returns:
+            tuple[list[Record], list[str] | None, str | None]: Records found on the page,
+            URLs of the remaining pages (see _get_remaining_page_urls) and the next page URL.
+        """
+        soup = HtmlParser.make_soup(html, parse_only=cls.PARSE_ONLY)
+        return cls._get_records_from_soup(soup), cls._get_remaining_page_urls(soup), cls._get_next_page_url(soup)
+
+    @classmethod
+    def _get_page(cls, url: str) -> tuple[list[Record], list[str] | None, str | None]:
+        """
+        Fetches a result page through the page cache, which parses it only if it changed.
 
         Args:
             url (str): The URL to fetch.
 
         Returns:
-            BeautifulSoup: The parsed HTML content.
+            tuple[list[Record], list[str] | None, str | None]: The parsed page, see _parse_page.
 
         Raises:
             CloseThreadError: If there is an issue with the network request.
         """
         try:
-            response = rq.get(url, timeout=REQUEST_GET_TIMEOUT_LIMIT)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            return page_cache.fetch(url, cls._parse_page)
         except RequestException as e:
             raise CloseThreadError(f"Failed to fetch {url}: {e}")
     
@@ -129,12 +164,16 @@ class TrhknihScraper(Scraper):
         Returns:
             str | None: The URL of the next page of search results, or None if there is no next page.
         """
-        pagination_div = soup.find("div", attrs={"class": "pagination pagination-large pagination-left"})
+        pagination_div = soup.find("div", attrs=cls.PAGINATION_ATTRS)
 
         if pagination_div is None:
             return None
 
         current_page = pagination_div.find("li", attrs={"class": "active"})
+
+        if current_page is None:
+            return None
+
         next_page_li = current_page.find_next_sibling("li")
 
         if not next_page_li or next_page_li.get("class") == ["disabled"]:
@@ -144,12 +183,159 @@ class TrhknihScraper(Scraper):
         return f"{cls.BASE_URL}{next_page_a['href'].strip()}" if next_page_a else None
         
     @classmethod
-    def get_results(cls, query_string: str) -> list[Record]:
+    def _get_remaining_page_urls(cls, soup: BeautifulSoup) -> list[str] | None:
+        """
+        Derives the URLs of all result pages following the first one from the pagination block.
+
+        The pagination may list only some page links, so the link to the last page is used
+        as a template: its query parameter carrying the page number is substituted for every
+        page from 2 to the last one.
+
+        Args:
+            soup (BeautifulSoup): The parsed HTML content of the first page.
+
+        Returns:
+            list[str] | None: URLs of pages 2..N in page order, or None if the page range
+            cannot be read from the markup.
+        """
+        pagination_div = soup.find("div", attrs=cls.PAGINATION_ATTRS)
+
+        if pagination_div is None:
+            return None
+
+        page_hrefs = {}
+        for page_a in pagination_div.find_all("a", href=True):
+            page_text = page_a.get_text().strip()
+            if page_text.isdigit():
+                page_hrefs[int(page_text)] = page_a["href"].strip()
+
+        if not page_hrefs:
+            return None
+
+        last_page = max(page_hrefs)
+        if last_page <= 1:
+            return []
+
+        last_page_url = urlsplit(page_hrefs[last_page])
+        params = parse_qsl(last_page_url.query, keep_blank_values=True)
+        page_param = next((key for key, value in params if value == str(last_page)), None)
+
+        if page_param is None:
+            return None
+
+        page_urls = []
+        for page in range(2, last_page + 1):
+            page_query = urlencode([(key, str(page) if key == page_param else value) for key, value in params])
+            page_urls.append(urljoin(cls.BASE_URL, urlunsplit(last_page_url._replace(query=page_query))))
+
+        return page_urls
+
+    @classmethod
+    def _get_records_from_soup(cls, soup: BeautifulSoup) -> list[Record]:
+        """
+        Extracts all records from a parsed result page, skipping malformed items.
+
+        Args:
+            soup (BeautifulSoup): The parsed HTML content.
+
+        Returns:
+            list[Record]: A list of Record objects found on the page.
+        """
+        results = []
+
+        for item in cls._get_serp_item_class_elements(soup):
+            try:
+                record = cls._get_record_from_element(item)
+                results.append(record)
+            except SkipRecordError as e:
+                logger.log_error("Record skipped.")
+                metrics.skipped_records.inc(scraper=cls.__name__)
+
+        return results
+
+    @classmethod
+    def _get_records_from_url(cls, url: str) -> list[Record]:
+        """
+        Fetches a result page and extracts its records.
+
+        Args:
+            url (str): The URL of the result page.
+
+        Returns:
+            list[Record]: A list of Record objects found on the page.
+
+        Raises:
+            CloseThreadError: If network requests fail.
+        """
+        records, _, _ = cls._get_page(url)
+        return records
+
+    @classmethod
+    def iter_pages(cls, query_string: str) -> Iterator[list[Record]]:
         """
-        Retrieves the search results for the given query string.
+        Yields the search results for the given query string page by page.
 
-        This method iteratively fetches search results from all available pages,
-        parses them, and returns a list of Record objects.
+        The first page is fetched to read the page range from the pagination block,
+        the remaining pages are then fetched concurrently (at most MAX_PAGE_WORKERS at once)
+        and yielded in page order, fetching runs at most MAX_PAGE_WORKERS pages ahead of
+        the consumer. When the page range cannot be read, pages are followed one by one
+        via the next page link.
+
+        Args:
+            query_string (str): The search query string.
+
+        Yields:
+            list[Record]: The Record objects of one result page.
+
+        Raises:
+            CloseThreadError: If network requests fail.
+        """
+        yield from cls.iter_pages_from(query_string, 0)
+
+    @classmethod
+    def iter_pages_from(cls, query_string: str, start_page: int) -> Iterator[list[Record]]:
+        """
+        Yields the search results following the first start_page pages, see iter_pages.
+
+        Only the first page is fetched again to read the page range, the skipped pages
+        are only fetched when pages have to be followed via the next page link.
+
+        Args:
+            query_string (str): The search query string.
+            start_page (int): Number of leading pages to skip.
+
+        Yields:
+            list[Record]: The Record objects of one result page.
+
+        Raises:
+            CloseThreadError: If network requests fail.
+        """
+        records, page_urls, url = cls._get_page(cls._compose_url(query_string))
+        if not start_page:
+            yield records
+
+        if page_urls is not None:
+            with ThreadPoolExecutor(max_workers=cls.MAX_PAGE_WORKERS) as executor:
+                page_urls = iter(page_urls[max(start_page - 1, 0):])
+                pending = deque(executor.submit(cls._get_records_from_url, page_url) for page_url in islice(page_urls, cls.MAX_PAGE_WORKERS))
+                while pending:
+                    records = pending.popleft().result()
+                    for page_url in islice(page_urls, 1):
+                        pending.append(executor.submit(cls._get_records_from_url, page_url))
+                    yield records
+            return
+
+        page_index = 1
+        while url is not None:
+            records, _, url = cls._get_page(url)
+            if page_index >= start_page:
+                yield records
+            page_index += 1
+
+    @classmethod
+    def get_results(cls, query_string: str) -> list[Record]:
+        """
+        Retrieves the search results for the given query string, see iter_pages.
 
         Args:
             query_string (str): The search query string.
@@ -160,20 +346,62 @@ class TrhknihScraper(Scraper):
         Raises:
             CloseThreadError: If network requests fail.
         """
-        results = []
-        url = cls._compose_url(query_string)
+        return list(chain.from_iterable(cls.iter_pages(query_string)))
+
+    @classmethod
+    def iter_new_pages(cls, query_string: str, seen: BloomFilter) -> Iterator[list[Record]]:
+        """
+        Yields the newest search results page by page, stopping at the first page of already seen listings.
+
+        Results are requested newest first and pages are followed one by one, so the crawl
+        stops as soon as a whole page consists of listings seen by previous crawls.
+        Without NEWEST_FIRST_PARAMS older listings may appear on any page, so all results are yielded.
+
+        Args:
+            query_string (str): The search query string.
+            seen (BloomFilter): Links of listings seen by previous crawls.
+
+        Yields:
+            list[Record]: The Record objects of one result page preceding the first fully seen page.
+
+        Raises:
+            CloseThreadError: If network requests fail.
+        """
+        if cls.NEWEST_FIRST_PARAMS is None:
+            yield from cls.iter_pages(query_string)
+            return
+
+        url = cls._compose_url(query_string, cls.NEWEST_FIRST_PARAMS)
 
         while url is not None:
-            soup = cls._make_soup(url)
-            serp_items = cls._get_serp_item_class_elements(soup)
+            records, _, url = cls._get_page(url)
+            if records and all(record.link in seen for record in records):
+                return
+            yield records
 
-            for item in serp_items:
-                try:
-                    record = cls._get_record_from_element(item)
-                    results.append(record)
-                except SkipRecordError as e:
-                    logger.log_error("Record skipped.")
+    @classmethod
+    def can_crawl_incrementally(cls) -> bool:
+        """
+        Tells whether incremental crawls stop early, which needs results sorted newest first.
 
-            url = cls._get_next_page_url(soup)
-        
-        return results
\ No newline at end of file
+        Returns:
+            bool: True if NEWEST_FIRST_PARAMS is known, False otherwise.
+        """
+        return cls.NEWEST_FIRST_PARAMS is not None
+
+    @classmethod
+    def get_new_results(cls, query_string: str, seen: BloomFilter) -> list[Record]:
+        """
+        Retrieves the newest search results, see iter_new_pages.
+
+        Args:
+            query_string (str): The search query string.
+            seen (BloomFilter): Links of listings seen by previous crawls.
+
+        Returns:
+            list[Record]: A list of Record objects preceding the first fully seen page.
+
+        Raises:
+            CloseThreadError: If network requests fail.
+        """
+        return list(chain.from_iterable(cls.iter_new_pages(query_string, seen)))
@@ -0,0 +1,56 @@
+import pytest
+
+import aw.metrics
+import aw.tasker
+from aw import TIME, PERIOD, WEEKDAY, LOGIN, RECIPIENT
+from aw.crawlstate import CrawlState
+from aw.outbox import Outbox
+from aw.resultstore import ResultStore
+
+class FakeConfig:
+    """
+    Configuration kept in memory, valid unless told otherwise.
+
+    Attributes:
+        keys (dict[str, str]): The configuration keys.
+        valid (bool): What is_valid returns.
+    """
+    def __init__(self, **keys: str) -> None:
+        self.keys = {
+            TIME: "12:00", PERIOD: "daily", WEEKDAY: "0",
+            LOGIN: "watchdog@localhost", RECIPIENT: "reader@localhost"
+        }
+        self.keys.update(keys)
+        self.valid = True
+
+    def is_valid(self) -> bool:
+        return self.valid
+
+    def get_key(self, key: str) -> str:
+        return self.keys[key]
+
+    def get_scheduler_keys(self) -> dict[str, str]:
+        return {key: self.keys[key] for key in (TIME, PERIOD, WEEKDAY)}
+
+    def add_change_listener(self, listener) -> None:
+        pass
+
+    def is_scheduler_up_to_date(self) -> bool:
+        return True
+
+@pytest.fixture
+def config() -> FakeConfig:
+    return FakeConfig()
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """
+    Runs the test in a temporary directory receiving the queries file, result store,
+    crawl state, outbox and metrics written by the Tasker.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(aw.metrics, "ROOT_DIR", str(tmp_path))
+    monkeypatch.setattr(aw.tasker, "crawl_state", CrawlState(str(tmp_path / "crawlstate")))
+    monkeypatch.setattr(aw.tasker, "outbox", Outbox(str(tmp_path / "outbox")))
+    monkeypatch.setattr(aw.tasker, "ResultStore", lambda: ResultStore(str(tmp_path / "results.sqlite3")))
+    return tmp_path
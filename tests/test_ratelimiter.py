@@ -0,0 +1,73 @@
+import threading
+
+from aw.ratelimiter import RateLimiter
+
+HOST = "books.example"
+
+def make_limiter() -> RateLimiter:
+    return RateLimiter(rate=1000, burst=100, initial_concurrency=2, max_concurrency=4)
+
+def release(limiter: RateLimiter, latency: float = 0.1, healthy: bool = True, retry_after: float | None = None) -> None:
+    assert limiter.acquire(HOST)
+    limiter.release(HOST, latency, healthy, retry_after)
+
+def concurrency(limiter: RateLimiter) -> int:
+    return limiter.get_stats()[HOST]["concurrency"]
+
+def test_healthy_responses_increase_concurrency_by_one_per_round():
+    limiter = make_limiter()
+
+    release(limiter)
+    release(limiter)
+    assert concurrency(limiter) == 3
+
+    for _ in range(10):
+        release(limiter)
+    assert concurrency(limiter) == 4
+
+def test_failed_response_halves_concurrency_once_per_round_trip():
+    limiter = make_limiter()
+    for _ in range(5):
+        release(limiter, latency=10)
+    assert concurrency(limiter) == 4
+
+    release(limiter, healthy=False)
+    release(limiter, healthy=False)
+
+    assert concurrency(limiter) == 2
+    assert limiter.get_stats()[HOST]["throttled"] == 2
+
+def test_slow_response_halves_concurrency():
+    limiter = make_limiter()
+    release(limiter)
+
+    release(limiter, latency=1.0)
+
+    assert concurrency(limiter) == 1
+
+def test_concurrency_limit_blocks_further_requests():
+    limiter = make_limiter()
+    assert limiter.acquire(HOST)
+    assert limiter.acquire(HOST)
+    cancelled = threading.Event()
+    cancelled.set()
+
+    assert not limiter.acquire(HOST, cancelled)
+
+    limiter.release(HOST, 0.1, True)
+    assert limiter.acquire(HOST, cancelled)
+
+def test_retry_after_blocks_host():
+    limiter = make_limiter()
+    release(limiter, healthy=False, retry_after=60)
+    cancelled = threading.Event()
+    cancelled.set()
+
+    assert not limiter.acquire(HOST, cancelled)
+    assert limiter.acquire("other.example", cancelled)
+
+def test_parse_retry_after():
+    assert RateLimiter.parse_retry_after("120") == 120
+    assert RateLimiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert RateLimiter.parse_retry_after("soon") is None
+    assert RateLimiter.parse_retry_after(None) is None
@@ -0,0 +1,106 @@
+import pytest
+
+from aw.record import Record
+from aw.resultstore import ResultStore
+
+RECIPIENT = "reader@localhost"
+
+def make_record(link: str, name: str = "Krakatit") -> Record:
+    return Record(name, "Capek", "100", "Odeon", "1990", link)
+
+@pytest.fixture
+def store(tmp_path) -> ResultStore:
+    return ResultStore(str(tmp_path / "results.sqlite3"))
+
+def save(store: ResultStore, links: list[str], full: bool = True, recipient: str = RECIPIENT) -> int:
+    return store.save_run(((make_record(link), recipient, 0) for link in links), full=full)
+
+def new_links(store: ResultStore, run: int, recipient: str = RECIPIENT) -> list[str]:
+    return [record.link for record in store.iter_new_records(run, recipient)]
+
+def disappeared_links(store: ResultStore, run: int, recipient: str = RECIPIENT) -> list[str]:
+    return [record.link for record in store.iter_disappeared_records(run, recipient)]
+
+def test_first_run_reports_everything_new(store):
+    run = save(store, ["a", "b"])
+
+    assert store.count_changes(run, RECIPIENT) == (2, 0)
+    assert new_links(store, run) == ["a", "b"]
+    assert disappeared_links(store, run) == []
+
+def test_full_run_reports_new_and_disappeared(store):
+    save(store, ["a", "b"])
+    run = save(store, ["b", "c"])
+
+    assert store.count_changes(run, RECIPIENT) == (1, 1)
+    assert new_links(store, run) == ["c"]
+    assert disappeared_links(store, run) == ["a"]
+
+def test_incremental_run_reports_no_disappeared(store):
+    save(store, ["a", "b"])
+    run = save(store, ["c"], full=False)
+
+    assert store.count_changes(run, RECIPIENT) == (1, 0)
+    assert disappeared_links(store, run) == []
+
+def test_full_run_compares_against_previous_full_run(store):
+    save(store, ["a", "b", "c"])
+    save(store, ["d"], full=False)
+    run = save(store, ["a", "d"])
+
+    assert new_links(store, run) == []
+    assert disappeared_links(store, run) == ["b", "c"]
+
+def test_returning_listing_is_new_again(store):
+    save(store, ["a", "b"])
+    save(store, ["b"])
+    run = save(store, ["a", "b"])
+
+    assert new_links(store, run) == ["a"]
+    assert disappeared_links(store, run) == []
+
+def test_run_is_full_only_once_marked(store):
+    save(store, ["a", "b"])
+    run = save(store, ["b"], full=False)
+    assert disappeared_links(store, run) == []
+
+    store.mark_full(run)
+
+    assert disappeared_links(store, run) == ["a"]
+    assert not store.is_full_crawl_due()
+
+def test_changes_are_read_per_recipient(store):
+    save(store, ["a"], recipient="first@localhost")
+    run = store.save_run([(make_record("b"), "second@localhost", 0), (make_record("c"), "first@localhost", 0)])
+
+    assert new_links(store, run, "first@localhost") == ["c"]
+    assert disappeared_links(store, run, "first@localhost") == ["a"]
+    assert new_links(store, run, "second@localhost") == ["b"]
+    assert disappeared_links(store, run, "second@localhost") == []
+
+def test_new_listings_follow_rank_then_arrival(store):
+    run = store.save_run([
+        (make_record("c"), RECIPIENT, 1), (make_record("a"), RECIPIENT, 0),
+        (make_record("d"), RECIPIENT, 1), (make_record("b"), RECIPIENT, 0)
+    ])
+
+    assert new_links(store, run) == ["a", "b", "c", "d"]
+
+def test_listings_without_link_are_always_new(store):
+    save(store, ["", "a"])
+    run = save(store, ["", "a"])
+
+    assert store.count_changes(run, RECIPIENT) == (1, 0)
+    assert new_links(store, run) == [""]
+
+def test_broken_run_leaves_no_trace(store):
+    def results():
+        yield make_record("a"), RECIPIENT, 0
+        raise RuntimeError("crawl broke off")
+
+    with pytest.raises(RuntimeError):
+        store.save_run(results())
+
+    assert store.is_full_crawl_due()
+    run = save(store, ["a"])
+    assert new_links(store, run) == ["a"]
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+import sqlite3
+
+import pytest
+
+from aw.query import Query
+from aw.querymanager import QueryManager
+from aw.record import Record
+from aw.scheduler import Scheduler
+from aw.scrapermanager import ScraperManager
+from aw.tasker import Tasker
+
+NOW = datetime(2026, 10, 16, 11, 0)
+FIRE = datetime(2026, 10, 16, 12, 0)
+
+@pytest.fixture
+def qm(state_dir) -> QueryManager:
+    return QueryManager()
+
+def make_scheduler(config, qm: QueryManager, queries: list[Query]) -> Scheduler:
+    qm.update_queries(queries)
+    scheduler = Scheduler(config, qm)
+    scheduler._update_heap(NOW)
+    return scheduler
+
+def test_configured_fire_without_periods_runs_all_queries(config, qm):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", []), Query(2, "hrabal", [])])
+
+    assert scheduler._pop_due_queries(FIRE - timedelta(minutes=1)) == set()
+    assert scheduler._pop_due_queries(FIRE) is None
+
+def test_configured_fire_runs_only_scheduled_queries(config, qm):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", []), Query(2, "hrabal", [], period=90)])
+
+    assert scheduler._pop_due_queries(FIRE) == {1}
+    assert scheduler._pop_due_queries(NOW + timedelta(minutes=90)) == {2}
+
+def test_query_period_is_rescheduled(config, qm):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", []), Query(2, "hrabal", [], period=30)])
+
+    assert scheduler._pop_due_queries(NOW + timedelta(minutes=30)) == {2}
+    assert scheduler._pop_due_queries(NOW + timedelta(minutes=59)) == set()
+    assert scheduler._pop_due_queries(FIRE) is None
+
+def test_invalid_period_follows_configured_schedule(config, qm):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", []), Query(2, "hrabal", [], period=-5)])
+
+    assert [query_id for _, _, query_id in scheduler._heap] == [None]
+    assert scheduler._pop_due_queries(FIRE) is None
+
+def test_broken_queries_file_keeps_last_periods(config, qm, state_dir):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", []), Query(2, "hrabal", [], period=30)])
+    (state_dir / "queries.yaml").write_text("- id: 1\n  query_string: [unclosed\n")
+    scheduler._queries_loaded_at = None
+
+    scheduler._update_heap(NOW)
+
+    assert scheduler._periods == {2: 30}
+    assert scheduler._pop_due_queries(NOW + timedelta(minutes=30)) == {2}
+
+def test_queries_file_is_reloaded_only_when_changed(config, qm, monkeypatch):
+    scheduler = make_scheduler(config, qm, [Query(1, "capek", [])])
+    loads = []
+    fetch_queries = qm.fetch_queries
+    monkeypatch.setattr(qm, "fetch_queries", lambda: loads.append(1) or fetch_queries())
+
+    scheduler._update_heap(NOW)
+    assert loads == []
+
+    qm.update_queries([Query(1, "capek", []), Query(2, "hrabal", [], period=30)])
+    scheduler._queries_mtime = None
+    scheduler._update_heap(NOW)
+    assert loads == [1]
+    assert scheduler._periods == {2: 30}
+
+def test_scheduled_run_without_periods_is_full(config, qm, state_dir, monkeypatch):
+    queries = [Query(1, "capek", []), Query(2, "hrabal", [])]
+    scheduler = make_scheduler(config, qm, queries)
+    runs = [
+        [Record("Krakatit", "Capek", "100", "Odeon", "1990", "a"), Record("Postriziny", "Hrabal", "90", "Odeon", "1991", "b")],
+        [Record("Krakatit", "Capek", "100", "Odeon", "1990", "a")]
+    ]
+    monkeypatch.setattr(ScraperManager, "can_crawl_incrementally", classmethod(lambda cls: False))
+    monkeypatch.setattr(
+        ScraperManager, "iter_results",
+        classmethod(lambda cls, queries, **kwargs: ((queries[0], record, 0) for record in runs.pop(0)))
+    )
+
+    Tasker.do_task(config, qm, query_ids=None)
+    Tasker.do_task(config, qm, query_ids=scheduler._pop_due_queries(FIRE))
+
+    with sqlite3.connect(state_dir / "results.sqlite3") as connection:
+        assert [full for full, in connection.execute("SELECT full FROM runs ORDER BY id")] == [1, 1]
+    assert len(list((state_dir / "outbox").glob("*.eml"))) == 2
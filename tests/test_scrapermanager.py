@@ -0,0 +1,68 @@
+import pytest
+
+import aw.scrapermanager
+from aw.constraint import Constraint
+from aw.crawlstate import CrawlState
+from aw.error import InvalidConstraintError
+from aw.pagestream import PageStream
+from aw.query import Query
+from aw.record import Record
+from aw.scraper import Scraper
+from aw.scrapermanager import ScraperManager
+
+class FixedScraper(Scraper):
+    BASE_URL = "https://books.example"
+
+    @classmethod
+    def get_results(cls, query_string: str) -> list[Record]:
+        return [Record("Krakatit", "Capek", "100", "Odeon", "1990", "a")]
+
+class NewestFirstScraper(FixedScraper):
+    @classmethod
+    def can_crawl_incrementally(cls) -> bool:
+        return True
+
+@pytest.fixture
+def state(tmp_path, monkeypatch) -> CrawlState:
+    state = CrawlState(str(tmp_path))
+    monkeypatch.setattr(aw.scrapermanager, "crawl_state", state)
+    return state
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_seen_set_is_kept_only_for_scrapers_stopping_early(state, tmp_path, incremental):
+    for scraper in (FixedScraper, NewestFirstScraper):
+        stream = PageStream(max_pages=10)
+        ScraperManager._scrape(scraper, Query(1, "capek", []), stream, incremental=incremental)
+
+    assert state.get_stats()["completed_crawls"] == 2
+    assert not tmp_path.joinpath(state._get_filepath(FixedScraper, "capek")).exists()
+    assert "a" in state.load(NewestFirstScraper, "capek")
+
+RECORDS = [
+    Record("Krakatit", "Čapek", "120", "Odeon", "1990", "a"),
+    Record("Postřižiny", "Hrabal", "180", "Odeon", "1991", "b")
+]
+
+@pytest.mark.parametrize("asciize", [True, False])
+def test_numeric_constraint_value_is_compared_as_written(asciize):
+    constraints = [Constraint(1, "price", 150, "lt", asciize)]
+
+    assert ScraperManager._filter_results(constraints, RECORDS) == RECORDS[:1]
+
+def test_asciized_constraint_matches_diacritics():
+    constraints = [Constraint(1, "author", "CAPEK", "eq")]
+
+    assert ScraperManager._filter_results(constraints, RECORDS) == RECORDS[:1]
+
+@pytest.mark.parametrize("value", [None, ["capek"], True])
+def test_invalid_constraint_value_is_rejected(value):
+    with pytest.raises(InvalidConstraintError):
+        ScraperManager._compile_constraints([Constraint(1, "author", value, "eq")])
+
+def test_query_with_invalid_constraint_is_skipped(state, monkeypatch):
+    monkeypatch.setattr(aw.scrapermanager.scraper_registry, "get_scrapers", lambda: [FixedScraper])
+    queries = [Query(1, "capek", [Constraint(1, "price", None, "lt")]), Query(2, "capek", [Constraint(2, "price", 150, "lt")])]
+
+    results = list(ScraperManager.iter_results(queries, incremental=True))
+
+    assert [(query.id, record.link) for query, record, _ in results] == [(2, "a")]
@@ -0,0 +1,66 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from aw.tasker import Tasker
+
+@pytest.fixture
+def runs(monkeypatch):
+    """
+    Replaces do_task with a run blocking until released, recording the queries of every run.
+    """
+    runs = SimpleNamespace(query_ids=[], started=threading.Semaphore(0), release=threading.Event())
+
+    def do_task(cls, config, qm, query_ids=None):
+        runs.query_ids.append(query_ids)
+        runs.started.release()
+        runs.release.wait(5)
+
+    monkeypatch.setattr(Tasker, "do_task", classmethod(do_task))
+    yield runs
+    runs.release.set()
+
+def start_trigger(query_ids=None, wait=False) -> threading.Thread:
+    thread = threading.Thread(target=Tasker.trigger, args=(None, None), kwargs={"query_ids": query_ids, "wait": wait})
+    thread.start()
+    return thread
+
+def test_triggers_during_run_are_coalesced_into_one_follow_up(runs):
+    thread = start_trigger({1})
+    assert runs.started.acquire(timeout=5)
+
+    assert not Tasker.trigger(None, None, query_ids={2})
+    assert not Tasker.trigger(None, None, query_ids=[3])
+    runs.release.set()
+    thread.join(5)
+
+    assert runs.query_ids == [{1}, {2, 3}]
+
+def test_trigger_of_all_queries_covers_coalesced_subsets(runs):
+    thread = start_trigger({1})
+    assert runs.started.acquire(timeout=5)
+
+    assert not Tasker.trigger(None, None, query_ids={2})
+    assert not Tasker.trigger(None, None)
+    runs.release.set()
+    thread.join(5)
+
+    assert runs.query_ids == [{1}, None]
+
+def test_trigger_without_concurrent_run_runs_once(runs):
+    runs.release.set()
+
+    assert Tasker.trigger(None, None, query_ids={1})
+    assert runs.query_ids == [{1}]
+
+def test_waiting_trigger_runs_after_run_in_progress(runs):
+    thread = start_trigger({1})
+    assert runs.started.acquire(timeout=5)
+
+    waiting = start_trigger({2}, wait=True)
+    runs.release.set()
+    thread.join(5)
+    waiting.join(5)
+
+    assert runs.query_ids == [{1}, {2}]